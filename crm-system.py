@@ -0,0 +1,2048 @@
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+import sqlite3
+import datetime
+import itertools
+from tkinter import font
+from crm_repository import (ActivityFeed, CRMDatabase, DashboardStats, PAGE_SIZE, GRANULARITIES, bucket_key,
+                            fts_matches, today)
+from crm_remote import RemoteDatabase, ServerUnavailable
+from crm_search import SearchExecutor
+from crm_charts import BarChart, LineChart, PieChart
+from crm_dedup import BLOCKING_PASSES, DedupJob
+from crm_export import ExportJob
+from crm_import import ImportJob
+from crm_reminders import DueDateScheduler
+from crm_writer import WriteExecutor
+
+class CRMApp:
+    def __init__(self, root, server=None, token=None):
+        """server is a crm_server URL to share data through; None opens crm_database.db directly"""
+        self.root = root
+        self.server = server
+        self.token = token
+        self.root.title(f"Advanced CRM System - {server}" if server else "Advanced CRM System")
+        self.root.geometry("1400x900")
+        self.root.configure(bg='#f0f0f0')
+
+        # Initialize database
+        self.init_database()
+
+        # Create main interface
+        self.create_main_interface()
+
+        # Load initial data
+        self.refresh_all_data()
+
+        # Announce tasks already due, then wake up as each due date arrives
+        if self.reminders.due_count:
+            self.add_activity(f"⏰ {self.reminders.due_count:,} open tasks are due or overdue")
+        self.schedule_reminders()
+
+    def init_database(self):
+        """Open the CRM database, or the server sharing it; schema and queries live in crm_repository"""
+        if self.server:
+            # Same interface; other clients' changes come in through poll_remote_changes
+            self.db = RemoteDatabase(self.server, self.token)
+            self.root.after(self.REMOTE_POLL, self.poll_remote_changes)
+        else:
+            self.db = CRMDatabase('crm_database.db')
+        self.stats = DashboardStats(self.db)
+        # Read once here; on_data_changed pushes each newly logged activity
+        self.activity_feed = ActivityFeed(self.db)
+        self.db.subscribe(self.on_data_changed)
+
+        # Views redrawn on the next idle tick, see schedule_view_refresh
+        self.dirty_views = set()
+        self.view_refresh_job = None
+        self.customer_search = ''
+        self.sales_search = ''
+
+        # Searches run on a worker thread with a pooled read-only connection, see poll_search
+        self.search = SearchExecutor(self.db.connections)
+        self.search_poll_job = None
+
+        # Dialog saves run on a worker thread with its own writer connection, see submit_save
+        self.saves = WriteExecutor(self.db.writer)
+        self.save_poll_job = None
+        self.pending_ids = itertools.count(1)
+
+        # Due dates of open tasks in memory, kept current by on_data_changed
+        self.reminders = DueDateScheduler()
+        self.reminder_job = None
+
+        # Keyset paging: last id loaded into each tree, or None once it holds every row
+        self.page_after = {}
+        self.page_jobs = set()
+        self.row_count_labels = {}
+        self.header_stat_labels = {}
+        self.dashboard_stat_labels = {}
+        self.kpi_labels = {}
+
+        self.root.after(self.MAINTENANCE_INTERVAL, self.run_db_maintenance)
+
+    MAINTENANCE_INTERVAL = 10 * 60 * 1000  # ms between PRAGMA optimize / WAL checkpoints
+    REMOTE_POLL = 50  # ms between checks for changes other clients made on the server
+
+    def poll_remote_changes(self):
+        """Apply what the server's event stream brought in, as if it had been written here"""
+        changes, reset = self.db.received()
+        if reset:
+            # Missed more than the server could replay; start over from its current data
+            self.activity_feed.load()
+            self.refresh_all_data()
+        for change in changes:
+            self.db.publish(change)
+        self.root.after(self.REMOTE_POLL, self.poll_remote_changes)
+
+    def local_only(self, feature):
+        """True, after saying so, when feature needs the database file and this client uses a server"""
+        if self.db.path is not None:
+            return False
+        messagebox.showinfo(feature, f"{feature} works on the database file itself; "
+                                     f"run it on the server host instead.")
+        return True
+
+    def run_db_maintenance(self):
+        """Refresh planner statistics and fold the WAL back into the database"""
+        try:
+            self.db.maintain()
+        except sqlite3.OperationalError:
+            pass  # Busy with an import batch; the next round catches up
+        self.root.after(self.MAINTENANCE_INTERVAL, self.run_db_maintenance)
+
+    def create_main_interface(self):
+        """Create the main interface with notebook tabs"""
+        # Header frame
+        header_frame = tk.Frame(self.root, bg='#2c3e50', height=60)
+        header_frame.pack(fill='x')
+        header_frame.pack_propagate(False)
+
+        title_label = tk.Label(header_frame, text="🏢 Advanced CRM System",
+                              font=('Arial', 20, 'bold'), fg='white', bg='#2c3e50')
+        title_label.pack(side='left', padx=20, pady=15)
+
+        # Stats frame in header
+        self.stats_frame = tk.Frame(header_frame, bg='#2c3e50')
+        self.stats_frame.pack(side='right', padx=20, pady=10)
+
+        # Due-task counter, see check_reminders
+        self.reminder_label = tk.Label(header_frame, text='', fg='#f39c12', bg='#2c3e50',
+                                       font=('Arial', 11, 'bold'))
+        self.reminder_label.pack(side='right', padx=10)
+
+        # Main container
+        main_frame = tk.Frame(self.root, bg='#f0f0f0')
+        main_frame.pack(fill='both', expand=True, padx=10, pady=10)
+
+        # Create notebook for tabs
+        self.notebook = ttk.Notebook(main_frame)
+        self.notebook.pack(fill='both', expand=True)
+
+        # Create tabs
+        self.create_dashboard_tab()
+        self.create_customers_tab()
+        self.create_sales_tab()
+        self.create_tasks_tab()
+        self.create_analytics_tab()
+
+        # Update header stats
+        self.update_header_stats()
+
+    def create_dashboard_tab(self):
+        """Create dashboard tab with overview"""
+        dashboard_frame = ttk.Frame(self.notebook)
+        self.notebook.add(dashboard_frame, text="📊 Dashboard")
+
+        # Quick stats section
+        stats_frame = tk.Frame(dashboard_frame, bg='white', relief='raised', bd=2)
+        stats_frame.pack(fill='x', padx=10, pady=10)
+
+        tk.Label(stats_frame, text="📈 Quick Overview", font=('Arial', 16, 'bold'),
+                bg='white').pack(pady=10)
+
+        self.dashboard_stats = tk.Frame(stats_frame, bg='white')
+        self.dashboard_stats.pack(fill='x', padx=20, pady=10)
+
+        # Recent activities section
+        activities_frame = tk.Frame(dashboard_frame, bg='white', relief='raised', bd=2)
+        activities_frame.pack(fill='both', expand=True, padx=10, pady=(0, 10))
+
+        tk.Label(activities_frame, text="📋 Recent Activities", font=('Arial', 14, 'bold'),
+                bg='white').pack(pady=10)
+
+        # Activities listbox with scrollbar
+        activities_container = tk.Frame(activities_frame, bg='white')
+        activities_container.pack(fill='both', expand=True, padx=20, pady=(0, 20))
+
+        self.activities_listbox = tk.Listbox(activities_container, font=('Arial', 10))
+        scrollbar_activities = ttk.Scrollbar(activities_container, orient='vertical',
+                                           command=self.activities_listbox.yview)
+        self.activities_listbox.configure(yscrollcommand=scrollbar_activities.set)
+
+        self.activities_listbox.pack(side='left', fill='both', expand=True)
+        scrollbar_activities.pack(side='right', fill='y')
+
+    def create_customers_tab(self):
+        """Create customers management tab"""
+        customers_frame = ttk.Frame(self.notebook)
+        self.notebook.add(customers_frame, text="👥 Customers")
+
+        # Control panel
+        control_frame = tk.Frame(customers_frame, bg='#ecf0f1', height=80)
+        control_frame.pack(fill='x', padx=10, pady=5)
+        control_frame.pack_propagate(False)
+
+        # Buttons
+        tk.Button(control_frame, text="➕ Add Customer", command=self.add_customer_dialog,
+                 bg='#27ae60', fg='white', font=('Arial', 10, 'bold')).pack(side='left', padx=5, pady=20)
+        tk.Button(control_frame, text="✏️ Edit Customer", command=self.edit_customer_dialog,
+                 bg='#f39c12', fg='white', font=('Arial', 10, 'bold')).pack(side='left', padx=5, pady=20)
+        tk.Button(control_frame, text="🗑️ Delete Customer", command=self.delete_customer,
+                 bg='#e74c3c', fg='white', font=('Arial', 10, 'bold')).pack(side='left', padx=5, pady=20)
+        tk.Button(control_frame, text="🕒 Timeline", command=self.show_customer_timeline,
+                 bg='#8e44ad', fg='white', font=('Arial', 10, 'bold')).pack(side='left', padx=5, pady=20)
+        tk.Button(control_frame, text="🧬 Duplicates", command=self.find_duplicate_customers,
+                 bg='#16a085', fg='white', font=('Arial', 10, 'bold')).pack(side='left', padx=5, pady=20)
+
+        # Search
+        tk.Label(control_frame, text="🔍 Search:", bg='#ecf0f1', font=('Arial', 10)).pack(side='left', padx=(20, 5), pady=20)
+        self.customer_search_var = tk.StringVar()
+        self.customer_search_var.trace('w', self.search_customers)
+        tk.Entry(control_frame, textvariable=self.customer_search_var, width=20).pack(side='left', pady=20)
+
+        self.row_count_labels['customers'] = tk.Label(control_frame, bg='#ecf0f1', font=('Arial', 9), fg='#7f8c8d')
+        self.row_count_labels['customers'].pack(side='right', padx=10, pady=20)
+
+        # Customers treeview
+        tree_frame = tk.Frame(customers_frame)
+        tree_frame.pack(fill='both', expand=True, padx=10, pady=5)
+
+        columns = ('ID', 'Name', 'Email', 'Phone', 'Company', 'Status', 'Created')
+        self.customers_tree = ttk.Treeview(tree_frame, columns=columns, show='headings', height=15)
+
+        # Configure columns
+        self.customers_tree.heading('ID', text='ID')
+        self.customers_tree.heading('Name', text='Name')
+        self.customers_tree.heading('Email', text='Email')
+        self.customers_tree.heading('Phone', text='Phone')
+        self.customers_tree.heading('Company', text='Company')
+        self.customers_tree.heading('Status', text='Status')
+        self.customers_tree.heading('Created', text='Created Date')
+
+        self.customers_tree.column('ID', width=50)
+        self.customers_tree.column('Name', width=150)
+        self.customers_tree.column('Email', width=200)
+        self.customers_tree.column('Phone', width=120)
+        self.customers_tree.column('Company', width=150)
+        self.customers_tree.column('Status', width=80)
+        self.customers_tree.column('Created', width=100)
+
+        # Scrollbars
+        v_scrollbar = ttk.Scrollbar(tree_frame, orient='vertical', command=self.customers_tree.yview)
+        h_scrollbar = ttk.Scrollbar(tree_frame, orient='horizontal', command=self.customers_tree.xview)
+        self.customers_tree.configure(yscrollcommand=self.paged_scroll('customers', v_scrollbar),
+                              xscrollcommand=h_scrollbar.set)
+
+        self.customers_tree.grid(row=0, column=0, sticky='nsew')
+        v_scrollbar.grid(row=0, column=1, sticky='ns')
+        h_scrollbar.grid(row=1, column=0, sticky='ew')
+
+        tree_frame.grid_rowconfigure(0, weight=1)
+        tree_frame.grid_columnconfigure(0, weight=1)
+
+    def create_sales_tab(self):
+        """Create sales management tab"""
+        sales_frame = ttk.Frame(self.notebook)
+        self.notebook.add(sales_frame, text="💰 Sales")
+
+        # Control panel
+        control_frame = tk.Frame(sales_frame, bg='#ecf0f1', height=80)
+        control_frame.pack(fill='x', padx=10, pady=5)
+        control_frame.pack_propagate(False)
+
+        # Buttons
+        tk.Button(control_frame, text="➕ Add Sale", command=self.add_sale_dialog,
+                 bg='#27ae60', fg='white', font=('Arial', 10, 'bold')).pack(side='left', padx=5, pady=20)
+        tk.Button(control_frame, text="✏️ Edit Sale", command=self.edit_sale_dialog,
+                 bg='#f39c12', fg='white', font=('Arial', 10, 'bold')).pack(side='left', padx=5, pady=20)
+        tk.Button(control_frame, text="🗑️ Delete Sale", command=self.delete_sale,
+                 bg='#e74c3c', fg='white', font=('Arial', 10, 'bold')).pack(side='left', padx=5, pady=20)
+
+        # Search and filter
+        tk.Label(control_frame, text="🔍 Search:", bg='#ecf0f1', font=('Arial', 10)).pack(side='left', padx=(20, 5), pady=20)
+        self.sales_search_var = tk.StringVar()
+        self.sales_search_var.trace('w', self.search_sales)
+        tk.Entry(control_frame, textvariable=self.sales_search_var, width=15).pack(side='left', pady=20)
+
+        tk.Label(control_frame, text="Status:", bg='#ecf0f1', font=('Arial', 10)).pack(side='left', padx=(20, 5), pady=20)
+        self.sales_filter_var = tk.StringVar(value='All')
+        sales_filter = ttk.Combobox(control_frame, textvariable=self.sales_filter_var,
+                                   values=['All', 'Pending', 'Completed', 'Cancelled'], width=10)
+        sales_filter.pack(side='left', pady=20)
+        sales_filter.bind('<<ComboboxSelected>>', lambda e: self.refresh_sales(self.sales_search_var.get()))
+
+        self.row_count_labels['sales'] = tk.Label(control_frame, bg='#ecf0f1', font=('Arial', 9), fg='#7f8c8d')
+        self.row_count_labels['sales'].pack(side='right', padx=10, pady=20)
+
+        # Sales treeview
+        tree_frame = tk.Frame(sales_frame)
+        tree_frame.pack(fill='both', expand=True, padx=10, pady=5)
+
+        columns = ('ID', 'Customer', 'Product', 'Amount', 'Status', 'Sale Date', 'Created')
+        self.sales_tree = ttk.Treeview(tree_frame, columns=columns, show='headings', height=15)
+
+        # Configure columns
+        for col in columns:
+            self.sales_tree.heading(col, text=col)
+
+        self.sales_tree.column('ID', width=50)
+        self.sales_tree.column('Customer', width=150)
+        self.sales_tree.column('Product', width=200)
+        self.sales_tree.column('Amount', width=100)
+        self.sales_tree.column('Status', width=100)
+        self.sales_tree.column('Sale Date', width=100)
+        self.sales_tree.column('Created', width=100)
+
+        # Scrollbars
+        v_scrollbar = ttk.Scrollbar(tree_frame, orient='vertical', command=self.sales_tree.yview)
+        h_scrollbar = ttk.Scrollbar(tree_frame, orient='horizontal', command=self.sales_tree.xview)
+        self.sales_tree.configure(yscrollcommand=self.paged_scroll('sales', v_scrollbar),
+                              xscrollcommand=h_scrollbar.set)
+
+        self.sales_tree.grid(row=0, column=0, sticky='nsew')
+        v_scrollbar.grid(row=0, column=1, sticky='ns')
+        h_scrollbar.grid(row=1, column=0, sticky='ew')
+
+        tree_frame.grid_rowconfigure(0, weight=1)
+        tree_frame.grid_columnconfigure(0, weight=1)
+
+    def create_tasks_tab(self):
+        """Create tasks management tab"""
+        tasks_frame = ttk.Frame(self.notebook)
+        self.notebook.add(tasks_frame, text="📋 Tasks")
+
+        # Control panel
+        control_frame = tk.Frame(tasks_frame, bg='#ecf0f1', height=80)
+        control_frame.pack(fill='x', padx=10, pady=5)
+        control_frame.pack_propagate(False)
+
+        # Buttons
+        tk.Button(control_frame, text="➕ Add Task", command=self.add_task_dialog,
+                 bg='#27ae60', fg='white', font=('Arial', 10, 'bold')).pack(side='left', padx=5, pady=20)
+        tk.Button(control_frame, text="✏️ Edit Task", command=self.edit_task_dialog,
+                 bg='#f39c12', fg='white', font=('Arial', 10, 'bold')).pack(side='left', padx=5, pady=20)
+        tk.Button(control_frame, text="🗑️ Delete Task", command=self.delete_task,
+                 bg='#e74c3c', fg='white', font=('Arial', 10, 'bold')).pack(side='left', padx=5, pady=20)
+        tk.Button(control_frame, text="✅ Mark Complete", command=self.complete_task,
+                 bg='#3498db', fg='white', font=('Arial', 10, 'bold')).pack(side='left', padx=5, pady=20)
+
+        # Filter
+        tk.Label(control_frame, text="Priority:", bg='#ecf0f1', font=('Arial', 10)).pack(side='left', padx=(20, 5), pady=20)
+        self.tasks_filter_var = tk.StringVar(value='All')
+        tasks_filter = ttk.Combobox(control_frame, textvariable=self.tasks_filter_var,
+                                   values=['All', 'High', 'Medium', 'Low'], width=10)
+        tasks_filter.pack(side='left', pady=20)
+        tasks_filter.bind('<<ComboboxSelected>>', lambda e: self.refresh_tasks())
+
+        self.row_count_labels['tasks'] = tk.Label(control_frame, bg='#ecf0f1', font=('Arial', 9), fg='#7f8c8d')
+        self.row_count_labels['tasks'].pack(side='right', padx=10, pady=20)
+
+        # Tasks treeview
+        tree_frame = tk.Frame(tasks_frame)
+        tree_frame.pack(fill='both', expand=True, padx=10, pady=5)
+
+        columns = ('ID', 'Customer', 'Title', 'Priority', 'Status', 'Due Date', 'Created')
+        self.tasks_tree = ttk.Treeview(tree_frame, columns=columns, show='headings', height=15)
+
+        # Configure columns
+        for col in columns:
+            self.tasks_tree.heading(col, text=col)
+
+        self.tasks_tree.column('ID', width=50)
+        self.tasks_tree.column('Customer', width=150)
+        self.tasks_tree.column('Title', width=250)
+        self.tasks_tree.column('Priority', width=80)
+        self.tasks_tree.column('Status', width=100)
+        self.tasks_tree.column('Due Date', width=100)
+        self.tasks_tree.column('Created', width=100)
+
+        # Scrollbars
+        v_scrollbar = ttk.Scrollbar(tree_frame, orient='vertical', command=self.tasks_tree.yview)
+        h_scrollbar = ttk.Scrollbar(tree_frame, orient='horizontal', command=self.tasks_tree.xview)
+        self.tasks_tree.configure(yscrollcommand=self.paged_scroll('tasks', v_scrollbar),
+                              xscrollcommand=h_scrollbar.set)
+
+        self.tasks_tree.grid(row=0, column=0, sticky='nsew')
+        v_scrollbar.grid(row=0, column=1, sticky='ns')
+        h_scrollbar.grid(row=1, column=0, sticky='ew')
+
+        tree_frame.grid_rowconfigure(0, weight=1)
+        tree_frame.grid_columnconfigure(0, weight=1)
+
+    def create_analytics_tab(self):
+        """Create analytics tab with charts"""
+        analytics_frame = ttk.Frame(self.notebook)
+        self.notebook.add(analytics_frame, text="📈 Analytics")
+
+        # Control panel
+        control_frame = tk.Frame(analytics_frame, bg='#ecf0f1', height=60)
+        control_frame.pack(fill='x', padx=10, pady=5)
+        control_frame.pack_propagate(False)
+
+        # Refresh button
+        tk.Button(control_frame, text="🔄 Refresh Charts", command=self.refresh_analytics, bg='#3498db', fg='white', font=('Arial', 10, 'bold')).pack(side='left', padx=10, pady=15)
+
+        # Export report button
+        tk.Button(control_frame, text="📊 Export Report", command=self.export_report, bg='#9b59b6', fg='white', font=('Arial', 10, 'bold')).pack(side='left', padx=5, pady=15)
+
+        # Bulk import button
+        tk.Button(control_frame, text="📥 Import Data", command=self.import_data, bg='#16a085', fg='white', font=('Arial', 10, 'bold')).pack(side='left', padx=5, pady=15)
+
+        # Time range and filters for the sales chart
+        range_frame = tk.Frame(analytics_frame, bg='#ecf0f1')
+        range_frame.pack(fill='x', padx=10)
+
+        tk.Label(range_frame, text="Range:", bg='#ecf0f1', font=('Arial', 10)).pack(side='left', padx=(10, 5), pady=8)
+        self.chart_range_var = tk.StringVar(value='Last 6 months')
+        range_combo = ttk.Combobox(range_frame, textvariable=self.chart_range_var,
+                                   values=list(self.CHART_RANGES), width=14, state='readonly')
+        range_combo.pack(side='left', pady=8)
+        range_combo.bind('<<ComboboxSelected>>', lambda e: self.draw_sales_chart())
+
+        tk.Label(range_frame, text="By:", bg='#ecf0f1', font=('Arial', 10)).pack(side='left', padx=(15, 5), pady=8)
+        self.chart_bucket_var = tk.StringVar(value='Auto')
+        bucket_combo = ttk.Combobox(range_frame, textvariable=self.chart_bucket_var,
+                                    values=['Auto', 'Day', 'Week', 'Month', 'Quarter'], width=8, state='readonly')
+        bucket_combo.pack(side='left', pady=8)
+        bucket_combo.bind('<<ComboboxSelected>>', lambda e: self.draw_sales_chart())
+
+        tk.Label(range_frame, text="Product:", bg='#ecf0f1', font=('Arial', 10)).pack(side='left', padx=(15, 5), pady=8)
+        self.chart_product_var = tk.StringVar()
+        product_entry = tk.Entry(range_frame, textvariable=self.chart_product_var, width=15)
+        product_entry.pack(side='left', pady=8)
+        product_entry.bind('<Return>', lambda e: self.draw_sales_chart())
+
+        tk.Label(range_frame, text="Customer:", bg='#ecf0f1', font=('Arial', 10)).pack(side='left', padx=(15, 5), pady=8)
+        self.chart_customer_var = tk.StringVar()
+        customer_entry = tk.Entry(range_frame, textvariable=self.chart_customer_var, width=15)
+        customer_entry.pack(side='left', pady=8)
+        customer_entry.bind('<Return>', lambda e: self.draw_sales_chart())
+
+        # Charts container
+        charts_frame = tk.Frame(analytics_frame, bg='white')
+        charts_frame.pack(fill='both', expand=True, padx=10, pady=5)
+
+        # Left chart - Sales by month
+        left_frame = tk.Frame(charts_frame, bg='white', relief='raised', bd=2)
+        left_frame.pack(side='left', fill='both', expand=True, padx=(0, 5))
+
+        self.sales_chart_title = tk.Label(left_frame, text="💰 Sales Overview", font=('Arial', 14, 'bold'),
+                                          bg='white')
+        self.sales_chart_title.pack(pady=10)
+
+        self.sales_chart_canvas = tk.Canvas(left_frame, bg='white', height=300)
+        self.sales_chart_canvas.pack(fill='both', expand=True, padx=20, pady=(0, 20))
+        # Bars up to CHART_MAX_BARS buckets, a downsampled line beyond that
+        self.sales_chart = BarChart(self.sales_chart_canvas, empty_text="No sales data available.")
+        self.sales_line_chart = LineChart(self.sales_chart_canvas, empty_text="No sales data available.",
+                                          x_format=lambda x: datetime.date.fromordinal(int(x)).isoformat())
+
+        # Right chart - Customer status
+        right_frame = tk.Frame(charts_frame, bg='white', relief='raised', bd=2)
+        right_frame.pack(side='right', fill='both', expand=True, padx=(5, 0))
+
+        tk.Label(right_frame, text="👥 Customer Status Distribution", font=('Arial', 14, 'bold'),
+                bg='white').pack(pady=10)
+
+        self.customer_chart_canvas = tk.Canvas(right_frame, bg='white', height=300)
+        self.customer_chart_canvas.pack(fill='both', expand=True, padx=20, pady=(0, 20))
+        self.customer_status_chart = PieChart(self.customer_chart_canvas,
+                                              empty_text="No customer data available.")
+
+        # KPIs section
+        bottom_frame = tk.Frame(analytics_frame, bg='white', relief='raised', bd=2, height=150)
+        bottom_frame.pack(fill='x', padx=10, pady=(0, 10))
+        bottom_frame.pack_propagate(False)
+
+        tk.Label(bottom_frame, text="📊 Key Performance Indicators", font=('Arial', 14, 'bold'),
+                bg='white').pack(pady=10)
+
+        self.kpi_frame = tk.Frame(bottom_frame, bg='white')
+        self.kpi_frame.pack(expand=True)
+
+
+    # Customer management methods
+    def add_customer_dialog(self):
+        """Open dialog to add new customer"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Add New Customer")
+        dialog.geometry("400x500")
+        dialog.configure(bg='white')
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        # Center the dialog
+        dialog.geometry("+%d+%d" % (self.root.winfo_rootx() + 50, self.root.winfo_rooty() + 50))
+
+        tk.Label(dialog, text="Add New Customer", font=('Arial', 16, 'bold'), bg='white').pack(pady=20)
+
+        # Form fields
+        fields = [
+            ('Name *', 'name'),
+            ('Email *', 'email'),
+            ('Phone', 'phone'),
+            ('Company', 'company'),
+            ('Address', 'address')
+        ]
+
+        entries = {}
+        for label, key in fields:
+            frame = tk.Frame(dialog, bg='white')
+            frame.pack(fill='x', padx=20, pady=5)
+            tk.Label(frame, text=label, bg='white', font=('Arial', 10)).pack(anchor='w')
+            entry = tk.Entry(frame, font=('Arial', 10))
+            entry.pack(fill='x', pady=(2, 0))
+            entries[key] = entry
+
+        # Status dropdown
+        status_frame = tk.Frame(dialog, bg='white')
+        status_frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(status_frame, text='Status', bg='white', font=('Arial', 10)).pack(anchor='w')
+        status_var = tk.StringVar(value='Active')
+        status_combo = ttk.Combobox(status_frame, textvariable=status_var,
+                                   values=['Active', 'Inactive', 'Prospect'], font=('Arial', 10))
+        status_combo.pack(fill='x', pady=(2, 0))
+
+        # Notes
+        notes_frame = tk.Frame(dialog, bg='white')
+        notes_frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(notes_frame, text='Notes', bg='white', font=('Arial', 10)).pack(anchor='w')
+        notes_text = tk.Text(notes_frame, height=4, font=('Arial', 10))
+        notes_text.pack(fill='x', pady=(2, 0))
+
+        # Buttons
+        button_frame = tk.Frame(dialog, bg='white')
+        button_frame.pack(fill='x', padx=20, pady=20)
+
+        def save_customer():
+            name = entries['name'].get().strip()
+            email = entries['email'].get().strip()
+
+            if not name or not email:
+                messagebox.showerror("Error", "Name and Email are required!")
+                return
+
+            phone, company, address = (entries[key].get().strip() for key in ('phone', 'company', 'address'))
+            status = status_var.get()
+            notes = notes_text.get(1.0, tk.END).strip()
+
+            pending = None
+            if self.page_after.get('customers') is None and fts_matches(self.customer_search, name, email,
+                                                                         company, notes):
+                pending = (self.customers_tree, None, ('…', name, email, phone, company, status, today()))
+            self.submit_save(dialog,
+                             lambda repos: repos.customers.add(name, email, phone, company, address, status, notes),
+                             lambda customer_id: self.add_activity(f"Added new customer: {name}", customer_id),
+                             lambda e: ("Email already exists!" if isinstance(e, sqlite3.IntegrityError)
+                                        else f"Failed to add customer: {str(e)}"),
+                             pending)
+
+        tk.Button(button_frame, text="💾 Save", command=save_customer,
+                 bg='#27ae60', fg='white', font=('Arial', 10, 'bold')).pack(side='right', padx=5)
+        tk.Button(button_frame, text="❌ Cancel", command=dialog.destroy,
+                 bg='#e74c3c', fg='white', font=('Arial', 10, 'bold')).pack(side='right')
+
+    def edit_customer_dialog(self):
+        """Edit selected customer"""
+        selection = self.saved_selection(self.customers_tree, "Please select a customer to edit!")
+        if not selection:
+            return
+
+        customer_id = self.customers_tree.item(selection[0])['values'][0]
+
+        # Get customer data
+        customer = self.db.customers.get(customer_id)
+
+        if not customer:
+            messagebox.showerror("Error", "Customer not found!")
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Edit Customer")
+        dialog.geometry("400x500")
+        dialog.configure(bg='white')
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        tk.Label(dialog, text="Edit Customer", font=('Arial', 16, 'bold'), bg='white').pack(pady=20)
+
+        # Form fields with current values
+        fields = [
+            ('Name *', 'name', customer[1]),
+            ('Email *', 'email', customer[2]),
+            ('Phone', 'phone', customer[3] or ''),
+            ('Company', 'company', customer[4] or ''),
+            ('Address', 'address', customer[5] or '')
+        ]
+
+        entries = {}
+        for label, key, value in fields:
+            frame = tk.Frame(dialog, bg='white')
+            frame.pack(fill='x', padx=20, pady=5)
+            tk.Label(frame, text=label, bg='white', font=('Arial', 10)).pack(anchor='w')
+            entry = tk.Entry(frame, font=('Arial', 10))
+            entry.pack(fill='x', pady=(2, 0))
+            entry.insert(0, value)
+            entries[key] = entry
+
+        # Status dropdown
+        status_frame = tk.Frame(dialog, bg='white')
+        status_frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(status_frame, text='Status', bg='white', font=('Arial', 10)).pack(anchor='w')
+        status_var = tk.StringVar(value=customer[6] or 'Active')
+        status_combo = ttk.Combobox(status_frame, textvariable=status_var,
+                                   values=['Active', 'Inactive', 'Prospect'], font=('Arial', 10))
+        status_combo.pack(fill='x', pady=(2, 0))
+
+        # Notes
+        notes_frame = tk.Frame(dialog, bg='white')
+        notes_frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(notes_frame, text='Notes', bg='white', font=('Arial', 10)).pack(anchor='w')
+        notes_text = tk.Text(notes_frame, height=4, font=('Arial', 10))
+        notes_text.pack(fill='x', pady=(2, 0))
+        if customer[8]:
+            notes_text.insert(1.0, customer[8])
+
+        # Buttons
+        button_frame = tk.Frame(dialog, bg='white')
+        button_frame.pack(fill='x', padx=20, pady=20)
+
+        def update_customer():
+            name = entries['name'].get().strip()
+            email = entries['email'].get().strip()
+
+            if not name or not email:
+                messagebox.showerror("Error", "Name and Email are required!")
+                return
+
+            phone, company, address = (entries[key].get().strip() for key in ('phone', 'company', 'address'))
+            status = status_var.get()
+            notes = notes_text.get(1.0, tk.END).strip()
+
+            self.submit_save(dialog,
+                             lambda repos: repos.customers.update(customer_id, name, email, phone, company,
+                                                                  address, status, notes),
+                             lambda _: self.add_activity(f"Updated customer: {name}", customer_id),
+                             lambda e: ("Email already exists!" if isinstance(e, sqlite3.IntegrityError)
+                                        else f"Failed to update customer: {str(e)}"),
+                             (self.customers_tree, str(customer_id),
+                              (customer_id, name, email, phone, company, status, customer[7])))
+
+        tk.Button(button_frame, text="💾 Update", command=update_customer,
+                 bg='#f39c12', fg='white', font=('Arial', 10, 'bold')).pack(side='right', padx=5)
+        tk.Button(button_frame, text="❌ Cancel", command=dialog.destroy,
+                 bg='#e74c3c', fg='white', font=('Arial', 10, 'bold')).pack(side='right')
+
+    def delete_customer(self):
+        """Delete the selected customers (Ctrl/Shift-click selects several)"""
+        selection = self.saved_selection(self.customers_tree, "Please select a customer to delete!")
+        if not selection:
+            return
+
+        customer_ids = [int(iid) for iid in selection]
+        if len(selection) == 1:
+            customer_name = self.customers_tree.item(selection[0])['values'][1]
+            prompt = f"Are you sure you want to delete customer '{customer_name}'? "
+            activity = f"Deleted customer: {customer_name}"
+        else:
+            prompt = f"Are you sure you want to delete {len(selection):,} customers? "
+            activity = f"Deleted {len(selection):,} customers"
+
+        if messagebox.askyesno("Confirm Delete", prompt + "This will also delete associated sales, tasks, and interactions."):
+            try:
+                self.db.customers.delete_many(customer_ids)
+                messagebox.showinfo("Success", "Customer deleted successfully!" if len(selection) == 1
+                                    else f"{len(selection):,} customers deleted successfully!")
+                self.add_activity(activity)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to delete customer: {str(e)}")
+
+    def show_customer_timeline(self):
+        """The selected customer's interactions, newest first, loaded a page at a time while scrolling"""
+        selection = self.saved_selection(self.customers_tree, "Please select a customer to view!")
+        if not selection:
+            return
+
+        customer_id = int(selection[0])
+        customer_name = self.customers_tree.item(selection[0])['values'][1]
+
+        window = tk.Toplevel(self.root)
+        window.title(f"Timeline - {customer_name}")
+        window.geometry("700x500")
+        window.transient(self.root)
+
+        tree_frame = tk.Frame(window)
+        tree_frame.pack(fill='both', expand=True, padx=10, pady=10)
+        tree = ttk.Treeview(tree_frame, columns=('Date', 'Type', 'Description'), show='headings')
+        for column, width in (('Date', 150), ('Type', 100), ('Description', 420)):
+            tree.heading(column, text=column)
+            tree.column(column, width=width)
+        scrollbar = ttk.Scrollbar(tree_frame, orient='vertical', command=tree.yview)
+        tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+
+        # (date, id) of the oldest row loaded; None with done set once the first page was short
+        before = None
+        done = False
+        page_job = None
+
+        def load_page():
+            nonlocal before, done, page_job
+            page_job = None
+            rows = self.db.interactions.timeline(customer_id, before)
+            for interaction_id, kind, description, date in rows:
+                tree.insert('', tk.END, iid=str(interaction_id), values=(date, kind, description))
+            if rows:
+                before = (rows[-1][3], rows[-1][0])
+            done = len(rows) < PAGE_SIZE
+
+        def on_scroll(first, last):
+            nonlocal page_job
+            scrollbar.set(first, last)
+            if float(last) > 0.9 and not done and page_job is None:
+                page_job = window.after_idle(load_page)
+
+        def on_change(change):
+            if change.table == 'customers' and change.op == 'delete' and change.row_id == customer_id:
+                close()
+            elif change.table == 'interactions' and change.op == 'insert' and change.new[1] == customer_id:
+                interaction_id, _, kind, description, date = change.new
+                # Older than the loaded pages: a later page brings it
+                if done or (date or '', interaction_id) > (before[0] or '', before[1]):
+                    tree.insert('', 0, iid=str(interaction_id), values=(date, kind, description))
+
+        def close():
+            self.db.unsubscribe(on_change)
+            if page_job is not None:
+                window.after_cancel(page_job)
+            window.destroy()
+
+        tree.configure(yscrollcommand=on_scroll)
+        window.protocol("WM_DELETE_WINDOW", close)
+        load_page()
+        self.db.subscribe(on_change)
+
+    def find_duplicate_customers(self):
+        """Look for likely duplicate customers in the background, then list them for merging"""
+        if self.local_only("Duplicate search"):
+            return
+        job = DedupJob(self.db.connections).start()
+
+        window = tk.Toplevel(self.root)
+        window.title("Finding Duplicates")
+        window.geometry("360x130")
+        window.transient(self.root)
+
+        status_label = tk.Label(window, text="Reading customers...", font=('Arial', 10))
+        status_label.pack(pady=(15, 5))
+        progress = ttk.Progressbar(window, length=300, mode='determinate')
+        progress.pack(pady=5)
+        tk.Button(window, text="Cancel", command=job.cancel, bg='#e74c3c', fg='white').pack(pady=5)
+        window.protocol("WM_DELETE_WINDOW", job.cancel)
+
+        self.root.after(100, lambda: self.poll_dedup(job, window, progress, status_label))
+
+    def poll_dedup(self, job, window, progress, status_label):
+        """Mirror the worker's progress until it finishes, then show what it found"""
+        if not job.finished:
+            if job.total:
+                progress.config(maximum=job.total, value=job.done)
+                passes = len(BLOCKING_PASSES)
+                status_label.config(text=f"Blocking pass {job.done * passes // job.total + 1} of {passes}"
+                                    if job.done < job.total else "Scoring candidate pairs...")
+            self.root.after(100, lambda: self.poll_dedup(job, window, progress, status_label))
+            return
+
+        window.destroy()
+        if job.error is not None:
+            messagebox.showerror("Duplicate Search Error", f"Failed to search for duplicates: {str(job.error)}")
+        elif job.cancelled:
+            return
+        elif not job.groups:
+            messagebox.showinfo("No Duplicates", f"No likely duplicates among {job.compared:,} candidate pairs.")
+        else:
+            self.show_duplicate_groups(job.groups)
+
+    DUPLICATE_GROUPS_SHOWN = 1000
+
+    def show_duplicate_groups(self, groups):
+        """List groups of likely duplicates; a group merges into its selected (or oldest) customer"""
+        window = tk.Toplevel(self.root)
+        window.title("Duplicate Customers")
+        window.geometry("900x550")
+        window.transient(self.root)
+
+        shown = groups[:self.DUPLICATE_GROUPS_SHOWN]
+        tk.Label(window, text=f"{len(groups):,} groups of likely duplicates" +
+                 (f", showing the first {len(shown):,}" if len(shown) < len(groups) else "") +
+                 ". Select the customer to keep, or a group to keep its oldest record.",
+                 font=('Arial', 10)).pack(padx=10, pady=(10, 0), anchor='w')
+
+        tree_frame = tk.Frame(window)
+        tree_frame.pack(fill='both', expand=True, padx=10, pady=10)
+        columns = ('Name', 'Email', 'Phone', 'Company', 'Created')
+        tree = ttk.Treeview(tree_frame, columns=columns, show='tree headings')
+        tree.heading('#0', text='Group / ID')
+        tree.column('#0', width=140)
+        for column, width in zip(columns, (160, 220, 120, 150, 90)):
+            tree.heading(column, text=column)
+            tree.column(column, width=width)
+        scrollbar = ttk.Scrollbar(tree_frame, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+
+        for number, group in enumerate(shown, 1):
+            parent = tree.insert('', tk.END, iid=f'group{number}', open=True,
+                                 text=f"Group {number} ({group.score:.0%})")
+            for customer_id in group.ids:
+                customer = self.db.customers.get(customer_id)
+                if customer is not None:
+                    tree.insert(parent, tk.END, iid=str(customer_id), text=str(customer_id),
+                                values=(customer[1], customer[2], customer[3], customer[4], customer[7]))
+
+        def merge_group():
+            selection = tree.selection()
+            if not selection:
+                messagebox.showwarning("Warning", "Please select a group or the customer to keep!")
+                return
+            parent = tree.parent(selection[0]) or selection[0]
+            customer_ids = [int(iid) for iid in tree.get_children(parent)]
+            keep_id = int(selection[0]) if selection[0] != parent else customer_ids[0]
+            keep_name = tree.item(str(keep_id))['values'][0]
+            duplicate_ids = [customer_id for customer_id in customer_ids if customer_id != keep_id]
+            if not duplicate_ids:
+                return
+            if not messagebox.askyesno("Confirm Merge",
+                                       f"Merge {len(duplicate_ids):,} customer(s) into '{keep_name}' (ID {keep_id})? "
+                                       "Their sales, tasks and interactions move to it and they are deleted."):
+                return
+            try:
+                merged = self.db.customers.merge(keep_id, duplicate_ids)
+                tree.delete(parent)
+                if merged:
+                    self.add_activity(f"Merged {merged:,} duplicate(s) into customer: {keep_name}", keep_id)
+                else:
+                    messagebox.showwarning("Warning", "These customers were changed or deleted since the search.")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to merge customers: {str(e)}")
+
+        button_frame = tk.Frame(window)
+        button_frame.pack(fill='x', padx=10, pady=(0, 10))
+        tk.Button(button_frame, text="🔗 Merge", command=merge_group,
+                 bg='#27ae60', fg='white', font=('Arial', 10, 'bold')).pack(side='right', padx=5)
+        tk.Button(button_frame, text="❌ Close", command=window.destroy,
+                 bg='#e74c3c', fg='white', font=('Arial', 10, 'bold')).pack(side='right')
+
+    def refresh_customers(self, search_term=''):
+        """Refresh customer list in treeview based on search term"""
+        # Anything still searching in the background is older than this
+        self.search.cancel('customers')
+        for item in self.customers_tree.get_children():
+            self.customers_tree.delete(item)
+
+        self.customer_search = search_term
+        if search_term:
+            self.page_after['customers'] = None
+            self.insert_customer_rows(self.db.customers.list(search_term))
+            self.update_row_counts()
+        else:
+            self.page_after['customers'] = 0
+            self.load_next_page('customers')
+
+    def insert_customer_rows(self, customers):
+        for customer in customers:
+            if not self.customers_tree.exists(str(customer[0])):
+                self.customers_tree.insert('', tk.END, iid=str(customer[0]), values=customer)
+
+    def search_customers(self, *args):
+        """Callback for customer search entry"""
+        term = self.customer_search_var.get()
+        if not term.strip():
+            # The unfiltered list is just its first page, no need for the worker
+            self.refresh_customers()
+            return
+        self.start_search('customers', lambda conn: self.db.repositories(conn).customers.list(term), term)
+
+    # Sales management methods
+    def add_sale_dialog(self):
+        """Open dialog to add new sale"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Add New Sale")
+        dialog.geometry("400x450")
+        dialog.configure(bg='white')
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        dialog.geometry("+%d+%d" % (self.root.winfo_rootx() + 50, self.root.winfo_rooty() + 50))
+
+        tk.Label(dialog, text="Add New Sale", font=('Arial', 16, 'bold'), bg='white').pack(pady=20)
+
+        # Get customers for dropdown
+        customers = self.db.customers.names()
+        customer_names = [customer[1] for customer in customers]
+        customer_id_map = {customer[1]: customer[0] for customer in customers}
+
+        fields = [
+            ('Customer *', 'customer'),
+            ('Product Name *', 'product_name'),
+            ('Amount *', 'amount'),
+            ('Sale Date (YYYY-MM-DD)', 'sale_date')
+        ]
+
+        entries = {}
+
+        # Customer dropdown
+        frame = tk.Frame(dialog, bg='white')
+        frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(frame, text='Customer *', bg='white', font=('Arial', 10)).pack(anchor='w')
+        customer_var = tk.StringVar()
+        customer_combo = ttk.Combobox(frame, textvariable=customer_var, values=customer_names,
+                                     state='readonly', font=('Arial', 10))
+        customer_combo.pack(fill='x', pady=(2, 0))
+        entries['customer'] = customer_combo
+
+        for label, key in fields[1:]:
+            frame = tk.Frame(dialog, bg='white')
+            frame.pack(fill='x', padx=20, pady=5)
+            tk.Label(frame, text=label, bg='white', font=('Arial', 10)).pack(anchor='w')
+            entry = tk.Entry(frame, font=('Arial', 10))
+            entry.pack(fill='x', pady=(2, 0))
+            if key == 'sale_date':
+                entry.insert(0, datetime.datetime.now().strftime('%Y-%m-%d'))
+            entries[key] = entry
+
+        # Status dropdown
+        status_frame = tk.Frame(dialog, bg='white')
+        status_frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(status_frame, text='Status', bg='white', font=('Arial', 10)).pack(anchor='w')
+        status_var = tk.StringVar(value='Pending')
+        status_combo = ttk.Combobox(status_frame, textvariable=status_var,
+                                   values=['Pending', 'Completed', 'Cancelled'], font=('Arial', 10))
+        status_combo.pack(fill='x', pady=(2, 0))
+
+        # Notes
+        notes_frame = tk.Frame(dialog, bg='white')
+        notes_frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(notes_frame, text='Notes', bg='white', font=('Arial', 10)).pack(anchor='w')
+        notes_text = tk.Text(notes_frame, height=3, font=('Arial', 10))
+        notes_text.pack(fill='x', pady=(2, 0))
+
+        button_frame = tk.Frame(dialog, bg='white')
+        button_frame.pack(fill='x', padx=20, pady=20)
+
+        def save_sale():
+            customer_name = customer_var.get()
+            product_name = entries['product_name'].get().strip()
+            amount_str = entries['amount'].get().strip()
+            sale_date = entries['sale_date'].get().strip()
+            status = status_var.get()
+            notes = notes_text.get(1.0, tk.END).strip()
+
+            if not customer_name or not product_name or not amount_str or not sale_date:
+                messagebox.showerror("Error", "Customer, Product Name, Amount, and Sale Date are required!")
+                return
+
+            try:
+                amount = float(amount_str)
+                if amount <= 0:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Error", "Amount must be a positive number!")
+                return
+
+            customer_id = customer_id_map.get(customer_name)
+            if not customer_id:
+                messagebox.showerror("Error", "Selected customer not found!")
+                return
+
+            try:
+                datetime.datetime.strptime(sale_date, '%Y-%m-%d')
+            except ValueError:
+                messagebox.showerror("Error", "Sale Date must be in YYYY-MM-DD format!")
+                return
+
+            pending = None
+            if (self.page_after.get('sales') is None and self.sales_filter_var.get() in ('All', status)
+                    and (fts_matches(self.sales_search, customer_name) or fts_matches(self.sales_search, product_name))):
+                pending = (self.sales_tree, None,
+                           ('…', customer_name, product_name, amount, status, sale_date, today()),
+                           (f'customer{customer_id}',))
+            self.submit_save(dialog,
+                             lambda repos: repos.sales.add(customer_id, product_name, amount, status, sale_date, notes),
+                             lambda _: self.add_activity(f"Added new sale: {product_name} for {customer_name}",
+                                                         customer_id),
+                             lambda e: f"Failed to add sale: {str(e)}",
+                             pending)
+
+        tk.Button(button_frame, text="💾 Save", command=save_sale,
+                 bg='#27ae60', fg='white', font=('Arial', 10, 'bold')).pack(side='right', padx=5)
+        tk.Button(button_frame, text="❌ Cancel", command=dialog.destroy,
+                 bg='#e74c3c', fg='white', font=('Arial', 10, 'bold')).pack(side='right')
+
+    def edit_sale_dialog(self):
+        """Edit selected sale"""
+        selection = self.saved_selection(self.sales_tree, "Please select a sale to edit!")
+        if not selection:
+            return
+
+        sale_id = self.sales_tree.item(selection[0])['values'][0]
+
+        sale = self.db.sales.get(sale_id)
+
+        if not sale:
+            messagebox.showerror("Error", "Sale not found!")
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Edit Sale")
+        dialog.geometry("400x450")
+        dialog.configure(bg='white')
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        tk.Label(dialog, text="Edit Sale", font=('Arial', 16, 'bold'), bg='white').pack(pady=20)
+
+        customers = self.db.customers.names()
+        customer_names = [customer[1] for customer in customers]
+        customer_id_map = {customer[1]: customer[0] for customer in customers}
+        customer_name_from_id = {customer[0]: customer[1] for customer in customers}
+
+        current_customer_name = customer_name_from_id.get(sale[1])
+
+        fields = [
+            ('Customer *', 'customer', current_customer_name),
+            ('Product Name *', 'product_name', sale[2]),
+            ('Amount *', 'amount', str(sale[3])),
+            ('Sale Date (YYYY-MM-DD)', 'sale_date', sale[5])
+        ]
+
+        entries = {}
+
+        # Customer dropdown
+        frame = tk.Frame(dialog, bg='white')
+        frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(frame, text='Customer *', bg='white', font=('Arial', 10)).pack(anchor='w')
+        customer_var = tk.StringVar(value=current_customer_name)
+        customer_combo = ttk.Combobox(frame, textvariable=customer_var, values=customer_names,
+                                     state='readonly', font=('Arial', 10))
+        customer_combo.pack(fill='x', pady=(2, 0))
+        entries['customer'] = customer_combo
+
+        for label, key, value in fields[1:]:
+            frame = tk.Frame(dialog, bg='white')
+            frame.pack(fill='x', padx=20, pady=5)
+            tk.Label(frame, text=label, bg='white', font=('Arial', 10)).pack(anchor='w')
+            entry = tk.Entry(frame, font=('Arial', 10))
+            entry.pack(fill='x', pady=(2, 0))
+            entry.insert(0, value)
+            entries[key] = entry
+
+        # Status dropdown
+        status_frame = tk.Frame(dialog, bg='white')
+        status_frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(status_frame, text='Status', bg='white', font=('Arial', 10)).pack(anchor='w')
+        status_var = tk.StringVar(value=sale[4])
+        status_combo = ttk.Combobox(status_frame, textvariable=status_var,
+                                   values=['Pending', 'Completed', 'Cancelled'], font=('Arial', 10))
+        status_combo.pack(fill='x', pady=(2, 0))
+
+        # Notes
+        notes_frame = tk.Frame(dialog, bg='white')
+        notes_frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(notes_frame, text='Notes', bg='white', font=('Arial', 10)).pack(anchor='w')
+        notes_text = tk.Text(notes_frame, height=3, font=('Arial', 10))
+        notes_text.pack(fill='x', pady=(2, 0))
+        if sale[7]:
+            notes_text.insert(1.0, sale[7])
+
+        button_frame = tk.Frame(dialog, bg='white')
+        button_frame.pack(fill='x', padx=20, pady=20)
+
+        def update_sale():
+            customer_name = customer_var.get()
+            product_name = entries['product_name'].get().strip()
+            amount_str = entries['amount'].get().strip()
+            sale_date = entries['sale_date'].get().strip()
+            status = status_var.get()
+            notes = notes_text.get(1.0, tk.END).strip()
+
+            if not customer_name or not product_name or not amount_str or not sale_date:
+                messagebox.showerror("Error", "Customer, Product Name, Amount, and Sale Date are required!")
+                return
+
+            try:
+                amount = float(amount_str)
+                if amount <= 0:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Error", "Amount must be a positive number!")
+                return
+
+            customer_id = customer_id_map.get(customer_name)
+            if not customer_id:
+                messagebox.showerror("Error", "Selected customer not found!")
+                return
+
+            try:
+                datetime.datetime.strptime(sale_date, '%Y-%m-%d')
+            except ValueError:
+                messagebox.showerror("Error", "Sale Date must be in YYYY-MM-DD format!")
+                return
+
+            self.submit_save(dialog,
+                             lambda repos: repos.sales.update(sale_id, customer_id, product_name, amount, status,
+                                                              sale_date, notes),
+                             lambda _: self.add_activity(f"Updated sale: {product_name} for {customer_name}",
+                                                         customer_id),
+                             lambda e: f"Failed to update sale: {str(e)}",
+                             (self.sales_tree, str(sale_id),
+                              (sale_id, customer_name, product_name, amount, status, sale_date, sale[6]),
+                              (f'customer{customer_id}',)))
+
+        tk.Button(button_frame, text="💾 Update", command=update_sale,
+                 bg='#f39c12', fg='white', font=('Arial', 10, 'bold')).pack(side='right', padx=5)
+        tk.Button(button_frame, text="❌ Cancel", command=dialog.destroy,
+                 bg='#e74c3c', fg='white', font=('Arial', 10, 'bold')).pack(side='right')
+
+    def delete_sale(self):
+        """Delete selected sale"""
+        selection = self.saved_selection(self.sales_tree, "Please select a sale to delete!")
+        if not selection:
+            return
+
+        sale_id = self.sales_tree.item(selection[0])['values'][0]
+        sale_product = self.sales_tree.item(selection[0])['values'][2]
+
+        if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete sale '{sale_product}'?"):
+            try:
+                sale = self.db.sales.get(sale_id)
+                self.db.sales.delete(sale_id)
+                messagebox.showinfo("Success", "Sale deleted successfully!")
+                self.add_activity(f"Deleted sale: {sale_product}", sale[1] if sale else None)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to delete sale: {str(e)}")
+
+    def refresh_sales(self, search_term=''):
+        """Refresh sales list in treeview based on search and filter"""
+        self.search.cancel('sales')
+        for item in self.sales_tree.get_children():
+            self.sales_tree.delete(item)
+
+        self.sales_search = search_term
+        status_filter = self.sales_filter_var.get()
+        if search_term:
+            self.page_after['sales'] = None
+            self.insert_sale_rows(self.db.sales.list(None if status_filter == 'All' else status_filter, search_term))
+            self.update_row_counts()
+        else:
+            self.page_after['sales'] = 0
+            self.load_next_page('sales')
+
+    def insert_sale_rows(self, sales):
+        for sale in sales:
+            if not self.sales_tree.exists(str(sale[0])):
+                self.sales_tree.insert('', tk.END, iid=str(sale[0]), values=sale[:-1], tags=(f'customer{sale[-1]}',))
+
+    def search_sales(self, *args):
+        """Callback for sales search entry"""
+        term = self.sales_search_var.get()
+        if not term.strip():
+            self.refresh_sales()
+            return
+        status_filter = self.sales_filter_var.get()
+        status = None if status_filter == 'All' else status_filter
+        self.start_search('sales', lambda conn: self.db.repositories(conn).sales.list(status, term), term)
+
+    # Background search
+    SEARCH_DELAY = 250  # ms of typing pause before a search runs
+    SEARCH_POLL = 30  # ms between checks for finished searches
+    SEARCH_CHUNK = 200  # rows inserted per idle tick
+
+    def start_search(self, name, query, term):
+        self.search.submit(name, query, self.SEARCH_DELAY / 1000, context=term)
+        if self.search_poll_job is None:
+            self.search_poll_job = self.root.after(self.SEARCH_POLL, self.poll_search)
+
+    def poll_search(self):
+        """Pick up finished searches on the Tk thread; keeps polling while any are outstanding"""
+        self.search_poll_job = None
+        for result in self.search.results():
+            if result.error is not None:
+                messagebox.showerror("Error", f"Search failed: {str(result.error)}")
+            elif result.name == 'customers':
+                self.customer_search = result.context
+                self.show_search_result(result, self.customers_tree, self.insert_customer_rows)
+            else:
+                self.sales_search = result.context
+                self.show_search_result(result, self.sales_tree, self.insert_sale_rows)
+        if self.search.busy():
+            self.search_poll_job = self.root.after(self.SEARCH_POLL, self.poll_search)
+
+    def show_search_result(self, result, tree, insert_rows):
+        for item in tree.get_children():
+            tree.delete(item)
+        # Ranked matches are already capped, so there are no further pages
+        self.page_after[result.name] = None
+        self.fill_search_chunk(result, insert_rows, 0)
+
+    def fill_search_chunk(self, result, insert_rows, start):
+        """Insert the next SEARCH_CHUNK rows, stopping as soon as a newer search takes over"""
+        if not self.search.is_current(result.name, result.generation):
+            return
+        end = start + self.SEARCH_CHUNK
+        insert_rows(result.rows[start:end])
+        if end < len(result.rows):
+            self.root.after_idle(lambda: self.fill_search_chunk(result, insert_rows, end))
+        else:
+            self.update_row_counts()
+
+    # Task management methods
+    def add_task_dialog(self):
+        """Open dialog to add new task"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Add New Task")
+        dialog.geometry("400x500")
+        dialog.configure(bg='white')
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        dialog.geometry("+%d+%d" % (self.root.winfo_rootx() + 50, self.root.winfo_rooty() + 50))
+
+        tk.Label(dialog, text="Add New Task", font=('Arial', 16, 'bold'), bg='white').pack(pady=20)
+
+        customers = self.db.customers.names()
+        customer_names = [customer[1] for customer in customers]
+        customer_id_map = {customer[1]: customer[0] for customer in customers}
+
+        fields = [
+            ('Customer *', 'customer'),
+            ('Title *', 'title'),
+            ('Due Date (YYYY-MM-DD)', 'due_date')
+        ]
+
+        entries = {}
+
+        # Customer dropdown
+        frame = tk.Frame(dialog, bg='white')
+        frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(frame, text='Customer *', bg='white', font=('Arial', 10)).pack(anchor='w')
+        customer_var = tk.StringVar()
+        customer_combo = ttk.Combobox(frame, textvariable=customer_var, values=customer_names,
+                                     state='readonly', font=('Arial', 10))
+        customer_combo.pack(fill='x', pady=(2, 0))
+        entries['customer'] = customer_combo
+
+        for label, key in fields[1:]:
+            frame = tk.Frame(dialog, bg='white')
+            frame.pack(fill='x', padx=20, pady=5)
+            tk.Label(frame, text=label, bg='white', font=('Arial', 10)).pack(anchor='w')
+            entry = tk.Entry(frame, font=('Arial', 10))
+            entry.pack(fill='x', pady=(2, 0))
+            if key == 'due_date':
+                entry.insert(0, datetime.datetime.now().strftime('%Y-%m-%d'))
+            entries[key] = entry
+
+        # Priority dropdown
+        priority_frame = tk.Frame(dialog, bg='white')
+        priority_frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(priority_frame, text='Priority', bg='white', font=('Arial', 10)).pack(anchor='w')
+        priority_var = tk.StringVar(value='Medium')
+        priority_combo = ttk.Combobox(priority_frame, textvariable=priority_var,
+                                     values=['High', 'Medium', 'Low'], font=('Arial', 10))
+        priority_combo.pack(fill='x', pady=(2, 0))
+
+        # Status dropdown
+        status_frame = tk.Frame(dialog, bg='white')
+        status_frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(status_frame, text='Status', bg='white', font=('Arial', 10)).pack(anchor='w')
+        status_var = tk.StringVar(value='Pending')
+        status_combo = ttk.Combobox(status_frame, textvariable=status_var,
+                                   values=['Pending', 'Completed', 'In Progress'], font=('Arial', 10))
+        status_combo.pack(fill='x', pady=(2, 0))
+
+        # Description
+        desc_frame = tk.Frame(dialog, bg='white')
+        desc_frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(desc_frame, text='Description', bg='white', font=('Arial', 10)).pack(anchor='w')
+        desc_text = tk.Text(desc_frame, height=4, font=('Arial', 10))
+        desc_text.pack(fill='x', pady=(2, 0))
+
+        button_frame = tk.Frame(dialog, bg='white')
+        button_frame.pack(fill='x', padx=20, pady=20)
+
+        def save_task():
+            customer_name = customer_var.get()
+            title = entries['title'].get().strip()
+            due_date = entries['due_date'].get().strip()
+            priority = priority_var.get()
+            status = status_var.get()
+            description = desc_text.get(1.0, tk.END).strip()
+
+            if not customer_name or not title or not due_date:
+                messagebox.showerror("Error", "Customer, Title, and Due Date are required!")
+                return
+
+            customer_id = customer_id_map.get(customer_name)
+            if not customer_id:
+                messagebox.showerror("Error", "Selected customer not found!")
+                return
+
+            try:
+                datetime.datetime.strptime(due_date, '%Y-%m-%d')
+            except ValueError:
+                messagebox.showerror("Error", "Due Date must be in YYYY-MM-DD format!")
+                return
+
+            pending = None
+            if self.page_after.get('tasks') is None and self.tasks_filter_var.get() in ('All', priority):
+                pending = (self.tasks_tree, None, ('…', customer_name, title, priority, status, due_date, today()),
+                           (f'customer{customer_id}',))
+            self.submit_save(dialog,
+                             lambda repos: repos.tasks.add(customer_id, title, description, priority, status, due_date),
+                             lambda _: self.add_activity(f"Added new task: '{title}' for {customer_name}", customer_id),
+                             lambda e: f"Failed to add task: {str(e)}",
+                             pending)
+
+        tk.Button(button_frame, text="💾 Save", command=save_task,
+                 bg='#27ae60', fg='white', font=('Arial', 10, 'bold')).pack(side='right', padx=5)
+        tk.Button(button_frame, text="❌ Cancel", command=dialog.destroy,
+                 bg='#e74c3c', fg='white', font=('Arial', 10, 'bold')).pack(side='right')
+
+    def edit_task_dialog(self):
+        """Edit selected task"""
+        selection = self.saved_selection(self.tasks_tree, "Please select a task to edit!")
+        if not selection:
+            return
+
+        task_id = self.tasks_tree.item(selection[0])['values'][0]
+
+        task = self.db.tasks.get(task_id)
+
+        if not task:
+            messagebox.showerror("Error", "Task not found!")
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Edit Task")
+        dialog.geometry("400x500")
+        dialog.configure(bg='white')
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        tk.Label(dialog, text="Edit Task", font=('Arial', 16, 'bold'), bg='white').pack(pady=20)
+
+        customers = self.db.customers.names()
+        customer_names = [customer[1] for customer in customers]
+        customer_id_map = {customer[1]: customer[0] for customer in customers}
+        customer_name_from_id = {customer[0]: customer[1] for customer in customers}
+
+        current_customer_name = customer_name_from_id.get(task[1])
+
+        fields = [
+            ('Customer *', 'customer', current_customer_name),
+            ('Title *', 'title', task[2]),
+            ('Due Date (YYYY-MM-DD)', 'due_date', task[6])
+        ]
+
+        entries = {}
+
+        # Customer dropdown
+        frame = tk.Frame(dialog, bg='white')
+        frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(frame, text='Customer *', bg='white', font=('Arial', 10)).pack(anchor='w')
+        customer_var = tk.StringVar(value=current_customer_name)
+        customer_combo = ttk.Combobox(frame, textvariable=customer_var, values=customer_names,
+                                     state='readonly', font=('Arial', 10))
+        customer_combo.pack(fill='x', pady=(2, 0))
+        entries['customer'] = customer_combo
+
+        for label, key, value in fields[1:]:
+            frame = tk.Frame(dialog, bg='white')
+            frame.pack(fill='x', padx=20, pady=5)
+            tk.Label(frame, text=label, bg='white', font=('Arial', 10)).pack(anchor='w')
+            entry = tk.Entry(frame, font=('Arial', 10))
+            entry.pack(fill='x', pady=(2, 0))
+            entry.insert(0, value)
+            entries[key] = entry
+
+        # Priority dropdown
+        priority_frame = tk.Frame(dialog, bg='white')
+        priority_frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(priority_frame, text='Priority', bg='white', font=('Arial', 10)).pack(anchor='w')
+        priority_var = tk.StringVar(value=task[4])
+        priority_combo = ttk.Combobox(priority_frame, textvariable=priority_var,
+                                     values=['High', 'Medium', 'Low'], font=('Arial', 10))
+        priority_combo.pack(fill='x', pady=(2, 0))
+
+        # Status dropdown
+        status_frame = tk.Frame(dialog, bg='white')
+        status_frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(status_frame, text='Status', bg='white', font=('Arial', 10)).pack(anchor='w')
+        status_var = tk.StringVar(value=task[5])
+        status_combo = ttk.Combobox(status_frame, textvariable=status_var,
+                                   values=['Pending', 'Completed', 'In Progress'], font=('Arial', 10))
+        status_combo.pack(fill='x', pady=(2, 0))
+
+        # Description
+        desc_frame = tk.Frame(dialog, bg='white')
+        desc_frame.pack(fill='x', padx=20, pady=5)
+        tk.Label(desc_frame, text='Description', bg='white', font=('Arial', 10)).pack(anchor='w')
+        desc_text = tk.Text(desc_frame, height=4, font=('Arial', 10))
+        desc_text.pack(fill='x', pady=(2, 0))
+        if task[3]:
+            desc_text.insert(1.0, task[3])
+
+        button_frame = tk.Frame(dialog, bg='white')
+        button_frame.pack(fill='x', padx=20, pady=20)
+
+        def update_task():
+            customer_name = customer_var.get()
+            title = entries['title'].get().strip()
+            due_date = entries['due_date'].get().strip()
+            priority = priority_var.get()
+            status = status_var.get()
+            description = desc_text.get(1.0, tk.END).strip()
+
+            if not customer_name or not title or not due_date:
+                messagebox.showerror("Error", "Customer, Title, and Due Date are required!")
+                return
+
+            customer_id = customer_id_map.get(customer_name)
+            if not customer_id:
+                messagebox.showerror("Error", "Selected customer not found!")
+                return
+
+            try:
+                datetime.datetime.strptime(due_date, '%Y-%m-%d')
+            except ValueError:
+                messagebox.showerror("Error", "Due Date must be in YYYY-MM-DD format!")
+                return
+
+            self.submit_save(dialog,
+                             lambda repos: repos.tasks.update(task_id, customer_id, title, description, priority,
+                                                              status, due_date),
+                             lambda _: self.add_activity(f"Updated task: '{title}' for {customer_name}", customer_id),
+                             lambda e: f"Failed to update task: {str(e)}",
+                             (self.tasks_tree, str(task_id),
+                              (task_id, customer_name, title, priority, status, due_date, task[7]),
+                              (f'customer{customer_id}',)))
+
+        tk.Button(button_frame, text="💾 Update", command=update_task,
+                 bg='#f39c12', fg='white', font=('Arial', 10, 'bold')).pack(side='right', padx=5)
+        tk.Button(button_frame, text="❌ Cancel", command=dialog.destroy,
+                 bg='#e74c3c', fg='white', font=('Arial', 10, 'bold')).pack(side='right')
+
+    def delete_task(self):
+        """Delete selected task"""
+        selection = self.saved_selection(self.tasks_tree, "Please select a task to delete!")
+        if not selection:
+            return
+
+        task_id = self.tasks_tree.item(selection[0])['values'][0]
+        task_title = self.tasks_tree.item(selection[0])['values'][2]
+
+        if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete task '{task_title}'?"):
+            try:
+                task = self.db.tasks.get(task_id)
+                self.db.tasks.delete(task_id)
+                messagebox.showinfo("Success", "Task deleted successfully!")
+                self.add_activity(f"Deleted task: '{task_title}'", task[1] if task else None)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to delete task: {str(e)}")
+
+    def complete_task(self):
+        """Mark selected task as completed"""
+        selection = self.saved_selection(self.tasks_tree, "Please select a task to mark as complete!")
+        if not selection:
+            return
+
+        task_id = self.tasks_tree.item(selection[0])['values'][0]
+        task_title = self.tasks_tree.item(selection[0])['values'][2]
+
+        try:
+            self.db.tasks.complete(task_id)
+            messagebox.showinfo("Success", f"Task '{task_title}' marked as completed!")
+            task = self.db.tasks.get(task_id)
+            self.add_activity(f"Completed task: '{task_title}'", task[1] if task else None)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to mark task complete: {str(e)}")
+
+    def refresh_tasks(self):
+        """Refresh tasks list in treeview based on filter"""
+        for item in self.tasks_tree.get_children():
+            self.tasks_tree.delete(item)
+
+        self.page_after['tasks'] = 0
+        self.load_next_page('tasks')
+
+    def insert_task_rows(self, tasks):
+        for task in tasks:
+            if not self.tasks_tree.exists(str(task[0])):
+                self.tasks_tree.insert('', tk.END, iid=str(task[0]), values=task[:-1], tags=(f'customer{task[-1]}',))
+
+    # Background saves
+    SAVE_POLL = 30  # ms between checks for finished saves
+
+    def submit_save(self, dialog, write, on_saved, error_text, pending=None):
+        """Run write(repos) on the save worker and take the dialog down straight away.
+
+        pending is (tree, iid, values[, tags]): the row to show until the
+        save lands, iid None for a new row. Once the write finishes the
+        row is put back and the committed Changes applied in its place.
+        On success the dialog is destroyed and on_saved(result) runs; on
+        failure the dialog comes back, still filled in, with error_text(error).
+        """
+        undo = self.show_pending_row(*pending) if pending else None
+        dialog.grab_release()
+        dialog.withdraw()
+        self.saves.submit(write, (dialog, on_saved, error_text, undo))
+        if self.save_poll_job is None:
+            self.save_poll_job = self.root.after(self.SAVE_POLL, self.poll_saves)
+
+    def saved_selection(self, tree, warning):
+        """tree's selected iids; empty, after a warning, if none are or one is still being saved"""
+        selection = tree.selection()
+        if not selection:
+            messagebox.showwarning("Warning", warning)
+            return ()
+        # Pending rows have no database id yet (pending<n> iids) or are about to change
+        if any('pending' in tree.item(iid).get('tags', ()) for iid in selection):
+            messagebox.showwarning("Warning", "Please wait until the selected row has been saved.")
+            return ()
+        return selection
+
+    def show_pending_row(self, tree, iid, values, tags=()):
+        """Show values greyed out until the save lands; returns what puts the row back, or None"""
+        tree.tag_configure('pending', foreground='#95a5a6')
+        if iid is None:
+            iid = f'pending{next(self.pending_ids)}'
+            tree.insert('', tk.END, iid=iid, values=values, tags=tuple(tags) + ('pending',))
+
+            def undo():
+                if tree.exists(iid):
+                    tree.delete(iid)
+            return undo
+        if not tree.exists(iid):
+            return None
+        previous = tree.item(iid)
+        tree.item(iid, values=values, tags=tuple(tags) + ('pending',))
+
+        def undo():
+            if tree.exists(iid):
+                tree.item(iid, values=previous['values'], tags=previous.get('tags', ()))
+        return undo
+
+    def poll_saves(self):
+        """Settle finished saves on the Tk thread; keeps polling while any are outstanding"""
+        self.save_poll_job = None
+        for result in self.saves.results():
+            dialog, on_saved, error_text, undo = result.context
+            if undo is not None:
+                undo()
+            for change in result.changes:
+                self.db.publish(change)
+            if result.error is None:
+                dialog.destroy()
+                on_saved(result.value)
+            else:
+                dialog.deiconify()
+                dialog.grab_set()
+                messagebox.showerror("Error", error_text(result.error), parent=dialog)
+        if self.saves.busy():
+            self.save_poll_job = self.root.after(self.SAVE_POLL, self.poll_saves)
+
+    # Keyset paging
+    def fetch_page(self, name, after_id):
+        """Next page of rows for a tree, with its current filter applied in SQL"""
+        if name == 'customers':
+            return self.db.customers.page(after_id)
+        if name == 'sales':
+            status_filter = self.sales_filter_var.get()
+            return self.db.sales.page(None if status_filter == 'All' else status_filter, after_id)
+        priority_filter = self.tasks_filter_var.get()
+        return self.db.tasks.page(None if priority_filter == 'All' else priority_filter, after_id)
+
+    def load_next_page(self, name):
+        self.page_jobs.discard(name)
+        after_id = self.page_after.get(name)
+        if after_id is None:
+            return
+        rows = self.fetch_page(name, after_id)
+        {'customers': self.insert_customer_rows,
+         'sales': self.insert_sale_rows,
+         'tasks': self.insert_task_rows}[name](rows)
+        self.page_after[name] = rows[-1][0] if len(rows) == PAGE_SIZE else None
+        self.update_row_counts()
+
+    def paged_scroll(self, name, scrollbar):
+        """yscrollcommand that also loads the next page once the view nears the end"""
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            if (float(last) > 0.9 and self.page_after.get(name) is not None
+                    and name not in self.page_jobs):
+                self.page_jobs.add(name)
+                self.root.after_idle(lambda: self.load_next_page(name))
+        return on_scroll
+
+    def row_loaded(self, name, row_id):
+        """False for rows past the loaded pages; they arrive with a later page instead"""
+        after_id = self.page_after.get(name)
+        return after_id is None or row_id <= after_id
+
+    def update_row_counts(self):
+        """Loaded rows against the totals DashboardStats already keeps, no COUNT(*) needed"""
+        status_filter = self.sales_filter_var.get()
+        priority_filter = self.tasks_filter_var.get()
+        totals = {
+            'customers': None if self.customer_search else self.stats.total_customers,
+            'sales': None if self.sales_search else self.stats.sales_count(
+                None if status_filter == 'All' else status_filter),
+            'tasks': self.stats.tasks_count(None if priority_filter == 'All' else priority_filter),
+        }
+        trees = {'customers': self.customers_tree, 'sales': self.sales_tree, 'tasks': self.tasks_tree}
+        for name, label in self.row_count_labels.items():
+            shown = len(trees[name].get_children())
+            if totals[name] is None:
+                label.config(text=f"{shown:,} best matches")
+            else:
+                label.config(text=f"Showing {shown:,} of {totals[name]:,}")
+
+    # Data refresh methods
+    def refresh_all_data(self):
+        """Refresh data in all tabs"""
+        self.stats.load()
+        self.reminders.load(self.db.tasks, today())
+        self.refresh_customers()
+        self.refresh_sales()
+        self.refresh_tasks()
+        self.refresh_dashboard()
+        self.refresh_analytics()
+        self.update_header_stats()
+
+    # Incremental updates
+    # Counter-driven views that each table's changes can move
+    VIEWS_BY_TABLE = {
+        'customers': ('header', 'kpis', 'status_chart', 'row_counts'),
+        'sales': ('header', 'kpis', 'sales_chart', 'row_counts'),
+        'tasks': ('header', 'kpis', 'row_counts'),
+    }
+
+    def on_data_changed(self, change):
+        """Apply one committed row change to just the views that show it"""
+        if change.table == 'customers':
+            self.apply_customer_change(change)
+        elif change.table == 'sales':
+            self.apply_sale_change(change)
+        elif change.table == 'tasks':
+            self.apply_task_change(change)
+            if self.reminders.apply(change):
+                self.schedule_reminders()
+        elif change.table == 'interactions':
+            self.apply_interaction_change(change)
+        if self.stats.apply(change):
+            self.schedule_view_refresh(*self.VIEWS_BY_TABLE[change.table])
+
+    def schedule_view_refresh(self, *views):
+        """Redraw the given views once, on the next idle tick, however many changes arrive"""
+        self.dirty_views.update(views)
+        if self.view_refresh_job is None:
+            self.view_refresh_job = self.root.after_idle(self.flush_view_refresh)
+
+    def flush_view_refresh(self):
+        self.view_refresh_job = None
+        views, self.dirty_views = self.dirty_views, set()
+        if 'header' in views:
+            self.update_header_stats()
+        if 'kpis' in views:
+            self.update_kpis()
+        if 'sales_chart' in views:
+            self.draw_sales_chart()
+        if 'status_chart' in views:
+            self.draw_customer_status_chart()
+        if 'row_counts' in views:
+            self.update_row_counts()
+
+    def apply_interaction_change(self, change):
+        entry = self.activity_feed.apply(change)
+        if entry is not None:
+            self.activities_listbox.insert(0, self.activity_line(entry))
+            self.activities_listbox.delete(self.activity_feed.size, tk.END)
+
+    def apply_customer_change(self, change):
+        row = change.new
+        values = None
+        if (row is not None and self.row_loaded('customers', change.row_id)
+                and fts_matches(self.customer_search, row[1], row[2], row[4], row[8])):
+            values = (row[0], row[1], row[2], row[3], row[4], row[6], row[7])
+        self.upsert_tree_row(self.customers_tree, change.row_id, values)
+
+        # Sales and task rows show the customer's name
+        if change.op == 'update' and change.old[1] != row[1]:
+            if self.sales_search:
+                self.refresh_sales(self.sales_search_var.get())
+            else:
+                self.rename_customer_rows(self.sales_tree, change.row_id, row[1])
+            self.rename_customer_rows(self.tasks_tree, change.row_id, row[1])
+
+    def apply_sale_change(self, change):
+        row = change.new
+        values = None
+        if row is not None and self.row_loaded('sales', change.row_id):
+            status_filter = self.sales_filter_var.get()
+            customer = self.db.customers.get(row[1])
+            if (customer is not None and status_filter in ('All', row[4])
+                    and (fts_matches(self.sales_search, customer[1])
+                         or fts_matches(self.sales_search, row[2]))):
+                values = (row[0], customer[1], row[2], row[3], row[4], row[5], row[6])
+        self.upsert_tree_row(self.sales_tree, change.row_id, values, f'customer{row[1]}' if row else None)
+
+    def apply_task_change(self, change):
+        row = change.new
+        values = None
+        if row is not None and self.row_loaded('tasks', change.row_id):
+            priority_filter = self.tasks_filter_var.get()
+            customer = self.db.customers.get(row[1])
+            if customer is not None and priority_filter in ('All', row[4]):
+                values = (row[0], customer[1], row[2], row[4], row[5], row[6], row[7])
+        self.upsert_tree_row(self.tasks_tree, change.row_id, values, f'customer{row[1]}' if row else None)
+
+    def upsert_tree_row(self, tree, row_id, values, tag=None):
+        """Insert, update or (when values is None) remove the row for row_id"""
+        iid = str(row_id)
+        tags = (tag,) if tag else ()
+        if values is None:
+            if tree.exists(iid):
+                tree.delete(iid)
+        elif tree.exists(iid):
+            tree.item(iid, values=values, tags=tags)
+        else:
+            tree.insert('', tk.END, iid=iid, values=values, tags=tags)
+
+    def rename_customer_rows(self, tree, customer_id, name):
+        for iid in tree.tag_has(f'customer{customer_id}'):
+            values = list(tree.item(iid, 'values'))
+            values[1] = name
+            tree.item(iid, values=values)
+
+    def update_header_stats(self):
+        """Update the quick stats in the header and dashboard"""
+        stats_data = {
+            'Total Customers': self.stats.total_customers,
+            'Total Revenue': f"${self.stats.revenue('Completed'):,.2f}",
+            'Pending Tasks': self.stats.open_tasks
+        }
+
+        due = self.reminders.due_count
+        self.reminder_label.config(text=f"⏰ {due:,} due" if due else '')
+
+        # Widgets are built once; later calls only change their text
+        if self.header_stat_labels:
+            for label, value in stats_data.items():
+                self.header_stat_labels[label].config(text=value)
+                self.dashboard_stat_labels[label].config(text=value)
+            return
+
+        # Header stats
+        for i, (label, value) in enumerate(stats_data.items()):
+            frame = tk.Frame(self.stats_frame, bg='#2c3e50')
+            frame.pack(side='left', padx=10)
+            tk.Label(frame, text=label, fg='white', bg='#2c3e50', font=('Arial', 9)).pack()
+            value_label = tk.Label(frame, text=value, fg='#3498db', bg='#2c3e50', font=('Arial', 12, 'bold'))
+            value_label.pack()
+            self.header_stat_labels[label] = value_label
+
+        # Dashboard stats
+        # Create a grid layout for dashboard stats
+        col_width = 1 / 3
+        for i, (label, value) in enumerate(stats_data.items()):
+            # Arrange in a 3-column grid
+            row = i // 3
+            col = i % 3
+            stat_block = tk.Frame(self.dashboard_stats, bg='white', padx=15, pady=10, relief='groove', bd=1)
+            stat_block.grid(row=row, column=col, padx=10, pady=10, sticky='ew')
+
+            tk.Label(stat_block, text=label, font=('Arial', 12), bg='white', fg='#555').pack(pady=(0, 5))
+            value_label = tk.Label(stat_block, text=value, font=('Arial', 18, 'bold'), bg='white', fg='#2c3e50')
+            value_label.pack()
+            self.dashboard_stat_labels[label] = value_label
+
+        self.dashboard_stats.grid_columnconfigure(0, weight=1)
+        self.dashboard_stats.grid_columnconfigure(1, weight=1)
+        self.dashboard_stats.grid_columnconfigure(2, weight=1)
+
+    def refresh_dashboard(self):
+        """Show the recent activities; ActivityFeed already holds them, no query needed"""
+        self.activities_listbox.delete(0, tk.END)
+        for entry in self.activity_feed.entries:
+            self.activities_listbox.insert(tk.END, self.activity_line(entry))
+
+    @staticmethod
+    def activity_line(entry):
+        """Listbox text for an ActivityFeed entry"""
+        return f"{entry[4]}: {entry[3]}"
+
+    def add_activity(self, activity_desc, customer_id=None):
+        """Log an activity to the interactions table, on the customer's timeline if given.
+
+        The dashboard list picks it up from the Change, see apply_interaction_change.
+        """
+        current_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            self.db.interactions.add(customer_id, 'Activity', activity_desc, current_time)
+        except sqlite3.OperationalError:
+            # Locked by an import batch; show it now rather than lose it
+            self.activities_listbox.insert(0, f"{current_time}: {activity_desc}")
+
+    REMINDER_MAX_WAIT = 60 * 60 * 1000  # ms; re-check hourly in case the clock jumps
+    REMINDERS_LISTED = 10  # due tasks announced one by one before summing up the rest
+
+    def schedule_reminders(self):
+        """Wake up when the earliest upcoming due date arrives"""
+        if self.reminder_job is not None:
+            self.root.after_cancel(self.reminder_job)
+        delay = self.REMINDER_MAX_WAIT
+        next_due = self.reminders.next_due()
+        if next_due is not None:
+            try:
+                wait = datetime.datetime.strptime(next_due, '%Y-%m-%d') - datetime.datetime.now()
+                delay = min(delay, max(0, int(wait.total_seconds() * 1000)))
+            except ValueError:
+                pass  # Not a plain date; the hourly check still compares it as text
+        self.reminder_job = self.root.after(delay, self.check_reminders)
+
+    def check_reminders(self):
+        """Announce the tasks whose due date has arrived; reads only the announced rows"""
+        self.reminder_job = None
+        reached = self.reminders.pop_due(today())
+        for task_id in reached[:self.REMINDERS_LISTED]:
+            task = self.db.tasks.get(task_id)
+            if task is not None:
+                self.add_activity(f"⏰ Task due: '{task[2]}' ({task[4]} priority)", task[1])
+                if task[4] == 'High':
+                    self.root.bell()
+        if len(reached) > self.REMINDERS_LISTED:
+            self.add_activity(f"⏰ ...and {len(reached) - self.REMINDERS_LISTED:,} more tasks due today")
+        if reached:
+            self.schedule_view_refresh('header')
+        self.schedule_reminders()
+
+    def refresh_analytics(self):
+        """Generate and display charts and KPIs"""
+        self.draw_sales_chart()
+        self.draw_customer_status_chart()
+        self.update_kpis()
+
+    # Range presets for the sales chart, in days back from today
+    CHART_RANGES = {'Last week': 7, 'Last month': 31, 'Last 3 months': 92, 'Last 6 months': 183,
+                    'Last year': 365, 'Last 2 years': 730, 'Last 5 years': 1826, 'Last 10 years': 3652}
+    CHART_MAX_BARS = 60
+
+    def chart_granularity(self, days: int) -> str:
+        """Bucket size picked in the By box, or for Auto the finest that keeps the chart readable"""
+        chosen = self.chart_bucket_var.get().lower()
+        if chosen in GRANULARITIES:
+            return chosen
+        if days <= 92:
+            return 'day'
+        if days <= 730:
+            return 'week'
+        return 'month' if days <= 3652 else 'quarter'
+
+    def draw_sales_chart(self):
+        """Completed sales over the chosen range, read from the rollup tables"""
+        days = self.CHART_RANGES.get(self.chart_range_var.get(), 183)
+        last = datetime.date.today()
+        first = last - datetime.timedelta(days=days - 1)
+        granularity = self.chart_granularity(days)
+        customer = self.chart_customer_var.get().strip()
+        customer_ids = self.db.customers.ids_named(customer) if customer else None
+        totals = self.db.sales.range_totals(granularity, first, last, product=self.chart_product_var.get().strip(),
+                                            customer_ids=customer_ids)
+        self.sales_chart_title.config(text=f"💰 Sales by {granularity} - {self.chart_range_var.get()}")
+        if len(totals) <= self.CHART_MAX_BARS:
+            self.sales_line_chart.clear()
+            self.sales_chart.set_data([bucket_key(granularity, start) for start, _, _ in totals],
+                                      [amount for _, _, amount in totals])
+        else:
+            self.sales_chart.clear()
+            self.sales_line_chart.set_data([(start.toordinal(), amount) for start, _, amount in totals])
+
+    def draw_customer_status_chart(self):
+        """Pie chart for customer status distribution"""
+        status_data = self.stats.status_counts()
+        self.customer_status_chart.set_data([status or 'Unknown' for status, _ in status_data],
+                                            [count for _, count in status_data])
+
+    def update_kpis(self):
+        """Update Key Performance Indicators"""
+        active_customers = self.stats.customers_by_status.get('Active', 0)
+        total_sales_count = self.stats.total_sales
+        gross_sales = self.stats.gross_sales
+        completed_tasks = self.stats.tasks_by_status.get('Completed', 0)
+        total_tasks = self.stats.total_tasks
+
+        task_completion_rate = (completed_tasks / total_tasks) * 100 if total_tasks > 0 else 0
+
+        kpis = {
+            'Active Customers': active_customers,
+            'Total Sales Transactions': total_sales_count,
+            'Gross Sales Value': f"${gross_sales:,.2f}",
+            'Task Completion Rate': f"{task_completion_rate:.1f}%"
+        }
+
+        if self.kpi_labels:
+            for label, value in kpis.items():
+                self.kpi_labels[label].config(text=value)
+            return
+
+        for i, (label, value) in enumerate(kpis.items()):
+            kpi_block = tk.Frame(self.kpi_frame, bg='white', padx=15, pady=10, relief='solid', bd=1, highlightbackground='#ccc', highlightthickness=1)
+            kpi_block.grid(row=0, column=i, padx=10, pady=10, sticky='ew')
+
+            tk.Label(kpi_block, text=label, font=('Arial', 11, 'bold'), bg='white', fg='#34495e').pack(pady=(0, 5))
+            value_label = tk.Label(kpi_block, text=value, font=('Arial', 16), bg='white', fg='#2c3e50')
+            value_label.pack()
+            self.kpi_labels[label] = value_label
+
+        for i in range(len(kpis)):
+            self.kpi_frame.grid_columnconfigure(i, weight=1)
+
+    def export_report(self):
+        """Export CRM data as JSON, JSON Lines or CSV (optionally gzipped) in the background"""
+        if self.local_only("Export"):
+            return
+        filepath = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[
+            ("JSON files", "*.json"), ("JSON Lines", "*.jsonl"), ("CSV files (one per table)", "*.csv"),
+            ("Gzipped JSON Lines", "*.jsonl.gz"), ("Gzipped CSV", "*.csv.gz"), ("All files", "*.*")])
+
+        if not filepath:
+            return
+
+        job = ExportJob(self.db.path, filepath, connections=self.db.connections).start()
+
+        window = tk.Toplevel(self.root)
+        window.title("Exporting")
+        window.geometry("360x130")
+        window.transient(self.root)
+
+        status_label = tk.Label(window, text="Counting rows...", font=('Arial', 10))
+        status_label.pack(pady=(15, 5))
+        progress = ttk.Progressbar(window, length=300, mode='determinate')
+        progress.pack(pady=5)
+        tk.Button(window, text="Cancel", command=job.cancel, bg='#e74c3c', fg='white').pack(pady=5)
+        window.protocol("WM_DELETE_WINDOW", job.cancel)
+
+        self.root.after(100, lambda: self.poll_export(job, window, progress, status_label))
+
+    def poll_export(self, job, window, progress, status_label):
+        """Mirror the worker's progress until it finishes, then report the outcome"""
+        if not job.finished:
+            if job.total:
+                progress.config(maximum=job.total, value=job.done)
+                status_label.config(text=f"{job.done:,} of {job.total:,} rows")
+            self.root.after(100, lambda: self.poll_export(job, window, progress, status_label))
+            return
+
+        window.destroy()
+        if job.error is not None:
+            messagebox.showerror("Export Error", f"Failed to export data: {str(job.error)}")
+        elif job.cancelled:
+            messagebox.showinfo("Export Cancelled", "Export cancelled; no file was written.")
+        else:
+            files = ', '.join(job.outputs)
+            messagebox.showinfo("Export Successful", f"{job.done:,} rows exported to {files}")
+            self.add_activity(f"Exported CRM data to {job.filepath}")
+
+    def import_data(self):
+        """Bulk import customers, sales or tasks from CSV or JSON Lines in the background"""
+        if self.local_only("Import"):
+            return
+        filepath = filedialog.askopenfilename(filetypes=[
+            ("CSV or JSON Lines", "*.csv *.jsonl *.csv.gz *.jsonl.gz"), ("All files", "*.*")])
+
+        if not filepath:
+            return
+
+        try:
+            job = ImportJob(self.db.path, filepath)
+            if job.format == 'csv' and job.table is None:
+                messagebox.showerror("Import Error", "Name the CSV file after its table, "
+                                                     "e.g. customers.csv, sales.csv or tasks.csv.")
+                return
+            job.start()
+        except Exception as e:
+            messagebox.showerror("Import Error", f"Failed to import data: {str(e)}")
+            return
+
+        window = tk.Toplevel(self.root)
+        window.title("Importing")
+        window.geometry("360x130")
+        window.transient(self.root)
+
+        status_label = tk.Label(window, text="Reading...", font=('Arial', 10))
+        status_label.pack(pady=(15, 5))
+        progress = ttk.Progressbar(window, length=300, mode='determinate', maximum=max(job.bytes_total, 1))
+        progress.pack(pady=5)
+        tk.Button(window, text="Cancel", command=job.cancel, bg='#e74c3c', fg='white').pack(pady=5)
+        window.protocol("WM_DELETE_WINDOW", job.cancel)
+
+        self.root.after(100, lambda: self.poll_import(job, window, progress, status_label))
+
+    def poll_import(self, job, window, progress, status_label):
+        """Mirror the importer's progress, then reload every view from the new data"""
+        if not job.finished:
+            progress.config(value=job.bytes_read)
+            status_label.config(text=f"{job.done:,} rows, {job.rejected:,} rejected ({job.rate:,.0f} rows/s)")
+            self.root.after(100, lambda: self.poll_import(job, window, progress, status_label))
+            return
+
+        window.destroy()
+        # The importer writes through its own connection, so no change events were sent
+        self.refresh_all_data()
+        summary = f"{job.done:,} rows imported in {job.elapsed:.1f} s ({job.rate:,.0f} rows/s)"
+        if job.rejected:
+            summary += f"\n{job.rejected:,} rows rejected, see {job.error_path}"
+        if job.error is not None:
+            messagebox.showerror("Import Error", f"Failed to import data: {str(job.error)}\n{summary}")
+        else:
+            messagebox.showinfo("Import Cancelled" if job.cancelled else "Import Finished", summary)
+        if job.done:
+            self.add_activity(f"Imported {job.done:,} rows from {job.filepath}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description='Advanced CRM System')
+    parser.add_argument('--server', default=os.environ.get('CRM_SERVER'),
+                        help='crm_server URL, e.g. http://crm-host:8765 (default $CRM_SERVER); '
+                             'without it crm_database.db is opened directly')
+    parser.add_argument('--token', default=os.environ.get('CRM_SERVER_TOKEN'))
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    try:
+        app = CRMApp(root, args.server, args.token)
+    except ServerUnavailable as e:
+        root.withdraw()
+        messagebox.showerror("Server Unavailable", str(e))
+        raise SystemExit(1)
+    try:
+        root.mainloop()
+    finally:
+        app.search.close()
+        app.saves.close()
+        app.db.close()
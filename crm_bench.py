@@ -0,0 +1,600 @@
+import datetime
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from crm_export import ExportJob
+from crm_import import CUSTOMER_STATUSES, SALE_STATUSES, TASK_PRIORITIES, TASK_STATUSES, insert_rows
+from crm_repository import Change, CRMDatabase, CustomerRepo, DashboardStats, SalesRepo, today
+
+# =================== DATA GENERATOR ===================
+
+FIRST_NAMES = ('James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David',
+               'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah',
+               'Charles', 'Karen', 'Daniel', 'Lisa', 'Matthew', 'Nancy', 'Anthony', 'Sandra', 'Mark', 'Ashley',
+               'Steven', 'Emily', 'Paul', 'Michelle', 'Andrew', 'Amanda', 'Kevin', 'Melissa', 'Brian', 'Laura',
+               'Wei', 'Priya', 'Ahmed', 'Sofia', 'Lucas', 'Yuki', 'Olga', 'Mateo', 'Fatima', 'Noah')
+LAST_NAMES = ('Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez',
+              'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore',
+              'Jackson', 'Martin', 'Lee', 'Perez', 'Thompson', 'White', 'Harris', 'Sanchez', 'Clark', 'Lewis',
+              'Robinson', 'Walker', 'Young', 'Allen', 'King', 'Wright', 'Scott', 'Nguyen', 'Hill', 'Green',
+              'Adams', 'Baker', 'Nelson', 'Carter', 'Mitchell', 'Chen', 'Patel', 'Kim', 'Novak', 'Schmidt')
+COMPANY_WORDS = ('Acme', 'Globex', 'Initech', 'Umbrella', 'Stark', 'Wayne', 'Hooli', 'Vandelay', 'Soylent',
+                 'Cyberdyne', 'Tyrell', 'Wonka', 'Aperture', 'Oscorp', 'Gringotts', 'Massive', 'Pied Piper',
+                 'Northwind', 'Contoso', 'Fabrikam', 'Blue Sky', 'Summit', 'Pinnacle', 'Evergreen')
+COMPANY_SUFFIXES = ('Inc', 'LLC', 'Ltd', 'Group', 'Consulting', 'Systems', 'Partners', 'Holdings')
+EMAIL_DOMAINS = ('gmail.com', 'yahoo.com', 'outlook.com', 'hotmail.com', 'icloud.com')
+# (product, typical amount), most popular first
+PRODUCTS = (('Support Plan', 99.0), ('Software License', 499.0), ('Laptop', 1200.0), ('Monitor', 250.0),
+            ('Consulting Hours', 900.0), ('Training Session', 350.0), ('Cloud Storage', 60.0),
+            ('Server', 4500.0), ('Keyboard', 45.0), ('Network Switch', 800.0), ('Tablet', 600.0),
+            ('Installation', 150.0), ('Enterprise Suite', 12000.0), ('Headset', 80.0), ('Printer', 320.0))
+TASK_TITLES = ('Follow up call', 'Send proposal', 'Schedule demo', 'Renewal reminder', 'Send invoice',
+               'Check satisfaction', 'Prepare quote', 'Onboarding meeting', 'Collect feedback', 'Contract review')
+# (type, weight, description)
+INTERACTION_TYPES = (('Email', 45, 'Sent product information'), ('Call', 30, 'Discussed requirements'),
+                     ('Meeting', 15, 'Quarterly review'), ('Note', 10, 'Prefers contact by email'))
+# Busier towards the year end, quieter over the summer
+MONTH_WEIGHTS = (0.9, 0.85, 1.0, 1.0, 1.0, 0.9, 0.75, 0.7, 1.0, 1.1, 1.3, 1.5)
+
+INTERACTIONS_SQL = 'INSERT INTO interactions (customer_id, type, description, date) VALUES (?, ?, ?, ?)'
+
+class DataGenerator:
+    """Fills a CRM database with synthetic customers, sales, tasks and interactions.
+
+    The shapes follow a typical small-business CRM rather than uniform noise:
+    customers are mostly Active; a few customers account for most sales,
+    tasks and interactions (Pareto weights); products are Zipf-popular with
+    log-normal amounts around their typical price; sale and interaction
+    dates lean towards weekdays and the year end; task due dates cluster
+    around today, with overdue tasks mostly completed. The same seed
+    gives the same rows (dates are relative to the day it runs).
+
+    Rows go in with crm_import.insert_rows, batch_size rows per transaction,
+    so the FTS index and summary tables end up as after any import.
+    """
+
+    def __init__(self, customers: int = 100000, sales: Optional[int] = None, tasks: Optional[int] = None,
+                 interactions: Optional[int] = None, years: int = 5, seed: int = 42, batch_size: int = 50000):
+        self.customers = customers
+        self.sales = customers * 3 if sales is None else sales
+        self.tasks = customers if tasks is None else tasks
+        self.interactions = customers * 4 if interactions is None else interactions
+        self.years = years
+        self.seed = seed
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.last_day = datetime.date.today()
+        self.days = [self.last_day - datetime.timedelta(days=offset) for offset in range(365 * years)][::-1]
+        self.day_weights = list(itertools.accumulate(
+            MONTH_WEIGHTS[day.month - 1] * (0.35 if day.weekday() >= 5 else 1.0) for day in self.days))
+
+    def generate(self, path: str) -> Dict[str, int]:
+        """Add the rows to the database at path (created if missing); returns rows added per table"""
+        db = CRMDatabase(path)
+        try:
+            conn = db.conn
+            first_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM customers').fetchone()[0]
+            self._insert(conn, 'customers', self.customer_rows(first_id))
+            ids = [row[0] for row in conn.execute('SELECT id FROM customers WHERE id > ?', (first_id,))]
+            weights = list(itertools.accumulate(self.random.paretovariate(1.16) for _ in ids))
+            self._insert(conn, 'sales', self.sale_rows(ids, weights))
+            self._insert(conn, 'tasks', self.task_rows(ids, weights))
+            self._insert(conn, 'interactions', self.interaction_rows(ids, weights))
+            conn.execute('ANALYZE')
+        finally:
+            db.close()
+        return {'customers': self.customers, 'sales': self.sales, 'tasks': self.tasks,
+                'interactions': self.interactions}
+
+    def customer_rows(self, first_id: int = 0) -> Iterator[tuple]:
+        rnd = self.random
+        for number in range(first_id + 1, first_id + self.customers + 1):
+            first, last = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+            if rnd.random() < 0.6:
+                company = f'{rnd.choice(COMPANY_WORDS)} {rnd.choice(COMPANY_SUFFIXES)}'
+                domain = company.split()[0].lower() + '.com'
+            else:
+                company, domain = '', rnd.choice(EMAIL_DOMAINS)
+            phone = f'({rnd.randint(200, 989)}) {rnd.randint(200, 999)}-{rnd.randint(0, 9999):04d}' \
+                if rnd.random() < 0.7 else ''
+            address = f'{rnd.randint(1, 9999)} {rnd.choice(LAST_NAMES)} St' if rnd.random() < 0.5 else ''
+            status = rnd.choices(CUSTOMER_STATUSES, (65, 15, 20))[0]
+            notes = 'Key account' if rnd.random() < 0.05 else ''
+            # The number keeps emails unique however many rows are generated
+            yield (f'{first} {last}', f'{first.lower()}.{last.lower()}{number}@{domain}', phone, company,
+                   address, status, self._day().isoformat(), notes)
+
+    def sale_rows(self, ids: Sequence[int], weights: Sequence[float]) -> Iterator[tuple]:
+        rnd = self.random
+        product_weights = [1 / rank for rank in range(1, len(PRODUCTS) + 1)]
+        for customer_id in self._customers(ids, weights, self.sales):
+            product, price = rnd.choices(PRODUCTS, product_weights)[0]
+            amount = round(price * rnd.lognormvariate(0, 0.35), 2)
+            sale_date = self._day()
+            # Recent sales are the ones still open
+            age = (self.last_day - sale_date).days
+            status = rnd.choices(SALE_STATUSES, (60, 30, 10) if age < 30 else (5, 85, 10))[0]
+            yield customer_id, product, amount, status, sale_date.isoformat(), sale_date.isoformat(), ''
+
+    def task_rows(self, ids: Sequence[int], weights: Sequence[float]) -> Iterator[tuple]:
+        rnd = self.random
+        for customer_id in self._customers(ids, weights, self.tasks):
+            due = self.last_day + datetime.timedelta(days=round(rnd.gauss(0, 30)))
+            overdue = due < self.last_day
+            status = rnd.choices(TASK_STATUSES, (20, 70, 10) if overdue else (60, 10, 30))[0]
+            priority = rnd.choices(TASK_PRIORITIES, (20, 50, 30))[0]
+            created = min(due, self.last_day) - datetime.timedelta(days=rnd.randint(0, 14))
+            yield (customer_id, rnd.choice(TASK_TITLES), '', priority, status, due.isoformat(),
+                   created.isoformat())
+
+    def interaction_rows(self, ids: Sequence[int], weights: Sequence[float]) -> Iterator[tuple]:
+        rnd = self.random
+        kinds = [(kind, description) for kind, _, description in INTERACTION_TYPES]
+        kind_weights = [weight for _, weight, _ in INTERACTION_TYPES]
+        for customer_id in self._customers(ids, weights, self.interactions):
+            kind, description = rnd.choices(kinds, kind_weights)[0]
+            moment = f'{self._day().isoformat()} {rnd.randint(8, 18):02d}:{rnd.randint(0, 59):02d}:00'
+            yield customer_id, kind, description, moment
+
+    def _day(self) -> datetime.date:
+        return self.random.choices(self.days, cum_weights=self.day_weights)[0]
+
+    def _customers(self, ids: Sequence[int], weights: Sequence[float], count: int) -> Iterator[int]:
+        """count customer ids drawn by weight, a batch at a time"""
+        for start in range(0, count, self.batch_size):
+            yield from self.random.choices(ids, cum_weights=weights, k=min(self.batch_size, count - start))
+
+    def _insert(self, conn: sqlite3.Connection, table: str, rows: Iterator[tuple]):
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                return
+            with conn:
+                # Explicit, so the trigger DDL in insert_rows shares the batch's transaction
+                conn.execute('BEGIN')
+                if table == 'interactions':
+                    conn.executemany(INTERACTIONS_SQL, batch)
+                else:
+                    insert_rows(conn, table, batch)
+
+# =================== BENCHMARKS ===================
+
+# Terms typed into the search boxes: a common surname, a first-name prefix and a company
+CUSTOMER_SEARCHES = ('smith', 'jen', 'acme')
+SALES_SEARCHES = ('laptop', 'support plan', 'garcia')
+
+@dataclass
+class Timing:
+    """How long one hot path took over its runs, in milliseconds"""
+    name: str
+    runs: int
+    median_ms: float
+    min_ms: float
+    max_ms: float
+
+@dataclass
+class Regression:
+    name: str
+    baseline_ms: float
+    current_ms: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current_ms / self.baseline_ms if self.baseline_ms else float('inf')
+
+class Benchmark:
+    """Times CRMApp's hot paths headlessly, against any CRM database.
+
+    Each benchmark runs the repository or job call behind one CRMApp
+    method, with the same arguments the app passes, so the numbers are
+    what a user waits for minus Tk drawing. Quick paths run repeat times
+    after one warm-up run; export runs once. delete_customer deletes a
+    customer created (untimed) before each run, with as many sales, tasks
+    and interactions as the average customer, so the database is left as
+    it was found. Medians are compared, as they shrug off the odd slow
+    run a busy machine produces.
+    """
+
+    def __init__(self, path: str = 'crm_database.db', repeat: int = 20):
+        self.path = path
+        self.repeat = repeat
+        # name -> (call, runs, untimed setup returning call's argument)
+        self.benchmarks: Dict[str, Tuple[Callable[..., Any], int, Optional[Callable[[], Any]]]] = {}
+
+    def run(self, names: Optional[Sequence[str]] = None,
+            progress: Optional[Callable[[Timing], None]] = None) -> Dict[str, Any]:
+        """Time the named benchmarks (all by default); returns the JSON-ready results"""
+        db = CRMDatabase(self.path)
+        try:
+            self._register(db)
+            unknown = set(names or ()) - set(self.benchmarks)
+            if unknown:
+                raise ValueError(f'Unknown benchmarks: {", ".join(sorted(unknown))}; '
+                                 f'expected some of {", ".join(self.benchmarks)}')
+            timings = []
+            for name, (call, runs, setup) in self.benchmarks.items():
+                if names and name not in names:
+                    continue
+                timing = self._time(name, call, runs, setup)
+                timings.append(timing)
+                if progress is not None:
+                    progress(timing)
+            rows = {table: db.conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                    for table in ('customers', 'sales', 'tasks', 'interactions')}
+        finally:
+            db.close()
+        return {
+            'database': os.path.abspath(self.path),
+            'rows': rows,
+            'date': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'machine': platform.platform(),
+            'timings': {timing.name: asdict(timing) for timing in timings},
+        }
+
+    def _register(self, db: CRMDatabase):
+        repeat = self.repeat
+
+        def search(repo_class, query):
+            # As SearchExecutor runs it: on a borrowed read-only connection
+            def call():
+                with db.connections.reader() as conn:
+                    return query(repo_class(conn))
+            return call
+
+        for term in CUSTOMER_SEARCHES:
+            self.add(f'search_customers[{term}]', search(CustomerRepo, lambda repo, term=term: repo.list(term)))
+        for term in SALES_SEARCHES:
+            self.add(f'search_sales[{term}]', search(SalesRepo, lambda repo, term=term: repo.list(None, term)))
+        # The first page each tab loads, unfiltered and filtered
+        self.add('refresh_customers', lambda: db.customers.page(0))
+        self.add('refresh_sales', lambda: db.sales.page(None, 0))
+        self.add('refresh_sales[Completed]', lambda: db.sales.page('Completed', 0))
+        self.add('refresh_tasks', lambda: db.tasks.page(None, 0))
+        self.add('refresh_tasks[High]', lambda: db.tasks.page('High', 0))
+        self.add('refresh_activities', lambda: db.interactions.recent(50))
+        # update_kpis only formats DashboardStats counters; loading them is the query work
+        self.add('update_kpis', lambda: DashboardStats(db))
+        last = datetime.date.today()
+        self.add('monthly_chart', lambda: db.sales.range_totals('month', last - datetime.timedelta(days=364), last))
+        self.add('export_report', self._export, runs=1)
+        self.add('delete_customer', lambda customer_id: db.customers.delete_many([customer_id]),
+                 setup=self._customer_factory(db))
+
+    def add(self, name: str, call: Callable[..., Any], runs: Optional[int] = None,
+            setup: Optional[Callable[[], Any]] = None):
+        """Register call to be timed runs times (repeat by default); with setup, as call(setup())"""
+        self.benchmarks[name] = (call, self.repeat if runs is None else runs, setup)
+
+    def _time(self, name: str, call: Callable[..., Any], runs: int,
+              setup: Optional[Callable[[], Any]] = None) -> Timing:
+        elapsed = []
+        for run in range(runs + (runs > 1)):
+            args = () if setup is None else (setup(),)
+            start = time.perf_counter()
+            call(*args)
+            if run or runs == 1:  # the first of several is the warm-up
+                elapsed.append((time.perf_counter() - start) * 1000)
+        return Timing(name, runs, round(statistics.median(elapsed), 3), round(min(elapsed), 3),
+                      round(max(elapsed), 3))
+
+    def _export(self):
+        with tempfile.TemporaryDirectory() as directory:
+            ExportJob(self.path, os.path.join(directory, 'report.jsonl')).run()
+
+    def _customer_factory(self, db: CRMDatabase) -> Callable[[], int]:
+        """Adds an average customer, with its sales, tasks and interactions, for delete_customer to delete"""
+        counts = {table: db.conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                  for table in ('customers', 'sales', 'tasks', 'interactions')}
+        per_customer = {table: max(1, round(counts[table] / max(counts['customers'], 1)))
+                        for table in ('sales', 'tasks', 'interactions')}
+
+        def setup() -> int:
+            with db.conn:
+                customer_id = db.conn.execute(
+                    "INSERT INTO customers (name, email, status, created_date) VALUES (?, ?, 'Active', ?)",
+                    ('Benchmark Customer', f'benchmark.{time.time_ns()}@example.com', today())).lastrowid
+                db.conn.executemany(
+                    "INSERT INTO sales (customer_id, product_name, amount, status, sale_date, created_date) "
+                    "VALUES (?, 'Benchmark', 1.0, 'Completed', ?, ?)",
+                    [(customer_id, today(), today())] * per_customer['sales'])
+                db.conn.executemany(
+                    "INSERT INTO tasks (customer_id, title, due_date, created_date) VALUES (?, 'Benchmark', ?, ?)",
+                    [(customer_id, today(), today())] * per_customer['tasks'])
+                db.conn.executemany(INTERACTIONS_SQL, [(customer_id, 'Note', 'Benchmark', today())]
+                                    * per_customer['interactions'])
+            return customer_id
+        return setup
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.25,
+            floor_ms: float = 0.05) -> List[Regression]:
+    """Benchmarks whose median grew by more than tolerance (and floor_ms) over the baseline's"""
+    regressions = []
+    for name, timing in current['timings'].items():
+        before = baseline.get('timings', {}).get(name)
+        if before is None:
+            continue
+        if timing['median_ms'] > before['median_ms'] * (1 + tolerance) + floor_ms:
+            regressions.append(Regression(name, before['median_ms'], timing['median_ms']))
+    return regressions
+
+# =================== LOAD TEST ===================
+
+LOAD_NOTE = 'Load test'  # description of the interactions a load test logs, and deletes afterwards
+
+@dataclass
+class LoadTiming:
+    """Latency of one kind of request across every simulated client, in milliseconds"""
+    name: str
+    requests: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    max_ms: float
+
+def percentiles(name: str, elapsed: List[float], errors: int = 0) -> LoadTiming:
+    ordered = sorted(elapsed) or [0.0]
+    return LoadTiming(name, len(elapsed), errors, round(ordered[len(ordered) // 2], 3),
+                      round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3), round(ordered[-1], 3))
+
+class LoadTest:
+    """Puts a crm_server under many simulated CRMApp clients at once.
+
+    Each client is a RemoteDatabase of its own, event stream included, on
+    a thread that picks its next action at random with CRMApp's rough mix:
+    mostly first pages, open customers and searches, and writes_share of
+    writes, logging an interaction or saving a customer unchanged.
+    Between actions a client waits think seconds on average, as a user
+    reading the screen would; with think=0 the server works flat out.
+    Every committed write is timed a second time, from being sent until
+    each other client's stream delivers it, as notify latency. The
+    interactions logged are deleted through the server afterwards.
+    """
+
+    POLL = 0.005  # s between checks of the clients' streams, bounding notify latency's resolution
+
+    def __init__(self, url: str, clients: int = 50, duration: float = 30.0, writes_share: float = 0.1,
+                 think: float = 0.0, token: Optional[str] = None, seed: int = 42):
+        self.url = url
+        self.clients = clients
+        self.duration = duration
+        self.writes_share = writes_share
+        self.think = think
+        self.token = token
+        self.seed = seed
+
+    def run(self) -> Dict[str, Any]:
+        """Drive the server for duration seconds; returns the JSON-ready results"""
+        from crm_remote import RemoteClient, RemoteDatabase
+
+        status = RemoteClient(self.url, self.token)
+        before = status.request('GET', '/api/status')
+        dbs = [RemoteDatabase(self.url, self.token) for _ in range(self.clients)]
+        ids = [row[0] for row in dbs[0].customers.page(0, 1000)]
+        elapsed: Dict[str, List[float]] = {}
+        errors: Dict[str, int] = {}
+        sent: Dict[int, Tuple[int, float]] = {}  # seq -> (client, when) of the write that committed it
+        delivered: List[float] = []
+        logged: List[int] = []  # interactions to delete afterwards
+        lock = threading.Lock()
+        stop = threading.Event()
+        try:
+            for db in dbs:
+                db.events.connected.wait(10)
+
+            def client(number: int, db: RemoteDatabase):
+                rng = random.Random(self.seed + number)
+                changes: List[Change] = []
+                repos, close = db.writer(changes.append)
+                reads = self._reads(db, rng, ids)
+                writes = self._writes(repos, rng, ids, logged)
+                try:
+                    while not (stop.wait(rng.expovariate(1 / self.think)) if self.think else stop.is_set()):
+                        write = rng.random() < self.writes_share
+                        name, call = rng.choice(writes if write else reads)
+                        changes.clear()
+                        start = time.perf_counter()
+                        try:
+                            call()
+                        except Exception:
+                            with lock:
+                                errors[name] = errors.get(name, 0) + 1
+                            continue
+                        with lock:
+                            elapsed.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+                            for change in changes:
+                                sent[change.seq] = (number, start)
+                finally:
+                    close()
+
+            def listen():
+                # Streams from other clients: a writer's own copy is not a notification
+                pending: List[Tuple[int, int, float]] = []  # (client, seq, when received)
+                while not stop.is_set():
+                    now = time.perf_counter()
+                    for number, db in enumerate(dbs):
+                        changes, _ = db.received()
+                        pending.extend((number, change.seq, now) for change in changes)
+                    with lock:
+                        waiting = []
+                        for number, seq, at in pending:
+                            if seq not in sent:  # delivered before its writer heard back
+                                waiting.append((number, seq, at))
+                            elif sent[seq][0] != number:
+                                delivered.append((at - sent[seq][1]) * 1000)
+                        pending = waiting
+                    stop.wait(self.POLL)
+
+            threads = [threading.Thread(target=client, args=(number, db), daemon=True)
+                       for number, db in enumerate(dbs)]
+            threads.append(threading.Thread(target=listen, daemon=True))
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            stop.wait(self.duration)
+            stop.set()
+            for thread in threads:
+                thread.join()
+            wall = time.perf_counter() - start
+            after = status.request('GET', '/api/status')
+        finally:
+            # Also when interrupted: stop the clients before deleting what they logged
+            stop.set()
+            for db in dbs:
+                db.close()
+            for interaction_id in logged:
+                status.call('interactions', 'delete', (interaction_id,))
+            status.close()
+
+        timings = [percentiles(name, times, errors.get(name, 0)) for name, times in sorted(elapsed.items())]
+        requests = sum(len(times) for times in elapsed.values())
+        hits = after['cache']['hits'] - before['cache']['hits']
+        misses = after['cache']['misses'] - before['cache']['misses']
+        return {
+            'server': self.url,
+            'clients': self.clients,
+            'think_seconds': self.think,
+            'seconds': round(wall, 1),
+            'requests': requests,
+            'errors': sum(errors.values()),
+            'requests_per_second': round(requests / wall, 1),
+            'cache_hit_ratio': round(hits / (hits + misses), 3) if hits + misses else None,
+            'date': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'machine': platform.platform(),
+            'timings': {timing.name: asdict(timing) for timing in timings},
+            'notify': asdict(percentiles('notify', delivered)),
+        }
+
+    @staticmethod
+    def _reads(db: Any, rng: random.Random, ids: Sequence[int]) -> List[Tuple[str, Callable[[], Any]]]:
+        """CRMApp's reads, repeated in rough proportion to how often a user causes them"""
+        return ([('refresh_customers', lambda: db.customers.page(0))] * 3
+                + [('refresh_sales', lambda: db.sales.page(None, 0))] * 2
+                + [('refresh_tasks', lambda: db.tasks.page(None, 0))] * 2
+                + [('refresh_activities', lambda: db.interactions.recent(50))] * 2
+                + [('open_customer', lambda: db.customers.get(rng.choice(ids)))] * 4
+                + [('timeline', lambda: db.interactions.timeline(rng.choice(ids)))] * 2
+                + [('search_customers', lambda: db.customers.list(rng.choice(CUSTOMER_SEARCHES)))] * 3
+                + [('search_sales', lambda: db.sales.list(None, rng.choice(SALES_SEARCHES)))])
+
+    @staticmethod
+    def _writes(repos: Any, rng: random.Random, ids: Sequence[int],
+                logged: List[int]) -> List[Tuple[str, Callable[[], Any]]]:
+        """Writes that leave the data as it was, once logged has been deleted"""
+        def log_interaction():
+            logged.append(repos.interactions.add(rng.choice(ids), 'Note', LOAD_NOTE))
+
+        def save_customer():
+            row = repos.customers.get(rng.choice(ids))
+            if row is not None:
+                repos.customers.update(row[0], *row[1:7], row[8])
+
+        return [('log_interaction', log_interaction)] * 4 + [('save_customer', save_customer)]
+
+def start_server(path: str, readers: int = 8) -> Tuple[str, subprocess.Popen]:
+    """Serve path with crm_server on a free localhost port; returns its URL and the process to stop"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crm_server.py')
+    process = subprocess.Popen([sys.executable, script, '--database', path, '--port', '0',
+                                '--readers', str(readers)], stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()  # "Serving <path> on <url>" once it listens
+    if not line.startswith('Serving'):
+        process.kill()
+        raise RuntimeError(f'crm_server did not start: {line.strip() or process.wait()}')
+    return line.rsplit(' ', 1)[1].strip(), process
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate CRM test data, benchmark the hot paths and load-test crm_server')
+    commands = parser.add_subparsers(dest='command', required=True)
+    generate = commands.add_parser('generate', help='fill a database with synthetic rows')
+    generate.add_argument('--database', default='crm_database.db')
+    generate.add_argument('--customers', type=int, default=100000)
+    generate.add_argument('--sales', type=int, help='default 3 per customer')
+    generate.add_argument('--tasks', type=int, help='default 1 per customer')
+    generate.add_argument('--interactions', type=int, help='default 4 per customer')
+    generate.add_argument('--years', type=int, default=5, help='how far back dates go')
+    generate.add_argument('--seed', type=int, default=42)
+    bench = commands.add_parser('run', help='time the hot paths')
+    bench.add_argument('--database', default='crm_database.db')
+    bench.add_argument('--repeat', type=int, default=20)
+    bench.add_argument('--only', nargs='+', metavar='NAME', help='run just these benchmarks')
+    bench.add_argument('--output', default='bench_results.json')
+    bench.add_argument('--baseline', help='earlier results to compare against')
+    bench.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown, 0.25 = 25%%')
+    load = commands.add_parser('load', help='put a crm_server under many simulated clients')
+    load.add_argument('--server', help='URL of a running crm_server; by default one is started on --database')
+    load.add_argument('--database', default='crm_database.db')
+    load.add_argument('--readers', type=int, default=8, help="the started server's read-only connections")
+    load.add_argument('--token', default=os.environ.get('CRM_SERVER_TOKEN'))
+    load.add_argument('--clients', type=int, default=50)
+    load.add_argument('--duration', type=float, default=30.0, help='seconds')
+    load.add_argument('--writes', type=float, default=0.1, help='share of actions that write')
+    load.add_argument('--think', type=float, default=0.0, help="average seconds between a client's actions")
+    load.add_argument('--output', default='load_results.json')
+    args = parser.parse_args()
+
+    if args.command == 'load':
+        url, process = args.server, None
+        if url is None:
+            url, process = start_server(args.database, args.readers)
+        try:
+            results = LoadTest(url, args.clients, args.duration, args.writes, args.think, args.token).run()
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+        for timing in results['timings'].values():
+            print(f'{timing["name"]:<20} {timing["requests"]:>8} requests  p50 {timing["p50_ms"]:>8.2f} ms  '
+                  f'p95 {timing["p95_ms"]:>8.2f} ms  max {timing["max_ms"]:>8.2f} ms  {timing["errors"]} errors')
+        notify = results['notify']
+        print(f'{"notify":<20} {notify["requests"]:>8} deliveries p50 {notify["p50_ms"]:>8.2f} ms  '
+              f'p95 {notify["p95_ms"]:>8.2f} ms  max {notify["max_ms"]:>8.2f} ms')
+        print(f'{results["clients"]} clients, {args.think} s think time: {results["requests_per_second"]} requests/s, '
+              f'{results["errors"]} errors, cache hit ratio {results["cache_hit_ratio"]}')
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f'Results written to {args.output}')
+        sys.exit(1 if results['errors'] else 0)
+
+    if args.command == 'generate':
+        start = time.perf_counter()
+        added = DataGenerator(args.customers, args.sales, args.tasks, args.interactions, args.years,
+                              args.seed).generate(args.database)
+        print(', '.join(f'{count:,} {table}' for table, count in added.items())
+              + f' added in {time.perf_counter() - start:.1f} s')
+        sys.exit(0)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    results = Benchmark(args.database, args.repeat).run(
+        args.only, lambda timing: print(f'{timing.name:<32} {timing.median_ms:>10.3f} ms '
+                                        f'(min {timing.min_ms:.3f}, max {timing.max_ms:.3f}, {timing.runs} runs)'))
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f'Results written to {args.output}')
+    if baseline is not None:
+        if baseline.get('rows') != results['rows']:
+            print(f'Note: baseline measured {baseline.get("rows")}, this run {results["rows"]}')
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression.name}: {regression.baseline_ms:.3f} -> '
+                  f'{regression.current_ms:.3f} ms ({regression.ratio:.2f}x)')
+        if regressions:
+            sys.exit(1)
+        print(f'No regressions beyond {args.tolerance:.0%} against {args.baseline}')
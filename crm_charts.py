@@ -0,0 +1,308 @@
+import math
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# =================== DOWNSAMPLING ===================
+
+Point = Tuple[float, float]
+
+def lttb(points: Sequence[Point], threshold: int) -> List[Point]:
+    """Largest-Triangle-Three-Buckets: threshold points (x ascending) that keep the line's shape"""
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+    sampled = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        following = points[end:min(int((i + 2) * every) + 1, n)] or points[-1:]
+        avg_x = sum(p[0] for p in following) / len(following)
+        avg_y = sum(p[1] for p in following) / len(following)
+        ax, ay = points[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+def minmax_buckets(points: Sequence[Point], buckets: int) -> List[Point]:
+    """The lowest and highest point of each of buckets equal slices, in x order; keeps every spike"""
+    n = len(points)
+    if buckets <= 0 or n <= 2 * buckets:
+        return list(points)
+    sampled = []
+    for i in range(buckets):
+        chunk = points[i * n // buckets:(i + 1) * n // buckets]
+        low = min(chunk, key=lambda p: p[1])
+        high = max(chunk, key=lambda p: p[1])
+        sampled.extend((low, high) if low[0] <= high[0] else (high, low))
+    return sampled
+
+# =================== CHARTS ===================
+
+def money(value: float) -> str:
+    return f"${value:,.0f}"
+
+class Chart:
+    """Base for charts that keep their canvas items between redraws.
+
+    Every item is stored under a key (e.g. ('bar', '2024-05')). A redraw
+    moves or re-labels only the items whose coordinates or options changed,
+    creates the missing ones and deletes those no longer drawn. The data
+    from the last set_data() is kept, so resizing the canvas redraws from
+    it without going back to the database. Charts sharing a canvas take
+    turns: clear() removes one's items until its next set_data().
+    """
+
+    PADDING = 40
+
+    def __init__(self, canvas, empty_text: str = "No data available."):
+        self.canvas = canvas
+        self.empty_text = empty_text
+        self.items: Dict[Any, int] = {}
+        self._drawn: Dict[Any, Tuple[tuple, dict]] = {}
+        self._seen: set = set()
+        self._resize_job = None
+        self.visible = True
+        canvas.bind('<Configure>', self._on_resize, add='+')
+
+    def has_data(self) -> bool:
+        raise NotImplementedError
+
+    def draw(self, width: int, height: int):
+        raise NotImplementedError
+
+    def size(self) -> Tuple[int, int]:
+        # winfo_* report 1 until the canvas is first mapped
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        return (width if width > 1 else 600), (height if height > 1 else 300)
+
+    def redraw(self):
+        if not self.visible:
+            return
+        width, height = self.size()
+        self._seen = set()
+        if self.has_data():
+            self.draw(width, height)
+        else:
+            self.item('empty', 'text', (width / 2, height / 2), text=self.empty_text,
+                      font=('Arial', 12), fill='gray')
+        for key in [key for key in self.items if key not in self._seen]:
+            self.canvas.delete(self.items.pop(key))
+            del self._drawn[key]
+
+    def clear(self):
+        """Delete every item and stop drawing until the next set_data()"""
+        self.visible = False
+        for item in self.items.values():
+            self.canvas.delete(item)
+        self.items.clear()
+        self._drawn.clear()
+
+    def item(self, key: Any, kind: str, coords: Sequence[float], **options) -> int:
+        """Create or update the item drawn under key; untouched when nothing changed"""
+        self._seen.add(key)
+        coords = tuple(coords)
+        item = self.items.get(key)
+        if item is None:
+            item = getattr(self.canvas, f'create_{kind}')(*coords, **options)
+            self.items[key] = item
+        else:
+            old_coords, old_options = self._drawn[key]
+            if coords != old_coords:
+                self.canvas.coords(item, *coords)
+            changed = {name: value for name, value in options.items() if old_options.get(name) != value}
+            if changed:
+                self.canvas.itemconfigure(item, **changed)
+        self._drawn[key] = (coords, options)
+        return item
+
+    def draw_value_axis(self, width: int, height: int, top: float, value_format: Callable[[float], str],
+                        ticks: int = 5):
+        """X and Y axis lines plus value labels from 0 to top"""
+        pad = self.PADDING
+        self.item('x_axis', 'line', (pad, height - pad, width - pad, height - pad), fill='black')
+        self.item('y_axis', 'line', (pad, height - pad, pad, pad), fill='black')
+        scale = (height - 2 * pad) / top if top else 0
+        for i in range(ticks):
+            value = top / (ticks - 1) * i
+            self.item(('tick', i), 'text', (pad - 5, height - pad - value * scale), anchor='e',
+                      text=value_format(value), font=('Arial', 8))
+
+    def _on_resize(self, event=None):
+        # Dragging a window edge sends a burst of <Configure>; draw once it settles
+        if self._resize_job is None:
+            self._resize_job = self.canvas.after_idle(self._resize)
+
+    def _resize(self):
+        self._resize_job = None
+        self.redraw()
+
+class BarChart(Chart):
+    """Labelled bars; set_data() animates the bars whose values changed"""
+
+    ANIMATION_STEPS = 8
+    ANIMATION_DELAY = 20  # ms between frames
+
+    def __init__(self, canvas, color: str = '#3498db', value_format: Callable[[float], str] = money,
+                 empty_text: str = "No data available."):
+        super().__init__(canvas, empty_text)
+        self.color = color
+        self.value_format = value_format
+        self.labels: List[str] = []
+        self.values: List[float] = []
+        self._shown: Dict[str, float] = {}
+        self._step = 0
+        self._start: Dict[str, float] = {}
+        self._animation_job = None
+
+    def set_data(self, labels: Sequence[str], values: Sequence[float]):
+        self.visible = True
+        self.labels = list(labels)
+        self.values = [float(value or 0) for value in values]
+        self._start = {label: self._shown.get(label, 0.0) for label in self.labels}
+        self._step = 0
+        if self._animation_job is None:
+            self._animate()
+
+    def has_data(self) -> bool:
+        return bool(self.labels)
+
+    def draw(self, width: int, height: int):
+        pad = self.PADDING
+        top = max(self.values)
+        scale = (height - 2 * pad) / top if top else 0
+        slot = (width - 2 * pad) / len(self.labels)
+        bar_width = slot / 1.5
+        # Thin out month labels that would overlap, and value labels on narrow bars
+        label_every = max(1, math.ceil(60 / slot))
+        for i, (label, value) in enumerate(zip(self.labels, self.values)):
+            shown = self._shown.get(label, value)
+            x0 = pad + i * slot
+            y0 = height - pad - shown * scale
+            self.item(('bar', label), 'rectangle', (x0, y0, x0 + bar_width, height - pad),
+                      fill=self.color, outline='gray')
+            if slot >= 45:
+                self.item(('value', label), 'text', (x0 + bar_width / 2, y0 - 10),
+                          text=self.value_format(value), font=('Arial', 8, 'bold'))
+            if i % label_every == 0:
+                self.item(('label', label), 'text', (x0 + bar_width / 2, height - pad + 15),
+                          text=label, font=('Arial', 9))
+        self.draw_value_axis(width, height, top, self.value_format)
+
+    def _animate(self):
+        self._step += 1
+        t = self._step / self.ANIMATION_STEPS
+        self._shown = {label: start + (value - start) * t
+                       for (label, start), value in zip(self._start.items(), self.values)}
+        self.redraw()
+        if self._step < self.ANIMATION_STEPS:
+            self._animation_job = self.canvas.after(self.ANIMATION_DELAY, self._animate)
+        else:
+            self._animation_job = None
+
+class LineChart(Chart):
+    """One (x, y) series, x ascending, downsampled to about one point per pixel of width"""
+
+    def __init__(self, canvas, color: str = '#3498db', value_format: Callable[[float], str] = money,
+                 x_format: Callable[[float], str] = str, empty_text: str = "No data available.",
+                 downsample: Callable[[Sequence[Point], int], List[Point]] = lttb):
+        super().__init__(canvas, empty_text)
+        self.color = color
+        self.value_format = value_format
+        self.x_format = x_format
+        self.downsample = downsample
+        self.points: List[Point] = []
+        self.top = 0.0
+        self._sampled: Optional[Tuple[int, List[Point]]] = None
+
+    def set_data(self, points: Sequence[Point]):
+        self.visible = True
+        self.points = list(points)
+        # From the full series; the downsampled line may skip the peak
+        self.top = max((y for x, y in self.points), default=0.0)
+        self._sampled = None
+        self.redraw()
+
+    def has_data(self) -> bool:
+        return bool(self.points)
+
+    def sampled(self, pixels: int) -> List[Point]:
+        """The series cut down for pixels of plot width; cached until the data or width changes"""
+        if self._sampled is None or self._sampled[0] != pixels:
+            self._sampled = (pixels, self.downsample(self.points, max(pixels, 3)))
+        return self._sampled[1]
+
+    def draw(self, width: int, height: int):
+        pad = self.PADDING
+        points = self.sampled(int(width - 2 * pad))
+        first, last = points[0][0], points[-1][0]
+        x_scale = (width - 2 * pad) / (last - first) if last != first else 0
+        y_scale = (height - 2 * pad) / self.top if self.top else 0
+        coords = []
+        for x, y in points:
+            coords.extend((pad + (x - first) * x_scale, height - pad - y * y_scale))
+        if len(points) == 1:
+            coords.extend(coords)
+        self.item('line', 'line', coords, fill=self.color, width=2)
+        ticks = 5 if last != first else 1
+        for i in range(ticks):
+            x = first + (last - first) * i / max(ticks - 1, 1)
+            self.item(('x_tick', i), 'text', (pad + (x - first) * x_scale, height - pad + 15),
+                      text=self.x_format(x), font=('Arial', 9))
+        self.draw_value_axis(width, height, self.top, self.value_format)
+
+class PieChart(Chart):
+    """Slices with a legend; a changed count only moves the affected arcs and labels"""
+
+    COLORS = ['#2ecc71', '#e74c3c', '#f39c12', '#3498db']  # Green, Red, Orange, Blue
+
+    def __init__(self, canvas, colors: Sequence[str] = COLORS, empty_text: str = "No data available."):
+        super().__init__(canvas, empty_text)
+        self.colors = list(colors)
+        self.labels: List[str] = []
+        self.values: List[float] = []
+
+    def set_data(self, labels: Sequence[str], values: Sequence[float]):
+        self.visible = True
+        self.labels = list(labels)
+        self.values = [value or 0 for value in values]
+        self.redraw()
+
+    def has_data(self) -> bool:
+        return sum(self.values) > 0
+
+    def draw(self, width: int, height: int):
+        total = sum(self.values)
+        radius = min(width, height) / 2 - 20
+        center_x, center_y = width / 2, height / 2
+        box = (center_x - radius, center_y - radius, center_x + radius, center_y + radius)
+        start_angle = 0.0
+        legend_y = 20
+        for i, (label, value) in enumerate(zip(self.labels, self.values)):
+            percentage = value / total * 100
+            extent = value / total * 360
+            color = self.colors[i % len(self.colors)]
+            if extent:
+                # Tk draws a full 360 degree extent as nothing; 359.99 still closes the circle
+                self.item(('slice', label), 'arc', box, start=start_angle, extent=min(extent, 359.99),
+                          fill=color, outline='white', width=2)
+            if percentage > 5:  # Only show percentage if slice is large enough
+                # Arc angles run counter-clockwise while canvas y grows downwards
+                angle_mid = math.radians(start_angle + extent / 2)
+                self.item(('percent', label), 'text',
+                          (center_x + radius * 0.7 * math.cos(angle_mid),
+                           center_y - radius * 0.7 * math.sin(angle_mid)),
+                          text=f"{percentage:.1f}%", font=('Arial', 9, 'bold'), fill='white')
+            self.item(('swatch', label), 'rectangle', (width - 150, legend_y, width - 130, legend_y + 15),
+                      fill=color, outline='gray')
+            self.item(('legend', label), 'text', (width - 125, legend_y + 7), anchor='w',
+                      text=f"{label} ({value:,.0f})", font=('Arial', 9))
+            legend_y += 20
+            start_angle += extent
@@ -0,0 +1,105 @@
+import queue
+import sqlite3
+import threading
+import urllib.parse
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+
+# =================== CONNECTIONS ===================
+
+# Applied to every connection; WAL lets readers and the writer run at the same time
+COMMON_PRAGMAS = [
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA mmap_size = 268435456',
+]
+WRITER_PRAGMAS = [
+    'PRAGMA journal_mode = WAL',
+    # Durable at every checkpoint and safe against corruption in WAL mode
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA cache_size = -65536',
+    # Truncate the -wal file back to this size after checkpoints
+    'PRAGMA journal_size_limit = 67108864',
+]
+READER_PRAGMAS = [
+    'PRAGMA cache_size = -16384',
+]
+
+def connect_writer(path: str, timeout: float = 5.0) -> sqlite3.Connection:
+    """Read-write connection in WAL mode; foreign keys are left to the caller (see CRMDatabase)"""
+    conn = sqlite3.connect(path, timeout=timeout, cached_statements=256)
+    for pragma in WRITER_PRAGMAS + COMMON_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def connect_reader(path: str) -> sqlite3.Connection:
+    """Read-only connection that may be handed between threads (one user at a time)"""
+    uri = 'file:' + urllib.parse.quote(path) + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=256)
+    for pragma in READER_PRAGMAS + COMMON_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+class ConnectionManager:
+    """The writer connection plus a small pool of read-only connections.
+
+    The writer belongs to the thread that created the manager (CRMApp's Tk
+    thread). Worker threads borrow readers with `with manager.reader() as
+    conn`; under WAL their reads, however long, never block the writer.
+    maintain() is meant to run every few minutes from the writer's thread.
+    """
+
+    def __init__(self, path: str, readers: int = 4):
+        self.path = path
+        self.writer = connect_writer(path)
+        self.max_readers = readers
+        self._idle: 'queue.LifoQueue[sqlite3.Connection]' = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @contextmanager
+    def reader(self, timeout: float = 30.0) -> Iterator[sqlite3.Connection]:
+        """Borrow a read-only connection, waiting up to timeout seconds if all are in use"""
+        conn = self._acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def maintain(self) -> Tuple[int, int, int]:
+        """PRAGMA optimize plus a passive WAL checkpoint; returns (busy, wal pages, checkpointed pages)"""
+        self.writer.execute('PRAGMA optimize')
+        return self.writer.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+
+    def close(self):
+        """Close idle readers and the writer; borrowed readers close when returned"""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        self.writer.execute('PRAGMA optimize')
+        self.writer.close()
+
+    def _acquire(self, timeout: float) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.max_readers:
+                self._opened += 1
+                return connect_reader(self.path)
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f'No read connection free after {timeout:.0f} s') from None
+
+    def _release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
@@ -0,0 +1,320 @@
+import functools
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from crm_connections import ConnectionManager
+from crm_repository import search_tokens
+
+# =================== NORMALIZATION ===================
+
+# Legal-form words dropped from company names, so "Acme Inc." and "ACME" compare equal
+COMPANY_SUFFIXES = {'inc', 'incorporated', 'llc', 'ltd', 'limited', 'corp', 'corporation',
+                    'co', 'company', 'gmbh', 'plc', 'sa', 'ag', 'bv', 'pty'}
+
+def phone_digits(phone: Optional[str]) -> str:
+    """Last 10 digits, so +1 (555) 010-2030 and 5550102030 agree; '' when too short to be a number"""
+    digits = re.sub(r'\D', '', str(phone or ''))
+    return digits[-10:] if len(digits) >= 7 else ''
+
+def email_parts(email: Optional[str]) -> Tuple[str, str]:
+    """(local part with letters and digits only, domain), lower case"""
+    user, _, domain = str(email or '').lower().rpartition('@')
+    return re.sub(r'[^a-z0-9]', '', user), domain
+
+def company_name(company: Optional[str]) -> str:
+    return ' '.join(word for word in search_tokens(company) if word not in COMPANY_SUFFIXES)
+
+def name_keys(words: List[str]) -> Set[str]:
+    """Each name word with the initial of the longest other word: "jon smith" -> jon|s, smith|j.
+
+    A misspelt first or last name still leaves one key in common with the
+    correct spelling, while the initial keeps blocks of common surnames small.
+    """
+    keys = set()
+    for i, word in enumerate(words):
+        others = words[:i] + words[i + 1:]
+        initial = max(others, key=len)[0] if others else ''
+        keys.add(f'{word}|{initial}')
+    return keys
+
+# Blocking passes over (id, name, email, phone, company) rows: each files a customer
+# under some keys, and customers sharing a key become candidate pairs. A pass derives
+# only its own keys and only one pass's keys are in memory at a time.
+
+def phone_keys(row: tuple) -> List[str]:
+    digits = phone_digits(row[3])
+    return [digits] if digits else []
+
+def email_keys(row: tuple) -> List[str]:
+    # Catches john.smith@ against johnsmith@ at the same domain
+    user, domain = email_parts(row[2])
+    return [f'{user}@{domain}'] if user else []
+
+def domain_keys(row: tuple) -> List[str]:
+    domain = email_parts(row[2])[1]
+    return [f'{domain}|{key}' for key in name_keys(search_tokens(row[1]))] if domain else []
+
+def company_keys(row: tuple) -> List[str]:
+    company = company_name(row[4])
+    return [f'{company}|{key}' for key in name_keys(search_tokens(row[1]))] if company else []
+
+BLOCKING_PASSES: List[Callable[[tuple], List[str]]] = [phone_keys, email_keys, domain_keys, company_keys]
+
+@dataclass
+class Fingerprint:
+    """A customer's fields reduced to what match_score compares"""
+    id: int
+    words: List[str]  # name words, folded
+    email_user: str
+    domain: str
+    phone: str
+    company: str
+
+    @classmethod
+    def from_row(cls, row: tuple) -> 'Fingerprint':
+        """From (id, name, email, phone, company)"""
+        user, domain = email_parts(row[2])
+        return cls(row[0], search_tokens(row[1]), user, domain, phone_digits(row[3]), company_name(row[4]))
+
+# =================== SIMILARITY ===================
+
+def jaro_winkler(a: str, b: str, prefix_scale: float = 0.1) -> float:
+    """Jaro-Winkler similarity in [0, 1]; forgiving of typos, and more so when the start agrees"""
+    if a == b:
+        return 1.0
+    len_a, len_b = len(a), len(b)
+    if not len_a or not len_b:
+        return 0.0
+    window = max(max(len_a, len_b) // 2 - 1, 0)
+    taken = [False] * len_b
+    matched_a = []
+    for i, ch in enumerate(a):
+        for j in range(max(0, i - window), min(len_b, i + window + 1)):
+            if not taken[j] and b[j] == ch:
+                taken[j] = True
+                matched_a.append(ch)
+                break
+    matches = len(matched_a)
+    if not matches:
+        return 0.0
+    matched_b = [b[j] for j in range(len_b) if taken[j]]
+    transpositions = sum(x != y for x, y in zip(matched_a, matched_b)) / 2
+    jaro = (matches / len_a + matches / len_b + (matches - transpositions) / matches) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * prefix_scale * (1 - jaro)
+
+# Names and companies are made of a few thousand distinct words, so pairs recur constantly
+_word_similarity = functools.lru_cache(maxsize=1 << 16)(jaro_winkler)
+
+def name_similarity(a: List[str], b: List[str]) -> float:
+    """Each word's best Jaro-Winkler match in the other name, averaged; word order doesn't matter"""
+    if not a or not b:
+        return 0.0
+    grid = [[_word_similarity(x, y) for y in b] for x in a]
+    forward = sum(max(row) for row in grid) / len(a)
+    backward = sum(max(column) for column in zip(*grid)) / len(b)
+    return min(forward, backward)
+
+# Share of the score per field; a field only counts when both customers have it
+FIELD_WEIGHTS = {'name': 0.4, 'email_user': 0.3, 'phone': 0.2, 'company': 0.1}
+
+def match_score(a: Fingerprint, b: Fingerprint) -> float:
+    """Weighted similarity of the fields both customers filled in"""
+    total = FIELD_WEIGHTS['name'] * name_similarity(a.words, b.words)
+    weights = FIELD_WEIGHTS['name']
+    if a.email_user and b.email_user:
+        total += FIELD_WEIGHTS['email_user'] * jaro_winkler(a.email_user, b.email_user)
+        weights += FIELD_WEIGHTS['email_user']
+    if a.phone and b.phone:
+        # Phone digits either agree or they don't; a near miss is another number
+        total += FIELD_WEIGHTS['phone'] * (a.phone == b.phone)
+        weights += FIELD_WEIGHTS['phone']
+    if a.company and b.company:
+        total += FIELD_WEIGHTS['company'] * _word_similarity(a.company, b.company)
+        weights += FIELD_WEIGHTS['company']
+    return total / weights
+
+# =================== DUPLICATE FINDER ===================
+
+@dataclass
+class DuplicateGroup:
+    """Customers judged to be one person; ids ascending, so the first is the oldest record"""
+    ids: List[int]
+    score: float  # weakest match holding the group together
+
+class DuplicateFinder:
+    """Finds likely duplicate customers without comparing every pair.
+
+    Each blocking pass streams (id, name, email, phone, company) and files
+    customers under normalized keys (see BLOCKING_PASSES). Keys are held as
+    hashes and a key seen once costs one dict slot; keys shared by more
+    than max_block customers (a company's whole staff, gmail.com plus a
+    common name) are too broad to mean anything and are skipped. Only the
+    resulting candidate pairs are scored, against fingerprints fetched for
+    just those customers, and matches at or above threshold are joined
+    into groups.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, threshold: float = 0.92, max_block: int = 50,
+                 batch_size: int = 5000):
+        self.conn = conn
+        self.threshold = threshold
+        self.max_block = max_block
+        self.batch_size = batch_size
+        self.compared = 0
+
+    def find(self, cancelled: Callable[[], bool] = lambda: False,
+             progress: Callable[[int], None] = lambda done: None) -> List[DuplicateGroup]:
+        """Duplicate groups, largest first; progress(done) is called with customers read so far"""
+        pairs: Set[Tuple[int, int]] = set()
+        done = 0
+        for keys in BLOCKING_PASSES:
+            found, read = self._candidate_pairs(keys, cancelled, lambda n: progress(done + n))
+            if cancelled():
+                return []
+            pairs |= found
+            done += read
+        matches = self._score(pairs)
+        return self._group(matches)
+
+    def _rows(self) -> Iterator[tuple]:
+        # Keyset batches, so the scan never holds more than one batch of rows
+        after_id = 0
+        while True:
+            rows = self.conn.execute('SELECT id, name, email, phone, company FROM customers '
+                                     'WHERE id > ? ORDER BY id LIMIT ?', (after_id, self.batch_size)).fetchall()
+            yield from rows
+            if len(rows) < self.batch_size:
+                return
+            after_id = rows[-1][0]
+
+    def _candidate_pairs(self, keys: Callable[[tuple], List[str]], cancelled: Callable[[], bool],
+                         progress: Callable[[int], None]) -> Tuple[Set[Tuple[int, int]], int]:
+        """Pairs sharing a key of this pass, and the number of customers read"""
+        blocks: Dict[int, object] = {}  # key hash -> id, or list of ids once shared
+        read = 0
+        for row in self._rows():
+            read += 1
+            if read % self.batch_size == 0:
+                progress(read)
+                if cancelled():
+                    return set(), read
+            for key in keys(row):
+                slot = hash(key)
+                ids = blocks.get(slot)
+                if ids is None:
+                    blocks[slot] = row[0]
+                elif isinstance(ids, list):
+                    if len(ids) <= self.max_block:
+                        ids.append(row[0])
+                else:
+                    blocks[slot] = [ids, row[0]]
+        pairs = set()
+        for ids in blocks.values():
+            if isinstance(ids, list) and len(ids) <= self.max_block:
+                pairs.update((a, b) for i, a in enumerate(ids) for b in ids[i + 1:])
+        return pairs, read
+
+    def _score(self, pairs: Set[Tuple[int, int]]) -> List[Tuple[int, int, float]]:
+        ids = sorted({row_id for pair in pairs for row_id in pair})
+        fingerprints = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            marks = ', '.join('?' * len(chunk))
+            for row in self.conn.execute(f'SELECT id, name, email, phone, company FROM customers '
+                                         f'WHERE id IN ({marks})', chunk):
+                fingerprints[row[0]] = Fingerprint.from_row(row)
+        self.compared = len(pairs)
+        matches = []
+        for a, b in pairs:
+            if a in fingerprints and b in fingerprints:
+                score = match_score(fingerprints[a], fingerprints[b])
+                if score >= self.threshold:
+                    matches.append((a, b, score))
+        return matches
+
+    @staticmethod
+    def _group(matches: List[Tuple[int, int, float]]) -> List[DuplicateGroup]:
+        # Union-find over the matched pairs
+        parent: Dict[int, int] = {}
+
+        def root(row_id: int) -> int:
+            parent.setdefault(row_id, row_id)
+            while parent[row_id] != row_id:
+                parent[row_id] = parent[parent[row_id]]
+                row_id = parent[row_id]
+            return row_id
+
+        for a, b, _ in matches:
+            parent[root(a)] = root(b)
+        groups: Dict[int, DuplicateGroup] = {}
+        for a, b, score in matches:
+            group = groups.setdefault(root(a), DuplicateGroup([], 1.0))
+            group.score = min(group.score, score)
+        for row_id in parent:
+            groups[root(row_id)].ids.append(row_id)
+        for group in groups.values():
+            group.ids.sort()
+        return sorted(groups.values(), key=lambda group: (-len(group.ids), -group.score, group.ids[0]))
+
+class DedupJob:
+    """Runs DuplicateFinder on a worker thread over a read-only connection from the pool.
+
+    done/total (customers read, over all blocking passes) can be polled
+    from any thread for a progress bar; groups holds the result once
+    finished. cancel() stops at the next batch.
+    """
+
+    def __init__(self, connections: ConnectionManager, threshold: float = 0.92, max_block: int = 50):
+        self.connections = connections
+        self.threshold = threshold
+        self.max_block = max_block
+        self.groups: List[DuplicateGroup] = []
+        self.compared = 0
+        self.done = 0
+        self.total = 0
+        self.error: Optional[Exception] = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._work, name='crm-dedup', daemon=True)
+
+    def start(self) -> 'DedupJob':
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self._thread.ident is not None and not self._thread.is_alive()
+
+    def run(self):
+        """Search on the calling thread; raises instead of setting error"""
+        with self.connections.reader() as conn:
+            # One snapshot for every pass; under WAL it doesn't hold up the writer
+            conn.execute('BEGIN')
+            self.total = conn.execute('SELECT COUNT(*) FROM customers').fetchone()[0] * len(BLOCKING_PASSES)
+            finder = DuplicateFinder(conn, self.threshold, self.max_block)
+            self.groups = finder.find(lambda: self.cancelled, self._progress)
+            self.compared = finder.compared
+            self.done = self.total
+
+    def _progress(self, done: int):
+        self.done = done
+
+    def _work(self):
+        try:
+            self.run()
+        except Exception as e:
+            self.error = e
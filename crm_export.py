@@ -0,0 +1,200 @@
+import csv
+import gzip
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import IO, Iterator, List, Optional, Tuple
+
+from crm_connections import ConnectionManager, connect_reader
+
+# =================== STREAMING EXPORT ===================
+
+TABLES = ('customers', 'sales', 'tasks', 'interactions')
+FORMATS = ('json', 'jsonl', 'csv')
+
+def export_format(filepath: str) -> Tuple[str, bool]:
+    """(format, gzipped) from a name like report.jsonl.gz; unknown extensions export as JSON"""
+    name = filepath.lower()
+    compressed = name.endswith('.gz')
+    if compressed:
+        name = name[:-3]
+    ext = os.path.splitext(name)[1].lstrip('.')
+    return (ext if ext in FORMATS else 'json'), compressed
+
+def open_output(filepath: str, compressed: bool) -> IO[str]:
+    if compressed:
+        # Level 6 is about twice as fast as the default 9 for a few percent more bytes
+        return gzip.open(filepath, 'wt', compresslevel=6, encoding='utf-8', newline='')
+    return open(filepath, 'w', encoding='utf-8', newline='')
+
+def csv_path(filepath: str, table: str) -> str:
+    """CSV holds one table per file: report.csv.gz -> report_sales.csv.gz"""
+    base, gz = (filepath[:-3], '.gz') if filepath.lower().endswith('.gz') else (filepath, '')
+    stem, ext = os.path.splitext(base)
+    return f'{stem}_{table}{ext}{gz}'
+
+class ExportJob:
+    """Writes the CRM tables to a file on a worker thread, in fixed-size batches.
+
+    Rows are read by keyset (id > last id) a batch at a time over a
+    read-only connection, borrowed from connections when given, so memory
+    stays flat. On a WAL database the whole export reads one snapshot
+    without blocking writers. done/total can be polled from any thread for
+    a progress bar; cancel() stops at the next batch and removes the
+    partial output.
+    """
+
+    def __init__(self, db_path: str, filepath: str, tables: Tuple[str, ...] = TABLES,
+                 batch_size: int = 5000, connections: Optional[ConnectionManager] = None):
+        self.db_path = db_path
+        self.connections = connections
+        self.filepath = filepath
+        self.tables = tables
+        self.batch_size = batch_size
+        self.format, self.compressed = export_format(filepath)
+        self.outputs: List[str] = []
+        self.done = 0
+        self.total = 0
+        self.error: Optional[Exception] = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._work, name='crm-export', daemon=True)
+
+    def start(self) -> 'ExportJob':
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self._thread.ident is not None and not self._thread.is_alive()
+
+    def run(self):
+        """Export on the calling thread; raises instead of setting error"""
+        with self._reader() as conn:
+            try:
+                self._export(conn)
+            finally:
+                if self.cancelled:
+                    self._remove_outputs()
+
+    def _export(self, conn: sqlite3.Connection):
+        if conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+            # A snapshot for counts and every batch; readers don't hold up the writer under WAL
+            conn.execute('BEGIN')
+        try:
+            self.total = sum(conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                             for table in self.tables)
+            if self.format == 'csv':
+                for table in self.tables:
+                    path = csv_path(self.filepath, table)
+                    self.outputs.append(path)
+                    with open_output(path, self.compressed) as f:
+                        self._write_csv(conn, table, f)
+                    if self.cancelled:
+                        break
+            else:
+                self.outputs.append(self.filepath)
+                with open_output(self.filepath, self.compressed) as f:
+                    if self.format == 'jsonl':
+                        self._write_jsonl(conn, f)
+                    else:
+                        self._write_json(conn, f)
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        if self.connections is not None:
+            with self.connections.reader() as conn:
+                yield conn
+            return
+        conn = connect_reader(self.db_path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _work(self):
+        try:
+            self.run()
+        except Exception as e:
+            self.error = e
+            self._remove_outputs()
+
+    def _batches(self, conn: sqlite3.Connection, table: str):
+        """(column names, rows) for each batch of table, in id order"""
+        last_id = 0
+        sql = f'SELECT * FROM {table} WHERE id > ? ORDER BY id LIMIT ?'
+        while not self.cancelled:
+            cursor = conn.execute(sql, (last_id, self.batch_size))
+            columns = [col[0] for col in cursor.description]
+            rows = cursor.fetchall()
+            if not rows:
+                return
+            yield columns, rows
+            self.done += len(rows)
+            last_id = rows[-1][0]
+
+    def _write_json(self, conn: sqlite3.Connection, f: IO[str]):
+        # Same shape as CRMDatabase.dump(), one row object per line
+        f.write('{')
+        for index, table in enumerate(self.tables):
+            f.write(f'{"," if index else ""}\n    {json.dumps(table)}: [')
+            first = True
+            for columns, rows in self._batches(conn, table):
+                for row in rows:
+                    f.write(('\n' if first else ',\n') + '        ' + json.dumps(dict(zip(columns, row))))
+                    first = False
+            f.write('\n    ]' if not first else ']')
+        f.write('\n}\n')
+
+    def _write_jsonl(self, conn: sqlite3.Connection, f: IO[str]):
+        for table in self.tables:
+            for columns, rows in self._batches(conn, table):
+                for row in rows:
+                    record = {'table': table}
+                    record.update(zip(columns, row))
+                    f.write(json.dumps(record) + '\n')
+
+    def _write_csv(self, conn: sqlite3.Connection, table: str, f: IO[str]):
+        writer = csv.writer(f)
+        header_written = False
+        for columns, rows in self._batches(conn, table):
+            if not header_written:
+                writer.writerow(columns)
+                header_written = True
+            writer.writerows(rows)
+        if not header_written:
+            columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+            writer.writerow(columns)
+
+    def _remove_outputs(self):
+        for path in self.outputs:
+            if os.path.exists(path):
+                os.remove(path)
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Export the CRM tables as JSON, JSON Lines or CSV')
+    parser.add_argument('output', help='e.g. report.json, report.jsonl.gz or report.csv')
+    parser.add_argument('--database', default='crm_database.db')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    job = ExportJob(args.database, args.output, batch_size=args.batch_size)
+    start = time.perf_counter()
+    job.run()
+    elapsed = time.perf_counter() - start
+    print(f'{job.done:,} rows in {elapsed:.1f} s ({job.done / max(elapsed, 1e-9):,.0f} rows/s) '
+          f'-> {", ".join(job.outputs)}')
@@ -0,0 +1,378 @@
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional, Tuple
+
+from crm_connections import connect_writer
+from crm_export import export_format
+
+# =================== ROW VALIDATION ===================
+
+class RowError(ValueError):
+    """A rejected input row; the message goes to the error file"""
+
+def _text(record: Dict[str, Any], key: str, default: Optional[str] = None) -> Optional[str]:
+    value = record.get(key)
+    if value is None:
+        return default
+    value = str(value).strip()
+    return value if value else default
+
+def _required(record: Dict[str, Any], key: str) -> str:
+    value = _text(record, key)
+    if value is None:
+        raise RowError(f'{key} is required')
+    return value
+
+def _date(record: Dict[str, Any], key: str, default: Optional[str]) -> Optional[str]:
+    value = _text(record, key, default)
+    if value is not None:
+        try:
+            datetime.date.fromisoformat(value[:10])
+        except ValueError:
+            raise RowError(f'{key} must be a YYYY-MM-DD date, got {value!r}')
+    return value
+
+def _choice(record: Dict[str, Any], key: str, default: str, choices: Tuple[str, ...]) -> str:
+    value = _text(record, key, default)
+    if value not in choices:
+        raise RowError(f'{key} must be one of {", ".join(choices)}, got {value!r}')
+    return value
+
+# Values offered by the dialogs
+CUSTOMER_STATUSES = ('Active', 'Inactive', 'Prospect')
+SALE_STATUSES = ('Pending', 'Completed', 'Cancelled')
+TASK_PRIORITIES = ('High', 'Medium', 'Low')
+TASK_STATUSES = ('Pending', 'Completed', 'In Progress')
+
+INSERT_SQL = {
+    'customers': 'INSERT INTO customers (name, email, phone, company, address, status, created_date, notes) '
+                 'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+    'sales': 'INSERT INTO sales (customer_id, product_name, amount, status, sale_date, created_date, notes) '
+             'VALUES (?, ?, ?, ?, ?, ?, ?)',
+    'tasks': 'INSERT INTO tasks (customer_id, title, description, priority, status, due_date, created_date) '
+             'VALUES (?, ?, ?, ?, ?, ?, ?)',
+}
+
+# Per-row FTS triggers (see crm_migrations) and the statement that indexes a whole batch instead
+FTS_INDEXING = {
+    'customers': ('customers_fts_insert',
+                  'INSERT INTO customers_fts (rowid, name, email, company, notes) '
+                  'SELECT id, name, email, company, notes FROM customers WHERE id > ?'),
+    'sales': ('sales_fts_insert',
+              'INSERT INTO sales_fts (rowid, product_name) SELECT id, product_name FROM sales WHERE id > ?'),
+}
+
+# =================== BULK IMPORT ===================
+
+def insert_rows(conn: sqlite3.Connection, table: str, rows: List[tuple]):
+    """executemany INSERT_SQL[table], with the table's FTS insert trigger swapped for one bulk statement.
+
+    Meant for the inside of an open transaction: other connections never
+    see the trigger missing, as it is dropped and recreated within it.
+    """
+    if not rows:
+        return
+    trigger = None
+    if table in FTS_INDEXING:
+        name, index_sql = FTS_INDEXING[table]
+        trigger = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                               (name,)).fetchone()
+    if trigger is None:
+        conn.executemany(INSERT_SQL[table], rows)
+    else:
+        last_id = conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0]
+        conn.execute(f'DROP TRIGGER {name}')
+        conn.executemany(INSERT_SQL[table], rows)
+        conn.execute(index_sql, (last_id,))
+        conn.execute(trigger[0])
+
+class ImportJob:
+    """Streams customers, sales and tasks from CSV or JSON Lines into the database.
+
+    Rows are validated and inserted a batch at a time with executemany, each
+    batch in one transaction. Sales and tasks name their customer by
+    customer_email (or an existing customer_id). Rejected rows are written
+    with an error column to <input>.errors.csv or .errors.jsonl. done,
+    rejected and rate can be polled from another thread while start() runs
+    the import on a worker.
+
+    CSV files hold one table, taken from the table argument or from a name
+    like report_sales.csv as written by crm_export; JSON Lines records may
+    carry their own "table" key.
+    """
+
+    def __init__(self, db_path: str, filepath: str, table: Optional[str] = None,
+                 batch_size: int = 50000):
+        self.db_path = db_path
+        self.filepath = filepath
+        self.format, self.compressed = export_format(filepath)
+        self.table = table or self._table_from_name()
+        self.batch_size = batch_size
+        self.error_path: Optional[str] = None
+        self.done = 0
+        self.rejected = 0
+        self.bytes_read = 0
+        self.bytes_total = os.path.getsize(filepath)
+        self.elapsed = 0.0
+        self.error: Optional[Exception] = None
+        self._cancel = threading.Event()
+        self._emails: Dict[str, int] = {}
+        self._today = datetime.datetime.now().strftime('%Y-%m-%d')
+        self._errors: Optional[IO[str]] = None
+        self._error_writer: Optional[Callable[[Dict[str, Any], str], None]] = None
+        self._thread = threading.Thread(target=self._work, name='crm-import', daemon=True)
+
+    def start(self) -> 'ImportJob':
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Stop after the current batch; batches already committed stay imported"""
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self._thread.ident is not None and not self._thread.is_alive()
+
+    @property
+    def rate(self) -> float:
+        """Imported rows per second so far"""
+        return self.done / self.elapsed if self.elapsed else 0.0
+
+    def run(self):
+        """Import on the calling thread; raises instead of setting error"""
+        if self.format == 'json':
+            raise ValueError('Import reads CSV or JSON Lines files')
+        if self.format == 'csv' and self.table not in INSERT_SQL:
+            raise ValueError('Name the table for a CSV file, e.g. customers.csv or sales.csv')
+
+        # A second writer next to the app's: WAL lets the app keep reading,
+        # and its own writes wait on busy_timeout for the batch to commit
+        conn = connect_writer(self.db_path, timeout=30)
+        conn.execute('PRAGMA foreign_keys = ON')
+        # The bigger cache keeps the indexes hot while they grow
+        conn.execute('PRAGMA cache_size = -131072')
+        start = time.perf_counter()
+        try:
+            with self._open_input() as (raw, stream):
+                batch = []
+                for record in self._records(stream):
+                    batch.append(record)
+                    if len(batch) >= self.batch_size:
+                        self._import_batch(conn, batch)
+                        batch = []
+                        self.bytes_read = raw.tell()
+                        self.elapsed = time.perf_counter() - start
+                        if self.cancelled:
+                            return
+                if batch:
+                    self._import_batch(conn, batch)
+                self.bytes_read = self.bytes_total
+        finally:
+            self.elapsed = time.perf_counter() - start
+            conn.close()
+            if self._errors is not None:
+                self._errors.close()
+
+    def _work(self):
+        try:
+            self.run()
+        except Exception as e:
+            self.error = e
+
+    # Reading
+
+    def _table_from_name(self) -> Optional[str]:
+        stem = os.path.basename(self.filepath).lower().split('.')[0]
+        for table in INSERT_SQL:
+            if stem == table or stem.endswith('_' + table):
+                return table
+        return None
+
+    @contextmanager
+    def _open_input(self) -> Iterator[Tuple[IO[bytes], IO[str]]]:
+        """(raw file, text stream); raw gives the byte offset for progress, even through gzip"""
+        with open(self.filepath, 'rb') as raw:
+            binary = gzip.GzipFile(fileobj=raw) if self.compressed else raw
+            yield raw, io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+    def _records(self, stream: IO[str]) -> Iterator[Tuple[Dict[str, Any], str]]:
+        """(record, table) for every input row; unparsable lines go straight to the error file"""
+        if self.format == 'csv':
+            for record in csv.DictReader(stream):
+                yield record, self.table
+            return
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError('not an object')
+            except ValueError as e:
+                self._reject({'line': line_number, 'text': line.rstrip('\n')}, f'Invalid JSON: {e}')
+                continue
+            yield record, record.get('table') or self.table
+
+    # Writing
+
+    def _import_batch(self, conn: sqlite3.Connection, batch: List[Tuple[Dict[str, Any], str]]):
+        """Insert one batch in a single transaction, customers first so later rows can refer to them"""
+        by_table: Dict[str, List[Dict[str, Any]]] = {}
+        for record, table in batch:
+            if table not in INSERT_SQL:
+                self._reject(record, f'Unknown table {table!r}; expected one of {", ".join(INSERT_SQL)}')
+            else:
+                by_table.setdefault(table, []).append(record)
+
+        with conn:
+            # Explicit, so the trigger DDL in insert_rows shares the batch's transaction
+            conn.execute('BEGIN')
+            if 'customers' in by_table:
+                self._insert_customers(conn, by_table['customers'])
+            for table in ('sales', 'tasks'):
+                if table in by_table:
+                    self._insert_linked(conn, table, by_table[table])
+
+    def _insert_customers(self, conn: sqlite3.Connection, records: List[Dict[str, Any]]):
+        rows, emails = [], []
+        batch_emails = set()
+        existing = self._lookup_emails(conn, [_text(r, 'email') for r in records])
+        for record in records:
+            try:
+                email = _text(record, 'email')
+                if email is not None:
+                    if email in existing or email in batch_emails:
+                        raise RowError(f'a customer with email {email} already exists')
+                    batch_emails.add(email)
+                rows.append((_required(record, 'name'), email, _text(record, 'phone', ''),
+                             _text(record, 'company', ''), _text(record, 'address', ''),
+                             _choice(record, 'status', 'Active', CUSTOMER_STATUSES),
+                             _date(record, 'created_date', self._today), _text(record, 'notes', '')))
+                emails.append(email)
+            except RowError as e:
+                self._reject(record, str(e))
+        self._insert_rows(conn, 'customers', rows)
+        # Fresh customers are the likeliest targets of the sales and tasks that follow
+        if any(emails):
+            self._lookup_emails(conn, emails)
+
+    def _insert_linked(self, conn: sqlite3.Connection, table: str, records: List[Dict[str, Any]]):
+        """Sales or tasks, with customer_email resolved to customer_id"""
+        known = self._lookup_emails(conn, [_text(r, 'customer_email') for r in records])
+        ids = {row[0] for row in self._existing_ids(conn, [_text(r, 'customer_id') for r in records
+                                                          if not _text(r, 'customer_email')])}
+        rows = []
+        for record in records:
+            try:
+                customer_id = self._customer_id(record, known, ids)
+                if table == 'sales':
+                    rows.append((customer_id, _required(record, 'product_name'), _amount(record),
+                                 _choice(record, 'status', 'Pending', SALE_STATUSES),
+                                 _date(record, 'sale_date', self._today), _date(record, 'created_date', self._today),
+                                 _text(record, 'notes', '')))
+                else:
+                    rows.append((customer_id, _required(record, 'title'), _text(record, 'description', ''),
+                                 _choice(record, 'priority', 'Medium', TASK_PRIORITIES),
+                                 _choice(record, 'status', 'Pending', TASK_STATUSES),
+                                 _date(record, 'due_date', self._today), _date(record, 'created_date', self._today)))
+            except RowError as e:
+                self._reject(record, str(e))
+        self._insert_rows(conn, table, rows)
+
+    def _insert_rows(self, conn: sqlite3.Connection, table: str, rows: List[tuple]):
+        insert_rows(conn, table, rows)
+        self.done += len(rows)
+
+    def _customer_id(self, record: Dict[str, Any], known: Dict[str, int], ids: set) -> int:
+        email = _text(record, 'customer_email')
+        if email is not None:
+            if email not in known:
+                raise RowError(f'no customer with email {email}')
+            return known[email]
+        raw_id = _text(record, 'customer_id')
+        if raw_id is None:
+            raise RowError('customer_email or customer_id is required')
+        if not raw_id.isdigit() or int(raw_id) not in ids:
+            raise RowError(f'no customer with id {raw_id}')
+        return int(raw_id)
+
+    def _lookup_emails(self, conn: sqlite3.Connection, emails: List[Optional[str]]) -> Dict[str, int]:
+        """email -> customer id for the given emails, via the cache and the UNIQUE email index"""
+        wanted = {email for email in emails if email}
+        missing = [email for email in wanted if email not in self._emails]
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            marks = ', '.join('?' * len(chunk))
+            for customer_id, email in conn.execute(
+                    f'SELECT id, email FROM customers WHERE email IN ({marks})', chunk):
+                self._emails[email] = customer_id
+        if len(self._emails) > 1000000:
+            # Bound the cache on very large imports; later batches look up again
+            self._emails.clear()
+            return self._lookup_emails(conn, emails)
+        return {email: self._emails[email] for email in wanted if email in self._emails}
+
+    def _existing_ids(self, conn: sqlite3.Connection, raw_ids: List[Optional[str]]) -> List[tuple]:
+        ids = sorted({int(raw) for raw in raw_ids if raw and raw.isdigit()})
+        found = []
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            found += conn.execute(f'SELECT id FROM customers WHERE id IN ({", ".join("?" * len(chunk))})',
+                                  chunk).fetchall()
+        return found
+
+    def _reject(self, record: Dict[str, Any], message: str):
+        if self._errors is None:
+            self._open_error_file(record)
+        self._error_writer(record, message)
+        self.rejected += 1
+
+    def _open_error_file(self, record: Dict[str, Any]):
+        base = self.filepath[:-3] if self.compressed else self.filepath
+        stem = os.path.splitext(base)[0]
+        if self.format == 'csv':
+            self.error_path = f'{stem}.errors.csv'
+            self._errors = open(self.error_path, 'w', encoding='utf-8', newline='')
+            writer = csv.DictWriter(self._errors, fieldnames=list(record) + ['error'], extrasaction='ignore')
+            writer.writeheader()
+            self._error_writer = lambda rec, message: writer.writerow({**rec, 'error': message})
+        else:
+            self.error_path = f'{stem}.errors.jsonl'
+            self._errors = open(self.error_path, 'w', encoding='utf-8')
+            self._error_writer = lambda rec, message: self._errors.write(
+                json.dumps({**rec, 'error': message}) + '\n')
+
+def _amount(record: Dict[str, Any]) -> float:
+    value = _required(record, 'amount')
+    try:
+        return float(str(value).replace(',', '').lstrip('$'))
+    except ValueError:
+        raise RowError(f'amount must be a number, got {value!r}')
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Bulk import customers, sales and tasks from CSV or JSON Lines')
+    parser.add_argument('input', help='e.g. customers.csv, sales.csv.gz or data.jsonl')
+    parser.add_argument('--database', default='crm_database.db')
+    parser.add_argument('--table', choices=list(INSERT_SQL), help='table for CSV files or untagged JSON records')
+    parser.add_argument('--batch-size', type=int, default=50000)
+    args = parser.parse_args()
+
+    job = ImportJob(args.database, args.input, args.table, args.batch_size)
+    job.run()
+    print(f'{job.done:,} rows imported, {job.rejected:,} rejected in {job.elapsed:.1f} s '
+          f'({job.rate:,.0f} rows/s)' + (f'; errors in {job.error_path}' if job.error_path else ''))
@@ -0,0 +1,475 @@
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+# =================== MIGRATIONS ===================
+
+@dataclass
+class Backfill:
+    """Data change applied in rowid ranges, one short transaction per chunk.
+
+    sql must take the chunk bounds as its last two parameters, e.g.
+    "UPDATE sales SET x = ... WHERE rowid BETWEEN ? AND ?". Each chunk
+    commits together with the walk's progress, so it runs exactly once
+    even across an interrupted upgrade, and may be additive.
+    """
+    table: str
+    sql: str
+    chunk_size: int = 10000
+
+@dataclass
+class Migration:
+    """Numbered schema step; moves PRAGMA user_version from version - 1 to version.
+
+    statements commit first, then each backfill walks its table, then
+    finish commits together with the version bump.
+    """
+    version: int
+    description: str
+    statements: List[str] = field(default_factory=list)
+    backfills: List[Backfill] = field(default_factory=list)
+    finish: List[str] = field(default_factory=list)
+
+def _rebuild_with_cascade(table: str, create_new: str) -> List[str]:
+    """Statements that swap table for the <table>_new defined by create_new, keeping ids,
+    the AUTOINCREMENT counter and every row whose customer still exists"""
+    return [
+        create_new,
+        f'INSERT INTO {table}_new SELECT * FROM {table} '
+        f'WHERE customer_id IS NULL OR customer_id IN (SELECT id FROM customers)',
+        f"DELETE FROM sqlite_sequence WHERE name = '{table}_new'",
+        f"INSERT INTO sqlite_sequence (name, seq) SELECT '{table}_new', seq FROM sqlite_sequence "
+        f"WHERE name = '{table}'",
+        f'DROP TABLE {table}',
+        f'ALTER TABLE {table}_new RENAME TO {table}',
+    ]
+
+def _summary_triggers(table: str, summary: str, keys: Dict[str, str], amount: Optional[str] = None,
+                      watched: Tuple[str, ...] = (), when: Optional[str] = None) -> List[str]:
+    """Triggers keeping summary (keys..., count[, amount]) in step with table.
+
+    keys maps each summary column to an expression over {row}, which is
+    filled in with new or old; groups whose count drops to zero are removed.
+    when, also over {row}, limits the triggers to the rows it holds for.
+    """
+    def condition(row):
+        return f' WHEN {when.format(row=row)}' if when else ''
+
+    def add(row):
+        columns = ', '.join(list(keys) + ['count'] + (['amount'] if amount else []))
+        values = ', '.join([expr.format(row=row) for expr in keys.values()] + ['1']
+                           + ([amount.format(row=row)] if amount else []))
+        updates = 'count = count + 1' + (', amount = amount + excluded.amount' if amount else '')
+        return (f'INSERT INTO {summary} ({columns}) VALUES ({values}) '
+                f'ON CONFLICT ({", ".join(keys)}) DO UPDATE SET {updates};')
+
+    def remove(row):
+        where = ' AND '.join(f'{column} = {expr.format(row=row)}' for column, expr in keys.items())
+        updates = 'count = count - 1' + (f', amount = amount - {amount.format(row=row)}' if amount else '')
+        return (f'UPDATE {summary} SET {updates} WHERE {where}; '
+                f'DELETE FROM {summary} WHERE {where} AND count <= 0;')
+
+    return [
+        f'CREATE TRIGGER {summary}_insert AFTER INSERT ON {table}{condition("new")} BEGIN {add("new")} END',
+        f'CREATE TRIGGER {summary}_delete AFTER DELETE ON {table}{condition("old")} BEGIN {remove("old")} END',
+        f'CREATE TRIGGER {summary}_update AFTER UPDATE OF {", ".join(watched)} ON {table}{condition("old")} '
+        f'BEGIN {remove("old")} {add("new")} END',
+    ]
+
+def _summary_online(version: int, index: int, table: str, summary: str, keys: Dict[str, str],
+                    amount: Optional[str] = None, watched: Tuple[str, ...] = ()
+                    ) -> Tuple[List[str], Backfill, List[str]]:
+    """(statements, backfill, finish) filling summary from table in chunks while it is written to.
+
+    The summary's triggers go in first, but only act on rows the walk has
+    passed (or that are newer than where it ends); the rest are counted
+    by their chunk as they are when it runs. finish swaps in the
+    unconditional triggers of _summary_triggers. index is the backfill's
+    position in the migration, which migration_progress tracks.
+    """
+    covered = (f'EXISTS (SELECT 1 FROM migration_progress WHERE version = {version} AND (backfill > {index} '
+               f'OR (backfill = {index} AND ({{row}}.rowid <= last_rowid OR {{row}}.rowid > high))))')
+    columns = ', '.join(list(keys) + ['count'] + (['amount'] if amount else []))
+    values = ', '.join([expr.format(row=table) for expr in keys.values()] + ['COUNT(*)']
+                       + ([f'TOTAL({amount.format(row=table)})'] if amount else []))
+    updates = 'count = count + excluded.count' + (', amount = amount + excluded.amount' if amount else '')
+    backfill = Backfill(table, f'INSERT INTO {summary} ({columns}) SELECT {values} FROM {table} '
+                               f'WHERE rowid BETWEEN ? AND ? GROUP BY {", ".join(map(str, range(1, len(keys) + 1)))} '
+                               f'ON CONFLICT ({", ".join(keys)}) DO UPDATE SET {updates}')
+    drops = [f'DROP TRIGGER {summary}_{event}' for event in ('insert', 'delete', 'update')]
+    return (_summary_triggers(table, summary, keys, amount, watched, when=covered), backfill,
+            drops + _summary_triggers(table, summary, keys, amount, watched))
+
+def _online(version: int, *summaries: Tuple[str, str, Dict[str, str], Optional[str], Tuple[str, ...]]
+            ) -> Tuple[List[str], List[Backfill], List[str]]:
+    """_summary_online for each (table, summary, keys, amount, watched), combined per part"""
+    statements, backfills, finish = [], [], []
+    for index, summary in enumerate(summaries):
+        triggers, backfill, final = _summary_online(version, index, *summary)
+        statements += triggers
+        backfills.append(backfill)
+        finish += final
+    return statements, backfills, finish
+
+CUSTOMER_COUNTS = ('customers', 'customer_counts', {'status': "IFNULL({row}.status, '')"}, None, ('status',))
+SALES_MONTHLY = ('sales', 'sales_monthly', {'status': "IFNULL({row}.status, '')",
+                                            'month': "IFNULL(strftime('%Y-%m', {row}.sale_date), '')"},
+                 '{row}.amount', ('status', 'sale_date', 'amount'))
+TASK_COUNTS = ('tasks', 'task_counts', {'status': "IFNULL({row}.status, '')",
+                                        'priority': "IFNULL({row}.priority, '')"}, None, ('status', 'priority'))
+SALES_DAILY = ('sales', 'sales_daily', {'day': "IFNULL(date({row}.sale_date), '')",
+                                        'status': "IFNULL({row}.status, '')"},
+               '{row}.amount', ('status', 'sale_date', 'amount'))
+SALES_PRODUCT_DAILY = ('sales', 'sales_product_daily', {'product': "IFNULL({row}.product_name, '')",
+                                                        'day': "IFNULL(date({row}.sale_date), '')",
+                                                        'status': "IFNULL({row}.status, '')"},
+                       '{row}.amount', ('product_name', 'status', 'sale_date', 'amount'))
+SUMMARIES_5 = _online(5, CUSTOMER_COUNTS, SALES_MONTHLY, TASK_COUNTS)
+ROLLUPS_6 = _online(6, SALES_DAILY, SALES_PRODUCT_DAILY)
+
+MIGRATIONS = [
+    Migration(1, 'Secondary indexes for the refresh, filter and dashboard queries', [
+        'CREATE INDEX IF NOT EXISTS idx_customers_status ON customers (status)',
+        'CREATE INDEX IF NOT EXISTS idx_customers_created ON customers (created_date)',
+        # A customer's sales in date order, for the analytics ranges (migration 6)
+        'CREATE INDEX IF NOT EXISTS idx_sales_customer_date ON sales (customer_id, sale_date)',
+        'CREATE INDEX IF NOT EXISTS idx_sales_date ON sales (sale_date)',
+        'CREATE INDEX IF NOT EXISTS idx_tasks_customer ON tasks (customer_id)',
+        'CREATE INDEX IF NOT EXISTS idx_tasks_status_due ON tasks (status, due_date)',
+        'CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks (priority)',
+        'CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks (created_date)',
+        # Customer timelines page through a customer's interactions newest first
+        'CREATE INDEX IF NOT EXISTS idx_interactions_customer_date ON interactions (customer_id, date)',
+    ]),
+    # External-content FTS5 indexes: the text stays in customers/sales, triggers keep the
+    # index in step, and 'rebuild' indexes existing rows in the same transaction. A chunked
+    # Backfill is not used because a row inserted mid-walk would be indexed twice.
+    Migration(2, 'Full-text search over customers and sales', [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5("
+        "name, email, company, notes, content='customers', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        '''
+        CREATE TRIGGER IF NOT EXISTS customers_fts_insert AFTER INSERT ON customers BEGIN
+            INSERT INTO customers_fts (rowid, name, email, company, notes)
+            VALUES (new.id, new.name, new.email, new.company, new.notes);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS customers_fts_delete AFTER DELETE ON customers BEGIN
+            INSERT INTO customers_fts (customers_fts, rowid, name, email, company, notes)
+            VALUES ('delete', old.id, old.name, old.email, old.company, old.notes);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS customers_fts_update
+        AFTER UPDATE OF name, email, company, notes ON customers BEGIN
+            INSERT INTO customers_fts (customers_fts, rowid, name, email, company, notes)
+            VALUES ('delete', old.id, old.name, old.email, old.company, old.notes);
+            INSERT INTO customers_fts (rowid, name, email, company, notes)
+            VALUES (new.id, new.name, new.email, new.company, new.notes);
+        END
+        ''',
+        "INSERT INTO customers_fts (customers_fts) VALUES ('rebuild')",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS sales_fts USING fts5("
+        "product_name, content='sales', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        '''
+        CREATE TRIGGER IF NOT EXISTS sales_fts_insert AFTER INSERT ON sales BEGIN
+            INSERT INTO sales_fts (rowid, product_name) VALUES (new.id, new.product_name);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS sales_fts_delete AFTER DELETE ON sales BEGIN
+            INSERT INTO sales_fts (sales_fts, rowid, product_name)
+            VALUES ('delete', old.id, old.product_name);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS sales_fts_update AFTER UPDATE OF product_name ON sales BEGIN
+            INSERT INTO sales_fts (sales_fts, rowid, product_name)
+            VALUES ('delete', old.id, old.product_name);
+            INSERT INTO sales_fts (rowid, product_name) VALUES (new.id, new.product_name);
+        END
+        ''',
+        "INSERT INTO sales_fts (sales_fts) VALUES ('rebuild')",
+    ]),
+    # (status, rowid) order serves the status-filtered keyset pages of the sales grid
+    Migration(3, 'Index for paging sales by status', [
+        'CREATE INDEX IF NOT EXISTS idx_sales_status ON sales (status)',
+    ]),
+    # SQLite cannot alter a foreign key, so sales, tasks and interactions are rebuilt with
+    # ON DELETE CASCADE (https://sqlite.org/lang_altertable.html#otheralter). Orphans of
+    # customers deleted earlier are not copied: the grids never showed them, and once
+    # foreign keys are enforced any later update to them would fail. Not chunked: a copy
+    # walked in chunks would need triggers mirroring every write into the <table>_new
+    # tables, and the DROP/RENAME swap and index rebuilds still take one transaction over
+    # the whole table, so the one-off rebuild runs as a single step.
+    Migration(4, 'Cascade customer deletes to sales, tasks and interactions',
+              _rebuild_with_cascade('sales', '''
+                  CREATE TABLE sales_new (
+                      id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      customer_id INTEGER,
+                      product_name TEXT NOT NULL,
+                      amount REAL NOT NULL,
+                      status TEXT DEFAULT 'Pending',
+                      sale_date TEXT,
+                      created_date TEXT,
+                      notes TEXT,
+                      FOREIGN KEY (customer_id) REFERENCES customers (id) ON DELETE CASCADE
+                  )
+              ''') + _rebuild_with_cascade('tasks', '''
+                  CREATE TABLE tasks_new (
+                      id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      customer_id INTEGER,
+                      title TEXT NOT NULL,
+                      description TEXT,
+                      priority TEXT DEFAULT 'Medium',
+                      status TEXT DEFAULT 'Pending',
+                      due_date TEXT,
+                      created_date TEXT,
+                      FOREIGN KEY (customer_id) REFERENCES customers (id) ON DELETE CASCADE
+                  )
+              ''') + _rebuild_with_cascade('interactions', '''
+                  CREATE TABLE interactions_new (
+                      id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      customer_id INTEGER,
+                      type TEXT NOT NULL,
+                      description TEXT,
+                      date TEXT,
+                      FOREIGN KEY (customer_id) REFERENCES customers (id) ON DELETE CASCADE
+                  )
+              ''') + [
+                  # Indexes and triggers went with the old tables
+                  'CREATE INDEX idx_sales_customer_date ON sales (customer_id, sale_date)',
+                  'CREATE INDEX idx_sales_date ON sales (sale_date)',
+                  'CREATE INDEX idx_sales_status ON sales (status)',
+                  'CREATE INDEX idx_tasks_customer ON tasks (customer_id)',
+                  'CREATE INDEX idx_tasks_status_due ON tasks (status, due_date)',
+                  'CREATE INDEX idx_tasks_priority ON tasks (priority)',
+                  'CREATE INDEX idx_tasks_created ON tasks (created_date)',
+                  'CREATE INDEX idx_interactions_customer_date ON interactions (customer_id, date)',
+                  '''
+                  CREATE TRIGGER sales_fts_insert AFTER INSERT ON sales BEGIN
+                      INSERT INTO sales_fts (rowid, product_name) VALUES (new.id, new.product_name);
+                  END
+                  ''',
+                  '''
+                  CREATE TRIGGER sales_fts_delete AFTER DELETE ON sales BEGIN
+                      INSERT INTO sales_fts (sales_fts, rowid, product_name)
+                      VALUES ('delete', old.id, old.product_name);
+                  END
+                  ''',
+                  '''
+                  CREATE TRIGGER sales_fts_update AFTER UPDATE OF product_name ON sales BEGIN
+                      INSERT INTO sales_fts (sales_fts, rowid, product_name)
+                      VALUES ('delete', old.id, old.product_name);
+                      INSERT INTO sales_fts (rowid, product_name) VALUES (new.id, new.product_name);
+                  END
+                  ''',
+                  # Drops the entries of orphans that were not copied
+                  "INSERT INTO sales_fts (sales_fts) VALUES ('rebuild')",
+              ]),
+    # Dashboard aggregates kept current by triggers, so reading them costs a few rows
+    # whatever the table sizes. NULL keys are stored as '' so they can be primary keys.
+    # Filled in chunks while the app keeps writing, see _summary_online.
+    Migration(5, 'Summary tables for the dashboard counters and monthly sales', [
+        'CREATE TABLE customer_counts (status TEXT PRIMARY KEY, count INTEGER NOT NULL) WITHOUT ROWID',
+        'CREATE TABLE sales_monthly (status TEXT, month TEXT, count INTEGER NOT NULL, amount REAL NOT NULL, '
+        'PRIMARY KEY (status, month)) WITHOUT ROWID',
+        'CREATE TABLE task_counts (status TEXT, priority TEXT, count INTEGER NOT NULL, '
+        'PRIMARY KEY (status, priority)) WITHOUT ROWID',
+    ] + SUMMARIES_5[0], SUMMARIES_5[1], SUMMARIES_5[2]),
+    # Day buckets for the analytics ranges; weeks are summed from days and quarters from
+    # sales_monthly, so ten years of any bucket size reads at most a few thousand rows.
+    # A customer's sales are few enough to read from sales through idx_sales_customer_date
+    # (migration 1). The rollups are filled in chunks like migration 5's summaries.
+    Migration(6, 'Daily sales rollups for time-range analytics', [
+        'CREATE TABLE sales_daily (day TEXT, status TEXT, count INTEGER NOT NULL, amount REAL NOT NULL, '
+        'PRIMARY KEY (day, status)) WITHOUT ROWID',
+        'CREATE TABLE sales_product_daily (product TEXT COLLATE NOCASE, day TEXT, status TEXT, '
+        'count INTEGER NOT NULL, amount REAL NOT NULL, PRIMARY KEY (product, day, status)) WITHOUT ROWID',
+    ] + ROLLUPS_6[0], ROLLUPS_6[1], ROLLUPS_6[2]),
+]
+
+# =================== MIGRATOR ===================
+
+class Migrator:
+    """Brings a database up to the latest migration.
+
+    A migration's statements and its user_version bump commit together.
+    Migrations with backfills first commit their statements, then walk the
+    table in rowid chunks, each chunk committing on its own and pausing so
+    other connections can take the write lock, then commit finish with the
+    version bump. Progress is kept in migration_progress, so an interrupted
+    upgrade resumes where it stopped; each walk's end, high, is fixed when
+    it starts, and triggers may read it to tell walked rows from newer ones.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, migrations: Optional[List[Migration]] = None,
+                 pause: float = 0.0, log: Callable[[str], None] = print):
+        self.conn = conn
+        self.migrations = sorted(MIGRATIONS if migrations is None else migrations,
+                                 key=lambda m: m.version)
+        self.pause = pause
+        self.log = log
+
+    def current_version(self) -> int:
+        return self.conn.execute('PRAGMA user_version').fetchone()[0]
+
+    def pending(self) -> List[Migration]:
+        version = self.current_version()
+        return [m for m in self.migrations if m.version > version]
+
+    def run(self, dry_run: bool = False) -> List[Tuple[str, float]]:
+        """Apply pending migrations and return (step, seconds) timings.
+
+        With dry_run every step still executes, so the timings are real,
+        but everything is rolled back at the end.
+        """
+        timings = []
+        if dry_run:
+            self._begin()
+            try:
+                for migration in self.pending():
+                    self._dry_run(migration, timings)
+            finally:
+                self.conn.rollback()
+            for step, elapsed in timings:
+                self.log(f'{step:<72} {elapsed * 1000:10.1f} ms')
+        else:
+            for migration in self.pending():
+                self._apply(migration, timings)
+        return timings
+
+    def _apply(self, migration: Migration, timings: List[Tuple[str, float]]):
+        expected = self.current_version() + 1
+        if migration.version != expected:
+            raise RuntimeError(f'Migration {migration.version} found, expected {expected}')
+
+        if not migration.backfills:
+            with self.conn:
+                self._begin()
+                self._run_statements(migration, timings)
+                self._run_statements(migration, timings, migration.finish)
+                self._set_version(migration.version)
+            return
+
+        self._ensure_progress_table()
+        progress = self._progress(migration.version)
+        if progress is None:
+            with self.conn:
+                self._begin()
+                self._run_statements(migration, timings)
+                self.conn.execute('INSERT INTO migration_progress (version, backfill, last_rowid, high) '
+                                  'VALUES (?, 0, NULL, NULL)', (migration.version,))
+            progress = (0, None, None)
+        for index in range(progress[0], len(migration.backfills)):
+            resumed = progress if index == progress[0] else (index, None, None)
+            self._run_backfill(migration, index, resumed[1], resumed[2], timings)
+        with self.conn:
+            self._begin()
+            self._run_statements(migration, timings, migration.finish)
+            self.conn.execute('DELETE FROM migration_progress WHERE version = ?', (migration.version,))
+            self._set_version(migration.version)
+
+    def _dry_run(self, migration: Migration, timings: List[Tuple[str, float]]):
+        self._run_statements(migration, timings)
+        for index, backfill in enumerate(migration.backfills):
+            start = time.perf_counter()
+            chunks = 0
+            for low, high in self._chunks(backfill, None, self._max_rowid(backfill)):
+                self.conn.execute(backfill.sql, (low, high))
+                chunks += 1
+            timings.append((f'{migration.version}: backfill {index + 1} on {backfill.table} '
+                            f'({chunks} chunks)', time.perf_counter() - start))
+        self._run_statements(migration, timings, migration.finish)
+        self._set_version(migration.version)
+
+    def _run_statements(self, migration: Migration, timings: List[Tuple[str, float]],
+                        statements: Optional[List[str]] = None):
+        for statement in migration.statements if statements is None else statements:
+            start = time.perf_counter()
+            self.conn.execute(statement)
+            summary = ' '.join(statement.split())[:64]
+            timings.append((f'{migration.version}: {summary}', time.perf_counter() - start))
+
+    def _run_backfill(self, migration: Migration, index: int, start_after: Optional[int],
+                      walk_high: Optional[int], timings: List[Tuple[str, float]]):
+        backfill = migration.backfills[index]
+        start = time.perf_counter()
+        if walk_high is None:
+            # Fixed before the first chunk: rows added later are past it and left to triggers
+            with self.conn:
+                self.conn.execute('BEGIN IMMEDIATE')
+                walk_high = self._max_rowid(backfill)
+                self.conn.execute('UPDATE migration_progress SET backfill = ?, last_rowid = NULL, high = ? '
+                                  'WHERE version = ?', (index, walk_high, migration.version))
+        chunks = 0
+        for low, high in self._chunks(backfill, start_after, walk_high):
+            with self.conn:
+                self._begin()
+                self.conn.execute(backfill.sql, (low, high))
+                self.conn.execute('UPDATE migration_progress SET backfill = ?, last_rowid = ? '
+                                  'WHERE version = ?', (index, high, migration.version))
+            chunks += 1
+            if self.pause:
+                time.sleep(self.pause)
+        with self.conn:
+            self.conn.execute('UPDATE migration_progress SET backfill = ?, last_rowid = NULL, high = NULL '
+                              'WHERE version = ?', (index + 1, migration.version))
+        timings.append((f'{migration.version}: backfill {index + 1} on {backfill.table} '
+                        f'({chunks} chunks)', time.perf_counter() - start))
+
+    def _max_rowid(self, backfill: Backfill) -> int:
+        return self.conn.execute(f'SELECT IFNULL(MAX(rowid), 0) FROM {backfill.table}').fetchone()[0]
+
+    def _chunks(self, backfill: Backfill, start_after: Optional[int], high: int):
+        """(low, high) rowid bounds covering the table up to high"""
+        if start_after is not None:
+            low = start_after + 1
+        else:
+            low = self.conn.execute(f'SELECT MIN(rowid) FROM {backfill.table}').fetchone()[0]
+            if low is None:
+                return
+        while low <= high:
+            upper = min(low + backfill.chunk_size - 1, high)
+            yield low, upper
+            low = upper + 1
+
+    def _begin(self):
+        # sqlite3 leaves DDL in autocommit mode unless a transaction is open
+        self.conn.execute('BEGIN')
+
+    def _set_version(self, version: int):
+        self.conn.execute(f'PRAGMA user_version = {int(version)}')
+
+    def _ensure_progress_table(self):
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS migration_progress ('
+                              'version INTEGER PRIMARY KEY, backfill INTEGER, last_rowid INTEGER, high INTEGER)')
+
+    def _progress(self, version: int) -> Optional[Tuple[int, Optional[int], Optional[int]]]:
+        return self.conn.execute('SELECT backfill, last_rowid, high FROM migration_progress WHERE version = ?',
+                                 (version,)).fetchone()
+
+if __name__ == '__main__':
+    import argparse
+    from crm_repository import SCHEMA
+
+    parser = argparse.ArgumentParser(description='Upgrade a CRM database to the latest schema')
+    parser.add_argument('database', nargs='?', default='crm_database.db')
+    parser.add_argument('--dry-run', action='store_true', help='time each step, then roll back')
+    parser.add_argument('--pause', type=float, default=0.0, help='seconds to yield between chunks')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    with conn:
+        for statement in SCHEMA:
+            conn.execute(statement)
+    migrator = Migrator(conn, pause=args.pause)
+    print(f'Schema version {migrator.current_version()}, {len(migrator.pending())} pending')
+    timings = migrator.run(dry_run=args.dry_run)
+    print(f'Total {sum(elapsed for _, elapsed in timings) * 1000:.1f} ms'
+          + (' (rolled back)' if args.dry_run else ''))
+    conn.close()
@@ -0,0 +1,110 @@
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+from crm_repository import Change, TaskRepo
+
+# =================== DUE-DATE REMINDERS ===================
+
+class DueDateScheduler:
+    """Upcoming due dates of open tasks in a min-heap, kept current from Change events.
+
+    load() reads (id, due_date) of every open task with one covering-index
+    query; tasks already due are only counted. apply() folds in one task
+    Change in O(log n): a new due date is pushed, and the entry it replaces
+    is marked stale and skipped when it reaches the top (lazy deletion),
+    with the heap compacted once stale entries make up half of it.
+    pop_due(day) hands back each task whose due date has arrived since the
+    last call, exactly once, so the caller can announce it. Nothing here
+    touches the database after load(). No Tk dependency: CRMApp drives it
+    with root.after.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[str, int]] = []  # (due date, task id) of tasks due after _day
+        self._stale: Dict[Tuple[str, int], int] = {}
+        self._stale_count = 0
+        self._day = ''
+        self.due_count = 0  # open tasks due on or before _day
+
+    def load(self, tasks: TaskRepo, day: str):
+        """Start over from the open tasks in the database, as of day"""
+        dates: Dict[str, str] = {}
+        heap = []
+        due = 0
+        for task_id, due_date in tasks.open_due_dates():
+            if due_date <= day:
+                due += 1
+            else:
+                # A few hundred distinct dates shared by every entry
+                heap.append((dates.setdefault(due_date, due_date), task_id))
+        heapq.heapify(heap)
+        self._heap, self._stale, self._stale_count = heap, {}, 0
+        self._day, self.due_count = day, due
+
+    def apply(self, change: Change) -> bool:
+        """Fold one task Change in; True when the task's due state moved.
+
+        A task saved with a due date already reached counts as due straight
+        away without being returned by pop_due(): whoever saved it knows.
+        """
+        if change.table != 'tasks':
+            return False
+        old, new = self._due_date(change.old), self._due_date(change.new)
+        if old == new:
+            return False
+        if old is not None and old <= self._day:
+            self.due_count -= 1
+        elif old is not None:
+            key = (old, change.row_id)
+            self._stale[key] = self._stale.get(key, 0) + 1
+            self._stale_count += 1
+        if new is not None and new <= self._day:
+            self.due_count += 1
+        elif new is not None:
+            heapq.heappush(self._heap, (new, change.row_id))
+        if 2 * self._stale_count > len(self._heap) + 1024:
+            self._compact()
+        return True
+
+    def next_due(self) -> Optional[str]:
+        """Earliest due date still to come, or None"""
+        while self._heap and self._heap[0] in self._stale:
+            self._drop_stale(heapq.heappop(self._heap))
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, day: str) -> List[int]:
+        """Ids of the tasks whose due date (on or before day) arrived since the last call"""
+        reached = []
+        while self._heap and self._heap[0][0] <= day:
+            entry = heapq.heappop(self._heap)
+            if entry in self._stale:
+                self._drop_stale(entry)
+            else:
+                reached.append(entry[1])
+        self.due_count += len(reached)
+        self._day = max(self._day, day)
+        return reached
+
+    @staticmethod
+    def _due_date(row: Optional[tuple]) -> Optional[str]:
+        # tasks columns: id, customer_id, title, description, priority, status, due_date, created_date
+        if row is None or row[5] in (None, 'Completed') or not row[6]:
+            return None
+        return row[6]
+
+    def _drop_stale(self, entry: Tuple[str, int]):
+        self._stale_count -= 1
+        if self._stale[entry] == 1:
+            del self._stale[entry]
+        else:
+            self._stale[entry] -= 1
+
+    def _compact(self):
+        heap = []
+        for entry in self._heap:
+            if entry in self._stale:
+                self._drop_stale(entry)
+            else:
+                heap.append(entry)
+        heapq.heapify(heap)
+        self._heap = heap
@@ -0,0 +1,358 @@
+import datetime
+import http.client
+import json
+import queue
+import socket
+import sqlite3
+import threading
+import urllib.parse
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from crm_repository import Change
+from crm_server import OPERATIONS, RESULT_SHAPES, ROW, ROWS, WRITE, change_from_json, json_default
+
+# =================== HTTP CLIENT ===================
+
+class RemoteError(Exception):
+    """The server turned a request down"""
+
+class ServerUnavailable(sqlite3.OperationalError):
+    """No answer from the server; callers treat it like a locked database"""
+
+# Server error types raised as the exception a local repository would have raised
+ERROR_TYPES = {'IntegrityError': sqlite3.IntegrityError, 'OperationalError': sqlite3.OperationalError,
+               'TypeError': TypeError, 'ValueError': ValueError}
+
+def decode(repo: str, method: str, value: Any) -> Any:
+    """A result back into what the repository method returns, by its RESULT_SHAPES entry"""
+    shape = RESULT_SHAPES[repo].get(method)
+    if shape == ROW:
+        return tuple(value) if value is not None else None
+    if shape == ROWS:
+        return [tuple(row) for row in value]
+    return value
+
+class RemoteClient:
+    """One keep-alive HTTP connection to a CRMServer, for one thread at a time.
+
+    interrupt() may be called from another thread to abandon the request in
+    flight (SearchExecutor does, as it would on a sqlite3 connection); the
+    next request reconnects.
+    """
+
+    MAX_URL = 4000  # longer reads go as a POST body
+
+    def __init__(self, url: str, token: Optional[str] = None, timeout: float = 10.0):
+        parts = urllib.parse.urlsplit(url)
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or 8765
+        self.token = token
+        self.timeout = timeout
+        self._conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Any:
+        """The decoded JSON answer; raises what the server's error type maps to"""
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        payload = json.dumps(body, default=json_default).encode('utf-8') if body is not None else None
+        # A kept-alive connection the server dropped fails on first use; reads are safe to resend
+        for attempt in range(2 if method == 'GET' else 1):
+            try:
+                self._conn.request(method, path, payload, headers)
+                response = self._conn.getresponse()
+                status, data = response.status, response.read()
+                break
+            except (http.client.HTTPException, OSError) as e:
+                self._conn.close()
+                if attempt or method != 'GET':
+                    raise ServerUnavailable(f'CRM server at {self.host}:{self.port} unavailable: {e}') from e
+        answer = json.loads(data) if data else {}
+        if status >= 400:
+            raise ERROR_TYPES.get(answer.get('type'), RemoteError)(answer.get('error', f'HTTP {status}'))
+        return answer
+
+    def call(self, repo: str, op: str, args: tuple = (), kwargs: Optional[Dict[str, Any]] = None
+             ) -> Tuple[Any, List[Change]]:
+        """(value, committed Changes) of one repository method on the server"""
+        if OPERATIONS[repo][op] == WRITE:
+            answer = self.request('POST', f'/api/{repo}/{op}', {'args': list(args), 'kwargs': kwargs or {}})
+            return answer['value'], [change_from_json(change) for change in answer['changes']]
+        query = {'args': json.dumps(list(args), default=json_default)}
+        query.update((name, json.dumps(value, default=json_default)) for name, value in (kwargs or {}).items())
+        path = f'/api/{repo}/{op}?{urllib.parse.urlencode(query)}'
+        if len(path) > self.MAX_URL:
+            # e.g. range_totals over thousands of customer ids; POSTed reads skip the retry
+            answer = self.request('POST', f'/api/{repo}/{op}', {'args': list(args), 'kwargs': kwargs or {}})
+        else:
+            answer = self.request('GET', path)
+        return answer['value'], []
+
+    def interrupt(self):
+        sock = self._conn.sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def close(self):
+        self._conn.close()
+
+# =================== REMOTE REPOSITORIES ===================
+
+class RemoteRepo:
+    """A table's repository on a CRMServer: the methods in OPERATIONS, same arguments and results.
+
+    Writes report the Changes the server committed to notify, as a local
+    repository reports its own.
+    """
+
+    def __init__(self, client: RemoteClient, table: str, notify: Optional[Callable[[Change], None]] = None):
+        self.client = client
+        self.table = table
+        self.notify = notify
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        if name not in OPERATIONS.get(self.table, {}):
+            raise AttributeError(f'{type(self).__name__} has no attribute {name!r}')
+
+        def call(*args, **kwargs):
+            return decode(self.table, name, self._call(name, args, kwargs))
+        return call
+
+    def _call(self, name: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        value, changes = self.client.call(self.table, name, args, kwargs)
+        if self.notify:
+            for change in changes:
+                self.notify(change)
+        return value
+
+class RemoteSalesRepo(RemoteRepo):
+    def range_totals(self, granularity: str, first: datetime.date, last: datetime.date, *args, **kwargs
+                     ) -> List[Tuple[datetime.date, int, float]]:
+        totals = self._call('range_totals', (granularity, first, last) + args, kwargs)
+        return [(datetime.date.fromisoformat(start), count, amount) for start, count, amount in totals]
+
+class RemoteTaskRepo(RemoteRepo):
+    def open_due_dates(self) -> Iterator[Tuple[int, str]]:
+        return iter(decode(self.table, 'open_due_dates', self._call('open_due_dates', (), {})))
+
+class RemoteRepositories:
+    """Remote twin of crm_repository.Repositories"""
+
+    # Each call commits on the server, so there is no batch() to group them in; the
+    # server batches the writes of all its clients instead
+    transactional = False
+
+    def __init__(self, client: RemoteClient, notify: Optional[Callable[[Change], None]] = None):
+        self.client = client
+        self.customers = RemoteRepo(client, 'customers', notify)
+        self.sales = RemoteSalesRepo(client, 'sales', notify)
+        self.tasks = RemoteTaskRepo(client, 'tasks', notify)
+        self.interactions = RemoteRepo(client, 'interactions', notify)
+
+    def rollback(self):
+        """Nothing to undo: every server call is its own transaction"""
+
+class RemoteConnections:
+    """Stands in for ConnectionManager: reader() lends a RemoteClient of its own"""
+
+    def __init__(self, url: str, token: Optional[str] = None, timeout: float = 10.0):
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+
+    @contextmanager
+    def reader(self, timeout: float = 30.0) -> Iterator[RemoteClient]:
+        client = RemoteClient(self.url, self.token, self.timeout)
+        try:
+            yield client
+        finally:
+            client.close()
+
+    def close(self):
+        pass
+
+# =================== CHANGE STREAM ===================
+
+class ChangeStream:
+    """Follows a CRMServer's /api/events on a worker thread.
+
+    Received Changes wait in a queue until take() collects them, so they
+    can be published on the caller's own thread. A dropped connection is
+    retried with Last-Event-ID, and the server replays what was missed;
+    when it cannot, it sends "reset" and take() reports that the caller has
+    to reload. No Tk dependency: CRMApp polls take() with root.after.
+    """
+
+    def __init__(self, url: str, token: Optional[str] = None, last_id: Optional[int] = None,
+                 heartbeat: float = 15.0):
+        parts = urllib.parse.urlsplit(url)
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or 8765
+        self.token = token
+        self.last_id = last_id
+        self.heartbeat = heartbeat
+        self.connected = threading.Event()
+        self._received: 'queue.Queue[Change]' = queue.Queue()
+        self._reset = threading.Event()
+        self._closed = threading.Event()
+        self._conn: Optional[http.client.HTTPConnection] = None
+        # http.client lets go of a streamed response's socket, so close() needs its own hold on it
+        self._sock: Optional[socket.socket] = None
+        self._thread = threading.Thread(target=self._work, name='crm-events', daemon=True)
+
+    def start(self) -> 'ChangeStream':
+        self._thread.start()
+        return self
+
+    def take(self) -> Tuple[List[Change], bool]:
+        """(Changes received since the last call, whether a reload is needed first)"""
+        reset = self._reset.is_set()
+        self._reset.clear()
+        changes = []
+        while True:
+            try:
+                changes.append(self._received.get_nowait())
+            except queue.Empty:
+                return changes, reset
+
+    def close(self):
+        self._closed.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._thread.join(timeout=5)
+
+    def _work(self):
+        retry = 2.0
+        while not self._closed.is_set():
+            try:
+                retry = self._follow(retry)
+            except (http.client.HTTPException, OSError, ValueError):
+                pass
+            self.connected.clear()
+            self._closed.wait(retry)
+
+    def _follow(self, retry: float) -> float:
+        """Read events until the connection drops; returns the retry delay the server asked for"""
+        # Twice the heartbeat: silence for longer means the connection is gone
+        self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.heartbeat * 2)
+        headers = {'Accept': 'text/event-stream'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        if self.last_id is not None:
+            headers['Last-Event-ID'] = str(self.last_id)
+        try:
+            self._conn.request('GET', '/api/events', headers=headers)
+            self._sock = self._conn.sock
+            if self._closed.is_set():  # closed while connecting, before there was a socket to shut down
+                return retry
+            response = self._conn.getresponse()
+            if response.status != 200:
+                return retry
+            self.connected.set()
+            event, data, event_id = 'message', [], None
+            for raw in response:
+                line = raw.decode('utf-8').rstrip('\r\n')
+                if line:
+                    field, _, value = line.partition(':')
+                    value = value[1:] if value.startswith(' ') else value
+                    if field == 'event':
+                        event = value
+                    elif field == 'data':
+                        data.append(value)
+                    elif field == 'id':
+                        event_id = value
+                    elif field == 'retry' and value.isdigit():
+                        retry = int(value) / 1000
+                    continue
+                # A blank line ends the event
+                if event == 'changes':
+                    for change in json.loads('\n'.join(data)):
+                        self._received.put(change_from_json(change))
+                elif event == 'reset':
+                    self._reset.set()
+                if event_id is not None:
+                    self.last_id = int(event_id)
+                event, data, event_id = 'message', [], None
+            return retry
+        finally:
+            self._conn.close()
+
+# =================== REMOTE DATABASE ===================
+
+class RemoteDatabase(RemoteRepositories):
+    """CRMDatabase's interface over a CRMServer, so CRMApp runs the same against either.
+
+    Changes arrive two ways: in the answer to a write this client made
+    (published straight away, as locally) and on the server's event
+    stream, which carries every client's. publish() drops the second copy
+    by seq. The stream's Changes wait until the owner calls received() on
+    the thread that should publish them. path is None: anything that
+    needs the database file (import, export, duplicate search) runs on the
+    server host instead.
+    """
+
+    SEEN = 10000  # seqs remembered for dropping duplicates
+
+    def __init__(self, url: str, token: Optional[str] = None, timeout: float = 10.0):
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+        self.path = None
+        self.connections = RemoteConnections(url, token, timeout)
+        client = RemoteClient(url, token, timeout)
+        # The stream starts from here; the caller's first load reads at least this far
+        seq = client.request('GET', '/api/status')['seq']
+        self._subscribers: List[Callable[[Change], None]] = []
+        self._seen: Set[int] = set()
+        self._seen_order: Deque[int] = deque()
+        super().__init__(client, self.publish)
+        self.events = ChangeStream(url, token, seq).start()
+
+    def subscribe(self, callback: Callable[[Change], None]):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Change], None]):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def publish(self, change: Change):
+        """Hand a Change to every subscriber, once however many ways it arrived"""
+        if change.seq is not None:
+            if change.seq in self._seen:
+                return
+            self._seen.add(change.seq)
+            self._seen_order.append(change.seq)
+            if len(self._seen_order) > self.SEEN:
+                self._seen.discard(self._seen_order.popleft())
+        for callback in list(self._subscribers):
+            callback(change)
+
+    def received(self) -> Tuple[List[Change], bool]:
+        """Other clients' Changes (and this one's) from the event stream; see ChangeStream.take"""
+        return self.events.take()
+
+    def writer(self, notify: Callable[[Change], None]) -> Tuple[RemoteRepositories, Callable[[], None]]:
+        """Repositories over a connection of their own, and what closes it; for WriteExecutor"""
+        client = RemoteClient(self.url, self.token, self.timeout)
+        return RemoteRepositories(client, notify), client.close
+
+    def repositories(self, conn: RemoteClient) -> RemoteRepositories:
+        """Repositories over a client borrowed from self.connections"""
+        return RemoteRepositories(conn)
+
+    def maintain(self) -> Tuple[int, int, int]:
+        """Nothing to do here; the server looks after its own database"""
+        return 0, 0, 0
+
+    def close(self):
+        self.events.close()
+        self.client.close()
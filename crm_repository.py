@@ -0,0 +1,952 @@
+import sqlite3
+import datetime
+import json
+import re
+import unicodedata
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Iterator, List, Any, Optional, Tuple
+from crm_connections import ConnectionManager, connect_writer
+from crm_migrations import Migrator
+
+# =================== SCHEMA ===================
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS customers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        email TEXT UNIQUE,
+        phone TEXT,
+        company TEXT,
+        address TEXT,
+        status TEXT DEFAULT 'Active',
+        created_date TEXT,
+        notes TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_id INTEGER,
+        product_name TEXT NOT NULL,
+        amount REAL NOT NULL,
+        status TEXT DEFAULT 'Pending',
+        sale_date TEXT,
+        created_date TEXT,
+        notes TEXT,
+        FOREIGN KEY (customer_id) REFERENCES customers (id) ON DELETE CASCADE
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_id INTEGER,
+        title TEXT NOT NULL,
+        description TEXT,
+        priority TEXT DEFAULT 'Medium',
+        status TEXT DEFAULT 'Pending',
+        due_date TEXT,
+        created_date TEXT,
+        FOREIGN KEY (customer_id) REFERENCES customers (id) ON DELETE CASCADE
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS interactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_id INTEGER,
+        type TEXT NOT NULL,
+        description TEXT,
+        date TEXT,
+        FOREIGN KEY (customer_id) REFERENCES customers (id) ON DELETE CASCADE
+    )
+    ''',
+]
+
+def today() -> str:
+    return datetime.datetime.now().strftime('%Y-%m-%d')
+
+# =================== FULL-TEXT SEARCH ===================
+
+# Ranked search results are capped, so a one-letter prefix never loads a million rows
+SEARCH_LIMIT = 500
+
+# Rows per keyset page; see the page() methods
+PAGE_SIZE = 200
+
+def search_tokens(text: Optional[str]) -> List[str]:
+    """Words as the unicode61 tokenizer sees them: lower case, no accents, letters and digits"""
+    folded = unicodedata.normalize('NFKD', str(text or '').lower())
+    folded = ''.join(ch for ch in folded if not unicodedata.combining(ch))
+    return re.findall(r'[^\W_]+', folded)
+
+def fts_query(search_term: str, column: Optional[str] = None) -> Optional[str]:
+    """FTS5 MATCH expression requiring every typed word as a prefix, or None if nothing is searchable"""
+    words = search_tokens(search_term)
+    if not words:
+        return None
+    query = ' '.join(f'"{word}"*' for word in words)
+    return f'{column} : ({query})' if column else query
+
+def fts_matches(search_term: str, *fields) -> bool:
+    """Python twin of fts_query: every typed word starts some word in the fields"""
+    words = search_tokens(search_term)
+    tokens = [token for field in fields for token in search_tokens(field)]
+    return all(any(token.startswith(word) for token in tokens) for word in words)
+
+# =================== TIME RANGES ===================
+
+GRANULARITIES = ('day', 'week', 'month', 'quarter')
+
+# The bucket a 'YYYY-MM-DD' day (or 'YYYY-MM' month) falls in, as SQL; same keys as bucket_key
+BUCKET_SQL = {
+    'day': '{day}',
+    'week': "date({day}, '-6 days', 'weekday 1')",
+    'month': 'substr({day}, 1, 7)',
+    'quarter': "substr({day}, 1, 5) || 'Q' || ((CAST(substr({day}, 6, 2) AS INTEGER) + 2) / 3)",
+}
+
+def bucket_start(granularity: str, day: datetime.date) -> datetime.date:
+    """First day of the bucket holding day; weeks start on Monday"""
+    if granularity == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'quarter':
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    return day
+
+def next_bucket(granularity: str, start: datetime.date) -> datetime.date:
+    if granularity in ('day', 'week'):
+        return start + datetime.timedelta(days=1 if granularity == 'day' else 7)
+    month = start.month - 1 + (1 if granularity == 'month' else 3)
+    return start.replace(year=start.year + month // 12, month=month % 12 + 1, day=1)
+
+def bucket_key(granularity: str, start: datetime.date) -> str:
+    """'2024-05-13' for days and weeks, '2024-05' for months, '2024-Q2' for quarters"""
+    if granularity == 'month':
+        return start.strftime('%Y-%m')
+    if granularity == 'quarter':
+        return f'{start.year:04d}-Q{(start.month + 2) // 3}'
+    return start.isoformat()
+
+# =================== CHANGE EVENTS ===================
+
+@dataclass
+class Change:
+    """One committed row change; rows are full SELECT * tuples"""
+    table: str
+    op: str  # 'insert', 'update' or 'delete'
+    row_id: int
+    old: Optional[tuple] = None
+    new: Optional[tuple] = None
+    seq: Optional[int] = None  # position in crm_server's change stream; None for local changes
+
+# =================== REPOSITORIES ===================
+
+@contextmanager
+def savepoint(conn: sqlite3.Connection) -> Iterator[None]:
+    """Inside an open transaction: undo what the block did if it raises, and let the rest stand"""
+    conn.execute('SAVEPOINT write')
+    try:
+        yield
+    except BaseException:
+        conn.execute('ROLLBACK TO write')
+        conn.execute('RELEASE write')
+        raise
+    conn.execute('RELEASE write')
+
+class Repository:
+    """Base for table repositories; all SQL is fixed text so sqlite3 reuses
+    its prepared statements between calls"""
+
+    table = ''
+
+    def __init__(self, conn: sqlite3.Connection, notify: Optional[Callable[[Change], None]] = None):
+        self.conn = conn
+        self.notify = notify
+
+    def get(self, row_id: int) -> Optional[tuple]:
+        return self.conn.execute(f'SELECT * FROM {self.table} WHERE id = ?', (row_id,)).fetchone()
+
+    def delete(self, row_id: int):
+        old = self.get(row_id)
+        with self._transaction():
+            self.conn.execute(f'DELETE FROM {self.table} WHERE id = ?', (row_id,))
+        if old is not None:
+            self._emit(Change(self.table, 'delete', row_id, old=old))
+
+    def count(self, status: Optional[str] = None) -> int:
+        if status is None:
+            return self.conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+        return self.conn.execute(f'SELECT COUNT(*) FROM {self.table} WHERE status = ?',
+                                 (status,)).fetchone()[0]
+
+    def dump(self) -> List[Dict[str, Any]]:
+        """Every row as a column -> value dict"""
+        cursor = self.conn.execute(f'SELECT * FROM {self.table}')
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def _insert(self, sql: str, params: tuple) -> int:
+        with self._transaction():
+            row_id = self.conn.execute(sql, params).lastrowid
+        self._emit(Change(self.table, 'insert', row_id, new=self.get(row_id)))
+        return row_id
+
+    def _update(self, row_id: int, sql: str, params: tuple):
+        old = self.get(row_id)
+        with self._transaction():
+            self.conn.execute(sql, params)
+        if old is not None:
+            self._emit(Change(self.table, 'update', row_id, old=old, new=self.get(row_id)))
+
+    @contextmanager
+    def _transaction(self, immediate: bool = False) -> Iterator[None]:
+        """One write's transaction; a savepoint inside one already open (Repositories.batch).
+
+        immediate takes the write lock up front; an open batch already holds it.
+        """
+        if self.conn.in_transaction:
+            with savepoint(self.conn):
+                yield
+            return
+        with self.conn:
+            if immediate:
+                self.conn.execute('BEGIN IMMEDIATE')
+            yield
+
+    def _emit(self, change: Change):
+        # Only called after commit, so listeners never see rolled-back rows; inside a
+        # batch the Changes go to its owner, which holds them until the batch commits
+        if self.notify:
+            self.notify(change)
+
+class CustomerRepo(Repository):
+    table = 'customers'
+
+    LIST_SQL = 'SELECT id, name, email, phone, company, status, created_date FROM customers'
+    # customers_fts covers name, email, company and notes; see crm_migrations
+    SEARCH_SQL = '''
+        SELECT c.id, c.name, c.email, c.phone, c.company, c.status, c.created_date
+        FROM customers_fts f JOIN customers c ON c.id = f.rowid
+        WHERE customers_fts MATCH ?
+        ORDER BY f.rank
+        LIMIT ?
+    '''
+    PAGE_SQL = LIST_SQL + ' WHERE id > ? ORDER BY id LIMIT ?'
+    NAMED_SQL = '''
+        SELECT c.id FROM customers_fts f JOIN customers c ON c.id = f.rowid
+        WHERE customers_fts MATCH ? AND c.name = ? COLLATE NOCASE
+    '''
+    RECENT_SQL = 'SELECT name, created_date FROM customers ORDER BY created_date DESC LIMIT ?'
+    # Aggregates read the trigger-maintained summary tables (crm_migrations, migration 5)
+    STATUS_COUNTS_SQL = "SELECT NULLIF(status, ''), count FROM customer_counts ORDER BY status"
+
+    def add(self, name: str, email: str, phone: str = '', company: str = '', address: str = '',
+            status: str = 'Active', notes: str = '', created_date: Optional[str] = None) -> int:
+        return self._insert('''
+            INSERT INTO customers (name, email, phone, company, address, status, created_date, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (name, email, phone, company, address, status, created_date or today(), notes))
+
+    def update(self, customer_id: int, name: str, email: str, phone: str, company: str,
+               address: str, status: str, notes: str):
+        self._update(customer_id, '''
+            UPDATE customers SET name=?, email=?, phone=?, company=?, address=?,
+                                 status=?, notes=? WHERE id=?
+        ''', (name, email, phone, company, address, status, notes, customer_id))
+
+    def delete(self, customer_id: int):
+        """Delete a customer together with their sales, tasks and interactions"""
+        self.delete_many([customer_id])
+
+    def delete_many(self, customer_ids: List[int]) -> int:
+        """Delete customers in one transaction; returns how many existed.
+
+        ON DELETE CASCADE removes their sales, tasks and interactions, so a
+        crash part way leaves either everything or nothing deleted. The
+        dependent rows are read first only to emit their Changes.
+        """
+        changes = []
+        deleted = []
+        # IMMEDIATE takes the write lock up front, so no row can be added between read and delete
+        with self._transaction(immediate=True):
+            for start in range(0, len(customer_ids), 500):
+                chunk = list(customer_ids[start:start + 500])
+                marks = ', '.join('?' * len(chunk))
+                for table in ('sales', 'tasks', 'interactions'):
+                    for row in self.conn.execute(f'SELECT * FROM {table} WHERE customer_id IN ({marks})', chunk):
+                        changes.append(Change(table, 'delete', row[0], old=row))
+                deleted += self.conn.execute(f'SELECT * FROM customers WHERE id IN ({marks})', chunk).fetchall()
+                self.conn.execute(f'DELETE FROM customers WHERE id IN ({marks})', chunk)
+        changes += [Change(self.table, 'delete', row[0], old=row) for row in deleted]
+        for change in changes:
+            self._emit(change)
+        return len(deleted)
+
+    # Contact fields a merge copies from a duplicate when the kept customer has none
+    MERGE_FILL = {3: 'phone', 4: 'company', 5: 'address'}
+
+    def merge(self, keep_id: int, duplicate_ids: List[int]) -> int:
+        """Fold duplicates into keep_id in one transaction; returns how many were merged.
+
+        Their sales, tasks and interactions move to keep_id, blank contact
+        fields of keep_id are filled from the duplicates in the order given
+        and their notes are appended, then the duplicates are deleted.
+        """
+        duplicate_ids = [row_id for row_id in duplicate_ids if row_id != keep_id]
+        changes = []
+        with self._transaction(immediate=True):
+            keep = self.conn.execute('SELECT * FROM customers WHERE id = ?', (keep_id,)).fetchone()
+            if keep is None or not duplicate_ids:
+                return 0
+            rows = {row[0]: row for row in self.conn.execute(
+                f"SELECT * FROM customers WHERE id IN ({', '.join('?' * len(duplicate_ids))})", duplicate_ids)}
+            duplicates = [rows[row_id] for row_id in duplicate_ids if row_id in rows]
+            if not duplicates:
+                return 0
+            merged_ids = [row[0] for row in duplicates]
+            marks = ', '.join('?' * len(merged_ids))
+            for table in ('sales', 'tasks', 'interactions'):
+                for row in self.conn.execute(f'SELECT * FROM {table} WHERE customer_id IN ({marks})', merged_ids):
+                    changes.append(Change(table, 'update', row[0], old=row, new=(row[0], keep_id) + row[2:]))
+                self.conn.execute(f'UPDATE {table} SET customer_id = ? WHERE customer_id IN ({marks})',
+                                  [keep_id] + merged_ids)
+
+            merged = list(keep)
+            for column in self.MERGE_FILL:
+                merged[column] = merged[column] or next((row[column] for row in duplicates if row[column]), '')
+            notes = [merged[8]] if merged[8] else []
+            notes += [row[8] for row in duplicates if row[8] and row[8] not in notes]
+            merged[8] = '\n'.join(notes)
+            self.conn.execute(f'DELETE FROM customers WHERE id IN ({marks})', merged_ids)
+            self.conn.execute('UPDATE customers SET phone=?, company=?, address=?, notes=? WHERE id=?',
+                              (merged[3], merged[4], merged[5], merged[8], keep_id))
+        changes.append(Change(self.table, 'update', keep_id, old=keep, new=tuple(merged)))
+        changes += [Change(self.table, 'delete', row[0], old=row) for row in duplicates]
+        for change in changes:
+            self._emit(change)
+        return len(duplicates)
+
+    def list(self, search_term: str = '') -> List[tuple]:
+        """All customers, or the best SEARCH_LIMIT matches for search_term by bm25 rank"""
+        query = fts_query(search_term)
+        if query:
+            return self.conn.execute(self.SEARCH_SQL, (query, SEARCH_LIMIT)).fetchall()
+        return self.conn.execute(self.LIST_SQL).fetchall()
+
+    def page(self, after_id: int = 0, limit: int = PAGE_SIZE) -> List[tuple]:
+        """Next limit customers by id after after_id; cost does not grow with the offset"""
+        return self.conn.execute(self.PAGE_SQL, (after_id, limit)).fetchall()
+
+    def names(self) -> List[Tuple[int, str]]:
+        """(id, name) pairs for customer pickers"""
+        return self.conn.execute('SELECT id, name FROM customers ORDER BY name').fetchall()
+
+    def recent(self, limit: int = 5) -> List[tuple]:
+        return self.conn.execute(self.RECENT_SQL, (limit,)).fetchall()
+
+    def status_counts(self) -> List[Tuple[str, int]]:
+        return self.conn.execute(self.STATUS_COUNTS_SQL).fetchall()
+
+    def ids_named(self, name: str) -> List[int]:
+        """Ids of the customers called name, ignoring case"""
+        query = fts_query(name, 'name')
+        if query is None:
+            return []
+        return [row[0] for row in self.conn.execute(self.NAMED_SQL, (query, name.strip()))]
+
+class SalesRepo(Repository):
+    table = 'sales'
+
+    LIST_SQL = '''
+        SELECT s.id, c.name, s.product_name, s.amount, s.status, s.sale_date, s.created_date,
+               s.customer_id
+        FROM sales s
+        JOIN customers c ON s.customer_id = c.id
+    '''
+    # Product matches from sales_fts plus every sale of a customer whose name matches,
+    # best rank first; a sale found both ways is listed once
+    SEARCH_SQL = '''
+        SELECT s.id, c.name, s.product_name, s.amount, s.status, s.sale_date, s.created_date,
+               s.customer_id
+        FROM (
+            SELECT * FROM (
+                SELECT rowid AS id, rank FROM sales_fts WHERE sales_fts MATCH ?
+                ORDER BY rank LIMIT ?
+            )
+            UNION ALL
+            SELECT s.id, f.rank FROM (
+                SELECT rowid, rank FROM customers_fts WHERE customers_fts MATCH ?
+                ORDER BY rank LIMIT ?
+            ) f JOIN sales s ON s.customer_id = f.rowid
+        ) m
+        JOIN sales s ON s.id = m.id
+        JOIN customers c ON s.customer_id = c.id
+        WHERE ? IS NULL OR s.status = ?
+        GROUP BY s.id
+        ORDER BY MIN(m.rank)
+        LIMIT ?
+    '''
+    PAGE_SQL = LIST_SQL + ' WHERE s.id > ? ORDER BY s.id LIMIT ?'
+    STATUS_PAGE_SQL = LIST_SQL + ' WHERE s.status = ? AND s.id > ? ORDER BY s.id LIMIT ?'
+    TOTAL_SQL = 'SELECT SUM(amount) FROM sales_monthly WHERE status = ?'
+    MONTHLY_SQL = '''
+        SELECT NULLIF(month, ''), amount
+        FROM sales_monthly
+        WHERE status = ?
+        ORDER BY month ASC
+        LIMIT ?
+    '''
+    RECENT_SQL = '''
+        SELECT s.sale_date, s.product_name, s.amount, c.name
+        FROM sales s JOIN customers c ON s.customer_id = c.id
+        ORDER BY s.sale_date DESC LIMIT ?
+    '''
+    # Where range_totals reads each kind of range: (day column, count, FROM ... WHERE ...).
+    # The rollups are kept by triggers (crm_migrations, migration 6); a customer's few
+    # sales are read from sales through idx_sales_customer_date.
+    RANGE_SOURCES = {
+        'daily': ('day', 'SUM(count)',
+                  'FROM sales_daily WHERE day BETWEEN :first AND :last '
+                  'AND (:status IS NULL OR status = :status)'),
+        'monthly': ('month', 'SUM(count)',
+                    'FROM sales_monthly WHERE month BETWEEN :first_month AND :last_month '
+                    'AND (:status IS NULL OR status = :status)'),
+        'product': ('day', 'SUM(count)',
+                    'FROM sales_product_daily WHERE product = :product AND day BETWEEN :first AND :last '
+                    'AND (:status IS NULL OR status = :status)'),
+        'customers': ('date(sale_date)', 'COUNT(*)',
+                      'FROM sales WHERE customer_id IN (SELECT value FROM json_each(:customers)) '
+                      'AND sale_date >= :first AND sale_date < :after '
+                      'AND (:status IS NULL OR status = :status) '
+                      'AND (:product IS NULL OR product_name = :product COLLATE NOCASE)'),
+    }
+    RANGE_SQL = {(source, granularity): f'SELECT {BUCKET_SQL[granularity].format(day=day)} AS bucket, '
+                                        f'{count}, TOTAL(amount) {where} GROUP BY bucket'
+                 for source, (day, count, where) in RANGE_SOURCES.items()
+                 for granularity in GRANULARITIES}
+
+    def add(self, customer_id: int, product_name: str, amount: float, status: str = 'Pending',
+            sale_date: Optional[str] = None, notes: str = '', created_date: Optional[str] = None) -> int:
+        return self._insert('''
+            INSERT INTO sales (customer_id, product_name, amount, status, sale_date, created_date, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (customer_id, product_name, amount, status, sale_date or today(),
+              created_date or today(), notes))
+
+    def update(self, sale_id: int, customer_id: int, product_name: str, amount: float,
+               status: str, sale_date: str, notes: str):
+        self._update(sale_id, '''
+            UPDATE sales SET customer_id=?, product_name=?, amount=?, status=?,
+                             sale_date=?, notes=? WHERE id=?
+        ''', (customer_id, product_name, amount, status, sale_date, notes, sale_id))
+
+    def list(self, status: Optional[str] = None, search_term: str = '') -> List[tuple]:
+        """Grid rows (id, customer name, ..., created_date), with customer_id appended.
+
+        search_term matches product names and customer names as word prefixes;
+        results are ranked and capped at SEARCH_LIMIT.
+        """
+        query = fts_query(search_term)
+        if query:
+            # Each branch keeps only its best rows, unless a status filter may discard some of them
+            limit = -1 if status else SEARCH_LIMIT
+            params = (query, limit, fts_query(search_term, 'name'), limit, status or None, status, SEARCH_LIMIT)
+            return self.conn.execute(self.SEARCH_SQL, params).fetchall()
+        if status:
+            return self.conn.execute(self.LIST_SQL + ' WHERE s.status = ?', (status,)).fetchall()
+        return self.conn.execute(self.LIST_SQL).fetchall()
+
+    def page(self, status: Optional[str] = None, after_id: int = 0, limit: int = PAGE_SIZE) -> List[tuple]:
+        """Next limit grid rows by id after after_id, in the same shape as list()"""
+        if status:
+            return self.conn.execute(self.STATUS_PAGE_SQL, (status, after_id, limit)).fetchall()
+        return self.conn.execute(self.PAGE_SQL, (after_id, limit)).fetchall()
+
+    def total_amount(self, status: Optional[str] = None) -> float:
+        if status is None:
+            total = self.conn.execute('SELECT SUM(amount) FROM sales_monthly').fetchone()[0]
+        else:
+            total = self.conn.execute(self.TOTAL_SQL, (status,)).fetchone()[0]
+        return total or 0.0
+
+    def monthly_totals(self, status: str = 'Completed', limit: int = 6) -> List[Tuple[str, float]]:
+        return self.conn.execute(self.MONTHLY_SQL, (status, limit)).fetchall()
+
+    def recent(self, limit: int = 5) -> List[tuple]:
+        return self.conn.execute(self.RECENT_SQL, (limit,)).fetchall()
+
+    def status_totals(self) -> List[Tuple[str, int, float]]:
+        """(status, count, total amount) per status"""
+        return self.conn.execute("SELECT NULLIF(status, ''), SUM(count), TOTAL(amount) FROM sales_monthly "
+                                 "GROUP BY status").fetchall()
+
+    def month_totals(self, status: str = 'Completed') -> List[Tuple[str, int, float]]:
+        """(month, count, total amount) for every month with sales in the given status"""
+        return self.conn.execute("SELECT NULLIF(month, ''), count, amount FROM sales_monthly "
+                                 "WHERE status = ?", (status,)).fetchall()
+
+    def range_totals(self, granularity: str, first: datetime.date, last: datetime.date,
+                     status: Optional[str] = 'Completed', product: Optional[str] = None,
+                     customer_ids: Optional[List[int]] = None) -> List[Tuple[datetime.date, int, float]]:
+        """(bucket start, count, total amount) for every bucket from first to last, empty ones included.
+
+        Buckets are whole, so a monthly range starting on the 15th counts the
+        whole first month. status None counts every status; product and
+        customer_ids narrow the sales counted.
+        """
+        first = bucket_start(granularity, first)
+        last = next_bucket(granularity, bucket_start(granularity, last)) - datetime.timedelta(days=1)
+        if customer_ids is not None:
+            source = 'customers'
+        elif product:
+            source = 'product'
+        else:
+            source = 'monthly' if granularity in ('month', 'quarter') else 'daily'
+        params = {
+            'first': first.isoformat(), 'last': last.isoformat(),
+            'after': (last + datetime.timedelta(days=1)).isoformat(),
+            'first_month': first.isoformat()[:7], 'last_month': last.isoformat()[:7],
+            'status': status, 'product': product or None, 'customers': json.dumps(customer_ids or []),
+        }
+        totals = {bucket: (count, amount) for bucket, count, amount
+                  in self.conn.execute(self.RANGE_SQL[source, granularity], params)}
+        rows = []
+        start = first
+        while start <= last:
+            count, amount = totals.get(bucket_key(granularity, start), (0, 0.0))
+            rows.append((start, count, amount))
+            start = next_bucket(granularity, start)
+        return rows
+
+class TaskRepo(Repository):
+    table = 'tasks'
+
+    LIST_SQL = '''
+        SELECT t.id, c.name, t.title, t.priority, t.status, t.due_date, t.created_date,
+               t.customer_id
+        FROM tasks t
+        JOIN customers c ON t.customer_id = c.id
+    '''
+    PAGE_SQL = LIST_SQL + ' WHERE t.id > ? ORDER BY t.id LIMIT ?'
+    PRIORITY_PAGE_SQL = LIST_SQL + ' WHERE t.priority = ? AND t.id > ? ORDER BY t.id LIMIT ?'
+    # Same rows as status != 'Completed', which also skips NULL (stored as '')
+    OPEN_COUNT_SQL = "SELECT TOTAL(count) FROM task_counts WHERE status <> 'Completed' AND status <> ''"
+    RECENT_SQL = '''
+        SELECT t.due_date, t.title, t.status, c.name
+        FROM tasks t JOIN customers c ON t.customer_id = c.id
+        ORDER BY t.created_date DESC LIMIT ?
+    '''
+    # Two ranges of idx_tasks_status_due instead of status <> 'Completed', which would
+    # read the completed tasks too; the index covers the query
+    OPEN_DUE_SQL = '''
+        SELECT id, due_date FROM tasks
+        WHERE (status < 'Completed' OR status > 'Completed') AND due_date > ''
+    '''
+
+    def add(self, customer_id: int, title: str, description: str = '', priority: str = 'Medium',
+            status: str = 'Pending', due_date: Optional[str] = None,
+            created_date: Optional[str] = None) -> int:
+        return self._insert('''
+            INSERT INTO tasks (customer_id, title, description, priority, status, due_date, created_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (customer_id, title, description, priority, status, due_date or today(),
+              created_date or today()))
+
+    def update(self, task_id: int, customer_id: int, title: str, description: str,
+               priority: str, status: str, due_date: str):
+        self._update(task_id, '''
+            UPDATE tasks SET customer_id=?, title=?, description=?, priority=?,
+                             status=?, due_date=? WHERE id=?
+        ''', (customer_id, title, description, priority, status, due_date, task_id))
+
+    def complete(self, task_id: int):
+        self._update(task_id, 'UPDATE tasks SET status = ? WHERE id = ?', ('Completed', task_id))
+
+    def list(self, priority: Optional[str] = None) -> List[tuple]:
+        """Grid rows (id, customer name, ..., created_date), with customer_id appended"""
+        if priority:
+            return self.conn.execute(self.LIST_SQL + ' WHERE t.priority = ?', (priority,)).fetchall()
+        return self.conn.execute(self.LIST_SQL).fetchall()
+
+    def page(self, priority: Optional[str] = None, after_id: int = 0, limit: int = PAGE_SIZE) -> List[tuple]:
+        """Next limit grid rows by id after after_id, in the same shape as list()"""
+        if priority:
+            return self.conn.execute(self.PRIORITY_PAGE_SQL, (priority, after_id, limit)).fetchall()
+        return self.conn.execute(self.PAGE_SQL, (after_id, limit)).fetchall()
+
+    def count_open(self) -> int:
+        return int(self.conn.execute(self.OPEN_COUNT_SQL).fetchone()[0])
+
+    def open_due_dates(self) -> Iterator[Tuple[int, str]]:
+        """(id, due_date) of every open task that has a due date, streamed from the cursor"""
+        return iter(self.conn.execute(self.OPEN_DUE_SQL))
+
+    def recent(self, limit: int = 5) -> List[tuple]:
+        return self.conn.execute(self.RECENT_SQL, (limit,)).fetchall()
+
+    def status_counts(self) -> List[Tuple[str, int]]:
+        return self.conn.execute("SELECT NULLIF(status, ''), SUM(count) FROM task_counts "
+                                 "GROUP BY status").fetchall()
+
+    def priority_counts(self) -> List[Tuple[str, int]]:
+        return self.conn.execute("SELECT NULLIF(priority, ''), SUM(count) FROM task_counts "
+                                 "GROUP BY priority").fetchall()
+
+class InteractionRepo(Repository):
+    """Append-only log: rows are added, never updated, and only removed with their customer"""
+
+    table = 'interactions'
+
+    LIST_SQL = 'SELECT id, type, description, date FROM interactions'
+    # Newest first through idx_interactions_customer_date (crm_migrations, migration 1);
+    # the index ends in the rowid, so (date, id) pages need no sort
+    TIMELINE_SQL = LIST_SQL + ' WHERE customer_id = ? ORDER BY date DESC, id DESC LIMIT ?'
+    TIMELINE_BEFORE_SQL = (LIST_SQL + ' WHERE customer_id = ? AND (date, id) < (?, ?) '
+                           'ORDER BY date DESC, id DESC LIMIT ?')
+    RECENT_SQL = 'SELECT id, customer_id, type, description, date FROM interactions ORDER BY id DESC LIMIT ?'
+
+    def add(self, customer_id: Optional[int], type: str, description: str = '',
+            date: Optional[str] = None) -> int:
+        return self._insert('''
+            INSERT INTO interactions (customer_id, type, description, date)
+            VALUES (?, ?, ?, ?)
+        ''', (customer_id, type, description, date or today()))
+
+    def for_customer(self, customer_id: int) -> List[tuple]:
+        return self.conn.execute(self.LIST_SQL + ' WHERE customer_id = ? ORDER BY date DESC, id DESC',
+                                 (customer_id,)).fetchall()
+
+    def timeline(self, customer_id: int, before: Optional[Tuple[str, int]] = None,
+                 limit: int = PAGE_SIZE) -> List[tuple]:
+        """One page of a customer's interactions, newest first, older than the (date, id) before"""
+        if before is None:
+            return self.conn.execute(self.TIMELINE_SQL, (customer_id, limit)).fetchall()
+        return self.conn.execute(self.TIMELINE_BEFORE_SQL, (customer_id, before[0], before[1], limit)).fetchall()
+
+    def recent(self, limit: int = 50) -> List[tuple]:
+        """The last limit rows logged, newest first, as (id, customer_id, type, description, date)"""
+        return self.conn.execute(self.RECENT_SQL, (limit,)).fetchall()
+
+# =================== DATABASE ===================
+
+class Repositories:
+    """One repository per table, all over the same connection and reporting to notify"""
+
+    transactional = True  # writes can be grouped with batch()
+
+    def __init__(self, conn: sqlite3.Connection, notify: Optional[Callable[[Change], None]] = None):
+        self.conn = conn
+        self.customers = CustomerRepo(conn, notify)
+        self.sales = SalesRepo(conn, notify)
+        self.tasks = TaskRepo(conn, notify)
+        self.interactions = InteractionRepo(conn, notify)
+
+    def rollback(self):
+        """Undo whatever a failed write left uncommitted"""
+        if self.conn.in_transaction:
+            self.conn.rollback()
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """One transaction around several writes, committed (or rolled back) at the end.
+
+        Repository writes inside it become savepoints; their Changes still
+        go to notify straight away, so the caller must hold them until the
+        batch has committed, as WriteExecutor does.
+        """
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            yield
+
+    @contextmanager
+    def savepoint(self) -> Iterator[None]:
+        """Inside batch(): undo every write made in the block if it raises"""
+        with savepoint(self.conn):
+            yield
+
+class CRMDatabase(Repositories):
+    """Owns the SQLite connections and exposes one repository per table.
+
+    The repositories write through the WAL writer connection; worker
+    threads borrow read-only connections from self.connections. Has no Tk
+    dependency, so it can be driven from scripts, batch jobs and
+    benchmarks as well as from CRMApp.
+    """
+
+    def __init__(self, path: str = 'crm_database.db', readers: int = 4):
+        self.path = path
+        self.connections = ConnectionManager(path, readers)
+        self.conn = self.connections.writer
+        self.create_schema()
+        self.migrate()
+        # Off during migrations, which rebuild tables that other tables point at
+        self.conn.execute('PRAGMA foreign_keys = ON')
+        self._subscribers: List[Callable[[Change], None]] = []
+        super().__init__(self.conn, self.publish)
+
+    def subscribe(self, callback: Callable[[Change], None]):
+        """Call callback with a Change for every row the repositories commit"""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Change], None]):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def create_schema(self):
+        with self.conn:
+            for statement in SCHEMA:
+                self.conn.execute(statement)
+
+    def migrate(self, dry_run: bool = False):
+        """Apply pending crm_migrations.MIGRATIONS; see Migrator"""
+        return Migrator(self.conn).run(dry_run=dry_run)
+
+    def dump(self) -> Dict[str, List[Dict[str, Any]]]:
+        """All tables as JSON-ready lists of row dicts"""
+        return {repo.table: repo.dump()
+                for repo in (self.customers, self.sales, self.tasks, self.interactions)}
+
+    def maintain(self) -> Tuple[int, int, int]:
+        """PRAGMA optimize and a passive WAL checkpoint; see ConnectionManager.maintain"""
+        return self.connections.maintain()
+
+    def close(self):
+        self.connections.close()
+
+    def writer(self, notify: Callable[[Change], None], timeout: float = 30.0) -> Tuple[Repositories, Callable[[], None]]:
+        """Repositories over a writer connection of their own, and what closes it; for WriteExecutor.
+
+        Under WAL it and self.conn take turns on the write lock, waiting up
+        to timeout seconds for each other.
+        """
+        conn = connect_writer(self.path, timeout)
+        conn.execute('PRAGMA foreign_keys = ON')
+        return Repositories(conn, notify), conn.close
+
+    def repositories(self, conn: sqlite3.Connection) -> Repositories:
+        """Repositories over a connection borrowed from self.connections"""
+        return Repositories(conn)
+
+    def publish(self, change: Change):
+        """Hand a Change to every subscriber; also for Changes committed on another connection"""
+        for callback in list(self._subscribers):
+            callback(change)
+
+# =================== DASHBOARD STATS ===================
+
+def sale_month(sale_date: Optional[str]) -> Optional[str]:
+    """Python twin of strftime('%Y-%m', sale_date) for YYYY-MM-DD dates"""
+    if sale_date and len(sale_date) >= 10 and sale_date[4] == '-' and sale_date[7] == '-':
+        return sale_date[:7]
+    return None
+
+class DashboardStats:
+    """Counters behind the header, KPIs and charts.
+
+    Loaded from the trigger-maintained summary tables, so load() reads a
+    few dozen rows at any table size, then kept current by apply(), which
+    adjusts only the counters a Change touches instead of re-querying.
+    """
+
+    def __init__(self, db: CRMDatabase):
+        self.db = db
+        self.customers_by_status: Dict[Optional[str], int] = {}
+        self.sales_by_status: Dict[Optional[str], List[float]] = {}  # status -> [count, amount]
+        self.completed_by_month: Dict[Optional[str], List[float]] = {}  # month -> [count, amount]
+        self.tasks_by_status: Dict[Optional[str], int] = {}
+        self.tasks_by_priority: Dict[Optional[str], int] = {}
+        self.load()
+
+    def load(self):
+        self.customers_by_status = dict(self.db.customers.status_counts())
+        self.sales_by_status = {status: [count, total]
+                                for status, count, total in self.db.sales.status_totals()}
+        self.completed_by_month = {month: [count, total]
+                                   for month, count, total in self.db.sales.month_totals('Completed')}
+        self.tasks_by_status = dict(self.db.tasks.status_counts())
+        self.tasks_by_priority = dict(self.db.tasks.priority_counts())
+
+    # Values shown in the UI
+
+    @property
+    def total_customers(self) -> int:
+        return sum(self.customers_by_status.values())
+
+    @property
+    def total_sales(self) -> int:
+        return int(sum(count for count, _ in self.sales_by_status.values()))
+
+    @property
+    def gross_sales(self) -> float:
+        return sum(total for _, total in self.sales_by_status.values())
+
+    def revenue(self, status: str = 'Completed') -> float:
+        return self.sales_by_status.get(status, [0, 0.0])[1]
+
+    @property
+    def total_tasks(self) -> int:
+        return sum(self.tasks_by_status.values())
+
+    @property
+    def open_tasks(self) -> int:
+        # Mirrors status != 'Completed', which also skips NULL
+        return sum(count for status, count in self.tasks_by_status.items()
+                   if status is not None and status != 'Completed')
+
+    def sales_count(self, status: Optional[str] = None) -> int:
+        if status is None:
+            return self.total_sales
+        return int(self.sales_by_status.get(status, [0, 0.0])[0])
+
+    def tasks_count(self, priority: Optional[str] = None) -> int:
+        if priority is None:
+            return self.total_tasks
+        return self.tasks_by_priority.get(priority, 0)
+
+    def monthly_sales(self, limit: int = 6) -> List[Tuple[Optional[str], float]]:
+        """Same rows as SalesRepo.monthly_totals('Completed', limit)"""
+        months = sorted(self.completed_by_month, key=lambda m: (m is not None, m or ''))
+        return [(month, self.completed_by_month[month][1]) for month in months[:limit]]
+
+    def status_counts(self) -> List[Tuple[Optional[str], int]]:
+        return sorted(self.customers_by_status.items(), key=lambda item: (item[0] is not None, item[0] or ''))
+
+    # Delta application
+
+    def apply(self, change: Change) -> bool:
+        """Fold one Change into the counters; True when a displayed value moved"""
+        handler = getattr(self, f'_apply_{change.table}', None)
+        if handler is None:
+            return False
+        if change.old is not None:
+            handler(change.old, -1)
+        if change.new is not None:
+            handler(change.new, 1)
+        return True
+
+    def _apply_customers(self, row: tuple, sign: int):
+        _bump(self.customers_by_status, row[6], sign)
+
+    def _apply_sales(self, row: tuple, sign: int):
+        amount = row[3] or 0.0
+        _bump_pair(self.sales_by_status, row[4], sign, amount)
+        if row[4] == 'Completed':
+            _bump_pair(self.completed_by_month, sale_month(row[5]), sign, amount)
+
+    def _apply_tasks(self, row: tuple, sign: int):
+        _bump(self.tasks_by_status, row[5], sign)
+        _bump(self.tasks_by_priority, row[4], sign)
+
+def _bump(counts: Dict, key, sign: int):
+    counts[key] = counts.get(key, 0) + sign
+    if counts[key] <= 0:
+        del counts[key]
+
+def _bump_pair(totals: Dict, key, sign: int, amount: float):
+    entry = totals.setdefault(key, [0, 0.0])
+    entry[0] += sign
+    entry[1] += sign * amount
+    if entry[0] <= 0:
+        del totals[key]
+
+# =================== ACTIVITY FEED ===================
+
+class ActivityFeed:
+    """The last size interactions logged, newest first, in a ring buffer.
+
+    load() reads them once by rowid; apply() pushes each newly logged row
+    from its Change and the oldest falls off the end, so showing the feed
+    never queries the log again. Rows removed with their customer stay in
+    the feed: it records what happened, including the delete itself.
+    """
+
+    def __init__(self, db: CRMDatabase, size: int = 50):
+        self.db = db
+        self.size = size
+        self.entries: Deque[tuple] = deque(maxlen=size)  # (id, customer_id, type, description, date)
+        self.load()
+
+    def load(self):
+        self.entries = deque(self.db.interactions.recent(self.size), maxlen=self.size)
+
+    def apply(self, change: Change) -> Optional[tuple]:
+        """The entry a Change added to the feed, or None"""
+        if change.table != 'interactions' or change.op != 'insert':
+            return None
+        self.entries.appendleft(change.new)
+        return change.new
+
+# =================== QUERY PLANS ===================
+
+# Queries run on every refresh, filter change or keystroke; none of them may scan a whole table
+# other than one of the small summary tables
+RANGE_PARAMS = {'first': '2024-01-01', 'last': '2024-12-31', 'after': '2025-01-01', 'first_month': '2024-01',
+                'last_month': '2024-12', 'status': 'Completed', 'product': 'Widget', 'customers': '[1, 2]'}
+SUMMARY_TABLES = ('customer_counts', 'sales_monthly', 'task_counts', 'sales_daily', 'sales_product_daily')
+HOT_QUERIES = {
+    'customers.search': (CustomerRepo.SEARCH_SQL, ('"ac"*', SEARCH_LIMIT)),
+    'customers.page': (CustomerRepo.PAGE_SQL, (1000, PAGE_SIZE)),
+    'customers.named': (CustomerRepo.NAMED_SQL, ('name : ("ann"*)', 'Ann')),
+    'customers.recent': (CustomerRepo.RECENT_SQL, (5,)),
+    'customers.status_counts': (CustomerRepo.STATUS_COUNTS_SQL, ()),
+    'customers.count_active': ('SELECT COUNT(*) FROM customers WHERE status = ?', ('Active',)),
+    'sales.by_customer': ('DELETE FROM sales WHERE customer_id = ?', (1,)),
+    'sales.by_status': (SalesRepo.LIST_SQL + ' WHERE s.status = ?', ('Completed',)),
+    'sales.search': (SalesRepo.SEARCH_SQL, ('"ac"*', SEARCH_LIMIT, 'name : ("ac"*)', SEARCH_LIMIT,
+                                            None, None, SEARCH_LIMIT)),
+    'sales.page': (SalesRepo.PAGE_SQL, (1000, PAGE_SIZE)),
+    'sales.status_page': (SalesRepo.STATUS_PAGE_SQL, ('Completed', 1000, PAGE_SIZE)),
+    'sales.total': (SalesRepo.TOTAL_SQL, ('Completed',)),
+    'sales.monthly': (SalesRepo.MONTHLY_SQL, ('Completed', 6)),
+    'sales.recent': (SalesRepo.RECENT_SQL, (5,)),
+    'sales.range_daily': (SalesRepo.RANGE_SQL['daily', 'week'], RANGE_PARAMS),
+    'sales.range_monthly': (SalesRepo.RANGE_SQL['monthly', 'quarter'], RANGE_PARAMS),
+    'sales.range_product': (SalesRepo.RANGE_SQL['product', 'day'], RANGE_PARAMS),
+    'sales.range_customers': (SalesRepo.RANGE_SQL['customers', 'month'], RANGE_PARAMS),
+    'tasks.by_customer': ('DELETE FROM tasks WHERE customer_id = ?', (1,)),
+    'tasks.by_priority': (TaskRepo.LIST_SQL + ' WHERE t.priority = ?', ('High',)),
+    'tasks.page': (TaskRepo.PAGE_SQL, (1000, PAGE_SIZE)),
+    'tasks.priority_page': (TaskRepo.PRIORITY_PAGE_SQL, ('High', 1000, PAGE_SIZE)),
+    'tasks.priority_counts': ("SELECT priority, SUM(count) FROM task_counts GROUP BY priority", ()),
+    'tasks.open_count': (TaskRepo.OPEN_COUNT_SQL, ()),
+    'tasks.open_due_dates': (TaskRepo.OPEN_DUE_SQL, ()),
+    'tasks.completed_count': ('SELECT COUNT(*) FROM tasks WHERE status = ?', ('Completed',)),
+    'tasks.recent': (TaskRepo.RECENT_SQL, (5,)),
+    'interactions.by_customer': ('DELETE FROM interactions WHERE customer_id = ?', (1,)),
+    'interactions.timeline': (InteractionRepo.TIMELINE_SQL, (1, PAGE_SIZE)),
+    'interactions.timeline_before': (InteractionRepo.TIMELINE_BEFORE_SQL, (1, '2024-06-01', 1000, PAGE_SIZE)),
+}
+
+def query_plan(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> List[str]:
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+
+def full_scans(conn: sqlite3.Connection) -> Dict[str, List[str]]:
+    """Hot queries whose plan reads a table without an index, with the offending steps.
+
+    An empty result means every hot query is served by an index; scanning a
+    covering index (e.g. for COUNT(*) ... GROUP BY), a summary table or a
+    subquery that was itself filled through indexes is accepted.
+    """
+    failures = {}
+    for name, (sql, params) in HOT_QUERIES.items():
+        plan = query_plan(conn, sql, params)
+        subqueries = {step.split()[-1] for step in plan if step.startswith(('MATERIALIZE', 'CO-ROUTINE'))}
+        steps = [step for step in plan
+                 if step.startswith('SCAN') and 'INDEX' not in step
+                 and step.split()[1] not in subqueries and step.split()[1] not in SUMMARY_TABLES]
+        if steps:
+            failures[name] = steps
+    return failures
+
+if __name__ == '__main__':
+    import sys
+    db = CRMDatabase(sys.argv[1] if len(sys.argv) > 1 else 'crm_database.db')
+    scans = full_scans(db.conn)
+    for name, steps in scans.items():
+        print(f'{name}: {"; ".join(steps)}')
+    print('Query plans OK' if not scans else f'{len(scans)} hot queries scan a full table')
+    sys.exit(1 if scans else 0)
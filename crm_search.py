@@ -0,0 +1,124 @@
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from crm_connections import ConnectionManager
+
+# =================== SEARCH EXECUTOR ===================
+
+@dataclass
+class SearchResult:
+    """Rows from one finished search; error is set instead when the query failed"""
+    name: str
+    generation: int
+    context: Any
+    rows: List[tuple]
+    error: Optional[Exception] = None
+
+class SearchExecutor:
+    """Runs searches on a worker thread over a read-only connection borrowed from the pool.
+
+    Searches are keyed by name (e.g. 'customers'). Each submit() bumps that
+    name's generation and waits out the debounce delay; a newer submit for
+    the same name replaces a queued search and interrupts a running one.
+    Results are handed over through results(), which drops any that a newer
+    generation has superseded, so the caller never sees outdated rows.
+    No Tk dependency: the UI polls results() from its own thread.
+    """
+
+    def __init__(self, connections: ConnectionManager):
+        self.connections = connections
+        self._cond = threading.Condition()
+        self._pending: Dict[str, Tuple[float, int, Callable, Any]] = {}
+        self._generations: Dict[str, int] = {}
+        self._running: Optional[str] = None
+        self._results: 'queue.Queue[SearchResult]' = queue.Queue()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._work, name='crm-search', daemon=True)
+        self._thread.start()
+
+    def submit(self, name: str, query: Callable[[sqlite3.Connection], List[tuple]],
+               delay: float = 0.0, context: Any = None) -> int:
+        """Run query(conn) after delay seconds unless superseded; returns its generation"""
+        with self._cond:
+            generation = self._generations.get(name, 0) + 1
+            self._generations[name] = generation
+            self._pending[name] = (time.monotonic() + delay, generation, query, context)
+            if self._running == name:
+                self._conn.interrupt()
+            self._cond.notify()
+        return generation
+
+    def cancel(self, name: str):
+        """Forget any queued, running or undelivered search for name"""
+        with self._cond:
+            self._generations[name] = self._generations.get(name, 0) + 1
+            self._pending.pop(name, None)
+            if self._running == name:
+                self._conn.interrupt()
+
+    def is_current(self, name: str, generation: int) -> bool:
+        return self._generations.get(name) == generation
+
+    def results(self) -> List[SearchResult]:
+        """Finished searches that are still the latest for their name"""
+        finished = []
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                return finished
+            if self.is_current(result.name, result.generation):
+                finished.append(result)
+
+    def busy(self) -> bool:
+        with self._cond:
+            return bool(self._pending) or self._running is not None or not self._results.empty()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            if self._running is not None:
+                self._conn.interrupt()
+            self._cond.notify()
+        self._thread.join(timeout=5)
+
+    def _work(self):
+        with self.connections.reader() as conn:
+            self._conn = conn
+            while True:
+                job = self._next_job()
+                if job is None:
+                    return
+                name, generation, query, context = job
+                try:
+                    result = SearchResult(name, generation, context, query(conn))
+                except Exception as e:
+                    # An interrupted query was superseded; results() drops it anyway
+                    result = SearchResult(name, generation, context, [], e)
+                with self._cond:
+                    self._running = None
+                self._results.put(result)
+
+    def _next_job(self) -> Optional[Tuple[str, int, Callable, Any]]:
+        """Block until the earliest pending search is due, or return None once closed"""
+        with self._cond:
+            while not self._closed:
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                name = min(self._pending, key=lambda n: self._pending[n][0])
+                due, generation, query, context = self._pending[name]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                del self._pending[name]
+                self._running = name
+                return name, generation, query, context
+            return None
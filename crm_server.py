@@ -0,0 +1,454 @@
+import asyncio
+import datetime
+import hmac
+import http
+import json
+import sqlite3
+import urllib.parse
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from crm_repository import Change, CRMDatabase, Repositories
+from crm_writer import WriteExecutor
+
+# =================== PROTOCOL ===================
+
+READ, WRITE = 'read', 'write'
+
+# The repository methods a server exposes, as GET or POST /api/<repository>/<method>
+OPERATIONS: Dict[str, Dict[str, str]] = {
+    'customers': {'get': READ, 'list': READ, 'page': READ, 'names': READ, 'recent': READ, 'count': READ,
+                  'status_counts': READ, 'ids_named': READ,
+                  'add': WRITE, 'update': WRITE, 'delete': WRITE, 'delete_many': WRITE, 'merge': WRITE},
+    'sales': {'get': READ, 'list': READ, 'page': READ, 'recent': READ, 'count': READ, 'total_amount': READ,
+              'monthly_totals': READ, 'status_totals': READ, 'month_totals': READ, 'range_totals': READ,
+              'add': WRITE, 'update': WRITE, 'delete': WRITE},
+    'tasks': {'get': READ, 'list': READ, 'page': READ, 'recent': READ, 'count': READ, 'count_open': READ,
+              'open_due_dates': READ, 'status_counts': READ, 'priority_counts': READ,
+              'add': WRITE, 'update': WRITE, 'complete': WRITE, 'delete': WRITE},
+    'interactions': {'get': READ, 'for_customer': READ, 'timeline': READ, 'recent': READ,
+                     'add': WRITE, 'delete': WRITE},
+}
+# Results that are rows, which JSON turns into arrays; everything else (counts, ids,
+# lists of ids) goes back as it came. (repository -> {method: ROW or ROWS})
+ROW, ROWS = 'row', 'rows'
+RESULT_SHAPES: Dict[str, Dict[str, str]] = {
+    'customers': {'get': ROW, 'list': ROWS, 'page': ROWS, 'names': ROWS, 'recent': ROWS, 'status_counts': ROWS},
+    'sales': {'get': ROW, 'list': ROWS, 'page': ROWS, 'recent': ROWS, 'monthly_totals': ROWS,
+              'status_totals': ROWS, 'month_totals': ROWS, 'range_totals': ROWS},
+    'tasks': {'get': ROW, 'list': ROWS, 'page': ROWS, 'recent': ROWS, 'open_due_dates': ROWS,
+              'status_counts': ROWS, 'priority_counts': ROWS},
+    'interactions': {'get': ROW, 'for_customer': ROWS, 'timeline': ROWS, 'recent': ROWS},
+}
+# Tables each repository's reads look at; sales and task rows carry their customer's name
+READ_DEPENDS = {
+    'customers': ('customers',),
+    'sales': ('sales', 'customers'),
+    'tasks': ('tasks', 'customers'),
+    'interactions': ('interactions',),
+}
+# Arguments sent as ISO dates: (repository, method) -> {position: name}
+DATE_ARGUMENTS = {('sales', 'range_totals'): {1: 'first', 2: 'last'}}
+
+def json_default(value: Any) -> Any:
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def encode(value: Any) -> bytes:
+    return json.dumps(value, default=json_default, separators=(',', ':')).encode('utf-8')
+
+def change_from_json(data: Dict[str, Any]) -> Change:
+    """The Change a server sent, rows back as tuples"""
+    return Change(data['table'], data['op'], data['row_id'],
+                  tuple(data['old']) if data.get('old') is not None else None,
+                  tuple(data['new']) if data.get('new') is not None else None, data.get('seq'))
+
+def parse_dates(repo: str, method: str, args: List[Any], kwargs: Dict[str, Any]):
+    """Turn the ISO date arguments of method back into dates, in place"""
+    for position, name in DATE_ARGUMENTS.get((repo, method), {}).items():
+        if position < len(args) and isinstance(args[position], str):
+            args[position] = datetime.date.fromisoformat(args[position])
+        elif isinstance(kwargs.get(name), str):
+            kwargs[name] = datetime.date.fromisoformat(kwargs[name])
+
+# =================== READ CACHE ===================
+
+class ReadCache:
+    """Encoded read responses shared by every client, least recently used dropped first.
+
+    Each entry records the tables its read looked at; a committed change
+    to one of them drops the entry (invalidate). put() is given the table
+    versions taken before the read ran and discards the body if a change
+    landed meanwhile, so a read racing a write never caches old rows.
+    Bodies over max_entry bytes are not kept.
+    """
+
+    def __init__(self, size: int = 4096, max_entry: int = 1 << 20):
+        self.size = size
+        self.max_entry = max_entry
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Any, Tuple[Tuple[str, ...], bytes]]' = OrderedDict()
+        self._keys_by_table: Dict[str, Set[Any]] = {}
+        self._versions: Dict[str, int] = {}
+
+    def get(self, key: Any) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def versions(self, tables: Tuple[str, ...]) -> Tuple[int, ...]:
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+    def put(self, key: Any, tables: Tuple[str, ...], versions: Tuple[int, ...], body: bytes):
+        if versions != self.versions(tables) or len(body) > self.max_entry:
+            return
+        self._drop(key)
+        self._entries[key] = (tables, body)
+        for table in tables:
+            self._keys_by_table.setdefault(table, set()).add(key)
+        while len(self._entries) > self.size:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate(self, table: str):
+        self._versions[table] = self._versions.get(table, 0) + 1
+        for key in list(self._keys_by_table.get(table, ())):
+            self._drop(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: Any):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            for table in entry[0]:
+                self._keys_by_table[table].discard(key)
+
+# =================== SERVER ===================
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+class CRMServer:
+    """Serves the repositories of one CRM database to many clients over HTTP/JSON.
+
+    GET or POST /api/<repository>/<method> calls one of OPERATIONS: reads
+    take their arguments from ?args=[...] (plus name=value pairs, each
+    JSON if it parses) or a {"args": [...], "kwargs": {...}} body, writes
+    only from a POST body. Responses are {"value": ...}, writes adding the
+    Changes they committed, or {"error": ..., "type": ...} with a 4xx/5xx
+    status (409 for IntegrityError, 503 for OperationalError).
+
+    Reads run on a pool of read-only connections and are answered from a
+    shared ReadCache where possible. Writes from every client queue up
+    for one WriteExecutor, so they never fight over SQLite's write lock,
+    and those that arrive while it is busy share one commit, each still
+    succeeding or failing on its own. Every committed Change gets the
+    next seq and goes out on GET /api/events, a Server-Sent Events stream:
+    one "changes" event per batch of writes that finished together. A
+    client reconnecting with Last-Event-ID gets what it missed from the
+    last history changes, or a "reset" event when that is too far back.
+    When a token is set every request needs "Authorization: Bearer <token>".
+    """
+
+    HEARTBEAT = 15.0  # seconds between keep-alive comments on idle event streams
+    STREAM_BACKLOG = 256  # events queued for a slow stream before it is cut off
+    MAX_BODY = 1 << 20
+
+    def __init__(self, path: str = 'crm_database.db', host: str = '127.0.0.1', port: int = 8765,
+                 readers: int = 8, cache_size: int = 4096, history: int = 10000, token: Optional[str] = None):
+        self.path = path
+        self.host = host
+        self.port = port
+        self.readers = readers
+        self.token = token
+        self.cache = ReadCache(cache_size)
+        self.seq = 0
+        self.history: Deque[Change] = deque(maxlen=history)
+        self.requests = 0
+        self._streams: Set['asyncio.Queue[Optional[bytes]]'] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> 'CRMServer':
+        self.loop = asyncio.get_running_loop()
+        # Created on the loop's thread, which close() also runs on; it only migrates and closes
+        self.db = CRMDatabase(self.path, self.readers)
+        self._read_pool = ThreadPoolExecutor(self.readers, thread_name_prefix='crm-read')
+        self.writes = WriteExecutor(self.db.writer, on_result=lambda: self.loop.call_soon_threadsafe(self._drain))
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        for stream in list(self._streams):
+            self._cut_off(stream)
+        self.writes.close()
+        self._drain()
+        self._read_pool.shutdown()
+        self.db.close()
+
+    def status(self) -> Dict[str, Any]:
+        return {'seq': self.seq, 'streams': len(self._streams), 'requests': self.requests,
+                'cache': {'entries': len(self.cache), 'hits': self.cache.hits, 'misses': self.cache.misses}}
+
+    # Connections
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    self._send(writer, 400, {'error': 'Malformed request line', 'type': 'RequestError'}, False)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # The body's end is unknown, so the connection cannot be reused
+                    self._send(writer, 400, {'error': 'Malformed Content-Length', 'type': 'RequestError'}, False)
+                    return
+                if length > self.MAX_BODY:
+                    self._send(writer, 413, {'error': 'Request body too large', 'type': 'RequestError'}, False)
+                    return
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                url = urllib.parse.urlsplit(target)
+                self.requests += 1
+                if not self._authorized(headers):
+                    self._send(writer, 401, {'error': 'Missing or wrong token', 'type': 'RequestError'}, keep_alive)
+                elif method == 'GET' and url.path == '/api/events':
+                    await self._stream_events(writer, headers.get('last-event-id'))
+                    return
+                else:
+                    status, payload = await self._respond(method, url.path, url.query, body)
+                    self._send(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _authorized(self, headers: Dict[str, str]) -> bool:
+        if self.token is None:
+            return True
+        # Bytes: compare_digest refuses str holding anything but ASCII
+        return hmac.compare_digest(headers.get('authorization', '').encode('latin-1'),
+                                   f'Bearer {self.token}'.encode('utf-8'))
+
+    def _send(self, writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool):
+        body = payload if isinstance(payload, bytes) else encode(payload)
+        head = (f'HTTP/1.1 {status} {http.HTTPStatus(status).phrase}\r\n'
+                f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n'
+                + ('' if keep_alive else 'Connection: close\r\n') + '\r\n')
+        writer.write(head.encode('latin-1') + body)
+
+    # Requests
+
+    async def _respond(self, method: str, path: str, query: str, body: bytes) -> Tuple[int, Any]:
+        try:
+            if path == '/api/status':
+                return 200, self.status()
+            parts = path.strip('/').split('/')
+            if len(parts) != 3 or parts[0] != 'api' or parts[2] not in OPERATIONS.get(parts[1], {}):
+                raise RequestError(404, f'No operation {path}')
+            repo, op = parts[1], parts[2]
+            kind = OPERATIONS[repo][op]
+            if method not in ('GET', 'POST') or (kind == WRITE and method != 'POST'):
+                raise RequestError(405, f'{op} takes {"POST" if kind == WRITE else "GET or POST"}')
+            args, kwargs = self._arguments(query if method == 'GET' else '', body)
+            if kind == READ:
+                return 200, await self._read(repo, op, args, kwargs)
+            value, changes = await self._write(repo, op, args, kwargs)
+            return 200, {'value': value, 'changes': [asdict(change) for change in changes]}
+        except RequestError as e:
+            return e.status, {'error': str(e), 'type': 'RequestError'}
+        except sqlite3.IntegrityError as e:
+            return 409, {'error': str(e), 'type': 'IntegrityError'}
+        except sqlite3.OperationalError as e:
+            return 503, {'error': str(e), 'type': 'OperationalError'}
+        except (TypeError, ValueError) as e:
+            return 400, {'error': str(e), 'type': type(e).__name__}
+        except Exception as e:
+            return 500, {'error': str(e), 'type': type(e).__name__}
+
+    @staticmethod
+    def _arguments(query: str, body: bytes) -> Tuple[List[Any], Dict[str, Any]]:
+        try:
+            if body:
+                request = json.loads(body)
+                if not isinstance(request, dict):
+                    raise ValueError('body must be a JSON object')
+                args, kwargs = request.get('args', []), request.get('kwargs', {})
+            else:
+                args, kwargs = [], {}
+                for name, value in urllib.parse.parse_qsl(query, keep_blank_values=True):
+                    try:
+                        decoded = json.loads(value)
+                    except ValueError:
+                        decoded = value  # plain text, e.g. ?search_term=smith
+                    if name == 'args':
+                        args = decoded
+                    else:
+                        kwargs[name] = decoded
+        except ValueError as e:
+            raise RequestError(400, f'Bad arguments: {e}')
+        if not isinstance(args, list) or not isinstance(kwargs, dict):
+            raise RequestError(400, 'args must be a list and kwargs an object')
+        return args, kwargs
+
+    async def _read(self, repo: str, op: str, args: List[Any], kwargs: Dict[str, Any]) -> bytes:
+        key = (repo, op, json.dumps([args, kwargs], sort_keys=True))
+        body = self.cache.get(key)
+        if body is not None:
+            return body
+        tables = READ_DEPENDS[repo]
+        versions = self.cache.versions(tables)
+        value = await self.loop.run_in_executor(self._read_pool, self._run_read, repo, op, args, kwargs)
+        body = encode({'value': value})
+        self.cache.put(key, tables, versions, body)
+        return body
+
+    def _run_read(self, repo: str, op: str, args: List[Any], kwargs: Dict[str, Any]) -> Any:
+        parse_dates(repo, op, args, kwargs)
+        with self.db.connections.reader() as conn:
+            value = getattr(getattr(Repositories(conn), repo), op)(*args, **kwargs)
+            # Iterators (open_due_dates) have to be read before the connection goes back
+            return value if isinstance(value, (list, tuple, dict, int, float, str, type(None))) else list(value)
+
+    async def _write(self, repo: str, op: str, args: List[Any], kwargs: Dict[str, Any]) -> Tuple[Any, List[Change]]:
+        parse_dates(repo, op, args, kwargs)
+        future = self.loop.create_future()
+        self.writes.submit(lambda repos: getattr(getattr(repos, repo), op)(*args, **kwargs), future)
+        return await future
+
+    def _drain(self):
+        """Number, publish and hand back the writes finished since the last call; on the loop's thread"""
+        batch = []
+        for result in self.writes.results():
+            for change in result.changes:
+                self.seq += 1
+                change.seq = self.seq
+                self.history.append(change)
+                self.cache.invalidate(change.table)
+            batch += result.changes
+            future = result.context
+            if future.done():
+                continue
+            if result.error is not None:
+                future.set_exception(result.error)
+            else:
+                future.set_result((result.value, result.changes))
+        if batch:
+            self._broadcast(self._event('changes', batch[-1].seq, [asdict(change) for change in batch]))
+
+    # Change stream
+
+    @staticmethod
+    def _event(name: str, event_id: int, data: Any) -> bytes:
+        return f'id: {event_id}\nevent: {name}\ndata: '.encode('utf-8') + encode(data) + b'\n\n'
+
+    def _broadcast(self, event: bytes):
+        for stream in list(self._streams):
+            try:
+                stream.put_nowait(event)
+            except asyncio.QueueFull:
+                # It reconnects with Last-Event-ID and catches up from history
+                self._cut_off(stream)
+
+    def _cut_off(self, stream: 'asyncio.Queue[Optional[bytes]]'):
+        self._streams.discard(stream)
+        while not stream.empty():
+            stream.get_nowait()
+        stream.put_nowait(None)
+
+    def _catch_up(self, last_event_id: Optional[str]) -> bytes:
+        """The first event for a new stream: what it missed since last_event_id, or where it starts"""
+        try:
+            since = int(last_event_id) if last_event_id is not None else None
+        except ValueError:
+            since = None
+        if since is None or since == self.seq:
+            return self._event('hello', self.seq, {'seq': self.seq})
+        oldest = self.history[0].seq if self.history else self.seq + 1
+        if since > self.seq or since + 1 < oldest:
+            # Server restarted or too much happened meanwhile: the client reloads everything
+            return self._event('reset', self.seq, {'seq': self.seq})
+        missed = [asdict(change) for change in self.history if change.seq > since]
+        return self._event('changes', self.seq, missed)
+
+    async def _stream_events(self, writer: asyncio.StreamWriter, last_event_id: Optional[str]):
+        stream: 'asyncio.Queue[Optional[bytes]]' = asyncio.Queue(self.STREAM_BACKLOG)
+        self._streams.add(stream)
+        try:
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n\r\n'
+                         b'retry: 2000\n\n' + self._catch_up(last_event_id))
+            await writer.drain()
+            while True:
+                try:
+                    event = await asyncio.wait_for(stream.get(), self.HEARTBEAT)
+                except asyncio.TimeoutError:
+                    event = b': keep-alive\n\n'
+                # Whatever else queued up meanwhile goes out in the same write
+                events = [event]
+                while event is not None and not stream.empty():
+                    event = stream.get_nowait()
+                    events.append(event)
+                if event is None:
+                    return
+                writer.write(b''.join(events))
+                await writer.drain()
+        finally:
+            self._streams.discard(stream)
+
+if __name__ == '__main__':
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description='Share a CRM database with CRMApp clients over HTTP/JSON')
+    parser.add_argument('--database', default='crm_database.db')
+    parser.add_argument('--host', default='127.0.0.1', help='0.0.0.0 to serve the whole network')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--readers', type=int, default=8, help='read-only connections for queries')
+    parser.add_argument('--token', default=os.environ.get('CRM_SERVER_TOKEN'),
+                        help='shared secret clients must send (default $CRM_SERVER_TOKEN)')
+    args = parser.parse_args()
+
+    async def main():
+        server = await CRMServer(args.database, args.host, args.port, args.readers, token=args.token).start()
+        print(f'Serving {args.database} on http://{args.host}:{server.port}', flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,145 @@
+import queue
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+from crm_repository import Change, Repositories
+
+# Opens the worker's repositories, reporting Changes to the given callback; returns them and what closes them
+WriterFactory = Callable[[Callable[[Change], None]], Tuple[Repositories, Callable[[], None]]]
+
+# =================== WRITE EXECUTOR ===================
+
+@dataclass
+class WriteResult:
+    """One finished write: its return value and committed Changes, or the error that rolled it back"""
+    context: Any
+    value: Any
+    changes: List[Change]
+    error: Optional[Exception] = None
+
+class WriteExecutor:
+    """Runs repository writes in submission order on a worker thread with its own writer connection.
+
+    submit(write) queues write(repos), where repos are the Repositories
+    open_writer returned on the worker, e.g. CRMDatabase.writer over a
+    connection of their own. Writes that queued up while the worker was
+    busy run together in one transaction (Repositories.batch), so they
+    share a single commit, each in a savepoint of its own: a failed write
+    is undone on its own and the rest still commit. A write on its own,
+    or on repositories that cannot batch, commits as it would have
+    directly. The Changes a write emits are collected instead of
+    published and handed back with its result through results() once
+    they are committed, for the caller to publish on its own thread.
+    on_result, if given, is called on the worker after each commit, for
+    callers that would rather be woken than poll. No Tk dependency: the UI
+    polls results() from its own thread.
+    """
+
+    MAX_BATCH = 256  # writes sharing one commit at most
+
+    def __init__(self, open_writer: WriterFactory, on_result: Optional[Callable[[], None]] = None):
+        self.open_writer = open_writer
+        self.on_result = on_result
+        self._jobs: 'queue.Queue[Optional[Tuple[Callable[[Repositories], Any], Any]]]' = queue.Queue()
+        self._results: 'queue.Queue[WriteResult]' = queue.Queue()
+        self._outstanding = 0  # submitted and not yet taken from results()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._work, name='crm-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, write: Callable[[Repositories], Any], context: Any = None):
+        """Queue write(repos); its WriteResult carries context back"""
+        with self._lock:
+            self._outstanding += 1
+        self._jobs.put((write, context))
+
+    def results(self) -> List[WriteResult]:
+        """Writes finished since the last call, in the order they ran"""
+        finished = []
+        while True:
+            try:
+                finished.append(self._results.get_nowait())
+            except queue.Empty:
+                break
+        with self._lock:
+            self._outstanding -= len(finished)
+        return finished
+
+    def busy(self) -> bool:
+        with self._lock:
+            return self._outstanding > 0
+
+    def close(self):
+        """Finish the queued writes, then close the connection"""
+        self._jobs.put(None)
+        self._thread.join()
+
+    def _work(self):
+        changes: List[Change] = []
+        repos, close = self.open_writer(changes.append)
+        try:
+            while True:
+                jobs = self._take_jobs()
+                closing = jobs[-1] is None
+                if closing:
+                    jobs.pop()
+                if len(jobs) > 1 and repos.transactional:
+                    try:
+                        results = self._run_batch(repos, jobs, changes)
+                    except sqlite3.Error:
+                        # The batch could not begin or commit and was rolled back; retry one by one
+                        repos.rollback()
+                        results = [self._run_alone(repos, write, context, changes) for write, context in jobs]
+                else:
+                    results = [self._run_alone(repos, write, context, changes) for write, context in jobs]
+                for result in results:
+                    self._results.put(result)
+                if results and self.on_result is not None:
+                    self.on_result()
+                if closing:
+                    return
+        finally:
+            close()
+
+    def _take_jobs(self) -> List[Optional[Tuple[Callable[[Repositories], Any], Any]]]:
+        """The next job, waiting for it, and whatever else is queued behind it, up to MAX_BATCH"""
+        jobs = [self._jobs.get()]
+        while jobs[-1] is not None and len(jobs) < self.MAX_BATCH:
+            try:
+                jobs.append(self._jobs.get_nowait())
+            except queue.Empty:
+                break
+        return jobs
+
+    @staticmethod
+    def _run_alone(repos: Repositories, write: Callable[[Repositories], Any], context: Any,
+                   changes: List[Change]) -> WriteResult:
+        changes.clear()
+        try:
+            return WriteResult(context, write(repos), list(changes))
+        except Exception as e:
+            repos.rollback()
+            return WriteResult(context, None, list(changes), e)
+
+    @staticmethod
+    def _run_batch(repos: Repositories, jobs: List[Tuple[Callable[[Repositories], Any], Any]],
+                   changes: List[Change]) -> List[WriteResult]:
+        results = []
+        with repos.batch():
+            for write, context in jobs:
+                changes.clear()
+                try:
+                    with repos.savepoint():
+                        value = write(repos)
+                except sqlite3.Error as e:
+                    if not repos.conn.in_transaction:
+                        raise  # the batch itself is gone, e.g. a full disk rolled it back
+                    # Rolled back to the savepoint: nothing the write did stands
+                    results.append(WriteResult(context, None, [], e))
+                except Exception as e:
+                    results.append(WriteResult(context, None, [], e))
+                else:
+                    results.append(WriteResult(context, value, list(changes)))
+        return results
@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tkinter_app_framework import CSVDataSource, DataSource
+
+
+class ListSource(DataSource):
+    """A source with only the abstract methods, to exercise the base fallback"""
+
+    def __init__(self, rows):
+        super().__init__(('id', 'name'))
+        self.rows = rows
+
+    def row_count(self):
+        return len(self.rows)
+
+    def fetch(self, offset, limit):
+        return self.rows[offset:offset + limit]
+
+
+def test_base_fetch_by_keys_scans_the_rows():
+    source = ListSource([(n, f'name{n}') for n in range(2500)])
+    assert source.fetch_by_keys([3, 2400, 9999]) == {3: (3, 'name3'), 2400: (2400, 'name2400')}
+    assert source.fetch_by_keys(['name7'], key_column=1) == {'name7': (7, 'name7')}
+
+
+def test_csv_fetch_by_keys_reads_edited_rows(tmp_path):
+    path = tmp_path / 'rows.csv'
+    path.write_text('id,name\n1,Ann\n2,Bob\n3,Cy\n', encoding='utf-8')
+    source = CSVDataSource(str(path))
+    assert source.fetch(0, 3)[1] == ('2', 'Bob')
+    path.write_text('id,name\n1,Ann\n2,Bobby\n3,Cy\n', encoding='utf-8')
+    assert source.fetch_by_keys(['2', '4']) == {'2': ('2', 'Bobby')}
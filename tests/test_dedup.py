@@ -0,0 +1,59 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crm_dedup import DedupJob, DuplicateFinder, Fingerprint, jaro_winkler, match_score
+from crm_repository import CRMDatabase
+
+
+def customers_with_duplicates(path):
+    db = CRMDatabase(path)
+    ids = {
+        'john': db.customers.add('John Smith', 'john.smith@acme.com', '(555) 123-4567', 'Acme Inc',
+                                 notes='met at expo'),
+        'jon': db.customers.add('Jon Smith', 'jon.smith@gmail.com', '555-123-4567', '', '12 High St',
+                                notes='prefers phone'),
+        'reversed': db.customers.add('Smith, John', 'johnsmith@acme.com'),
+        'jane': db.customers.add('Jane Smith', 'jane@acme.com', '555-999-0000', 'Acme Inc'),
+        'other': db.customers.add('Maria Garcia', 'maria@example.com', '555-222-3333'),
+    }
+    return db, ids
+
+
+def test_similarity_ignores_format_and_word_order():
+    assert jaro_winkler('martha', 'marhta') > 0.96
+    assert jaro_winkler('abc', '') == 0.0
+    john = Fingerprint.from_row((1, 'John Smith', 'john.smith@acme.com', '(555) 123-4567', 'Acme Inc'))
+    assert match_score(john, Fingerprint.from_row((2, 'smith john', 'John.Smith@acme.com', '5551234567', ''))) == 1.0
+    assert match_score(john, Fingerprint.from_row((3, 'Jane Smith', 'jane@acme.com', '555-999-0000', ''))) < 0.8
+
+
+def test_finder_groups_duplicates_only(tmp_path):
+    db, ids = customers_with_duplicates(str(tmp_path / 'crm.db'))
+    finder = DuplicateFinder(db.conn, batch_size=2)
+    groups = finder.find()
+    assert [group.ids for group in groups] == [sorted([ids['john'], ids['jon'], ids['reversed']])]
+    assert 0.92 <= groups[0].score <= 1.0
+    assert finder.compared < 5 * 4 // 2  # blocking skipped most of the pairs
+    db.close()
+
+
+def test_dedup_job_then_merge(tmp_path):
+    db, ids = customers_with_duplicates(str(tmp_path / 'crm.db'))
+    sale = db.sales.add(ids['jon'], 'Laptop', 900, 'Completed', '2024-03-01')
+    task = db.tasks.add(ids['reversed'], 'Call back')
+    job = DedupJob(db.connections)
+    job.run()
+    assert job.done == job.total == 5 * 4
+    keep, *duplicates = job.groups[0].ids
+
+    assert db.customers.merge(keep, duplicates) == 2
+    assert db.customers.count() == 3
+    merged = db.customers.get(keep)
+    # Blank fields of the kept customer filled from the duplicates, notes appended
+    assert (merged[1], merged[4], merged[5]) == ('John Smith', 'Acme Inc', '12 High St')
+    assert merged[8] == 'met at expo\nprefers phone'
+    assert db.sales.get(sale)[1] == db.tasks.get(task)[1] == keep
+    assert DuplicateFinder(db.conn).find() == []
+    db.close()
@@ -0,0 +1,154 @@
+import csv
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crm_export import ExportJob, csv_path
+from crm_import import ImportJob
+from crm_repository import CRMDatabase
+
+TABLES = ('customers', 'sales', 'tasks')
+
+
+def write_csv(path, header, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+def read_errors(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def same_rows(a, b):
+    return all(getattr(a, table).dump() == getattr(b, table).dump() for table in TABLES)
+
+
+def test_csv_import_rejects_bad_rows_and_resolves_customers(tmp_path):
+    db = CRMDatabase(str(tmp_path / 'crm.db'))
+    existing = db.customers.add('Old Customer', 'old@example.com')
+    customers = write_csv(tmp_path / 'customers.csv', ['name', 'email', 'company', 'status'], [
+        ['Ann Lee', 'ann@example.com', 'Acme', 'Active'],
+        ['Zoë Müller', 'zoe@example.com', 'Globex', ''],
+        ['', 'noname@example.com', '', ''],             # name is required
+        ['Ann Again', 'ann@example.com', '', ''],       # email already in this file
+        ['Old Twin', 'old@example.com', '', ''],        # email already in the database
+        ['Bad Status', 'bad@example.com', '', 'Gone'],
+    ])
+    job = ImportJob(db.path, customers)
+    job.run()
+    assert (job.done, job.rejected) == (2, 4)
+    errors = read_errors(job.error_path)
+    assert job.error_path == str(tmp_path / 'customers.errors.csv')
+    assert [row['name'] for row in errors] == ['', 'Ann Again', 'Old Twin', 'Bad Status']
+    assert 'name is required' in errors[0]['error'] and 'status must be one of' in errors[3]['error']
+
+    sales = write_csv(tmp_path / 'sales.csv', ['customer_email', 'customer_id', 'product_name', 'amount'], [
+        ['ann@example.com', '', 'Laptop Pro', '$1,200.50'],
+        ['', str(existing), 'Desk Lamp', '40'],
+        ['nobody@example.com', '', 'Laptop', '10'],
+        ['', '999', 'Laptop', '10'],
+        ['zoe@example.com', '', 'Laptop', 'ten'],
+    ])
+    job = ImportJob(db.path, sales)
+    job.run()
+    assert (job.done, job.rejected) == (2, 3)
+    assert [row['error'] for row in read_errors(job.error_path)] == [
+        'no customer with email nobody@example.com', 'no customer with id 999',
+        "amount must be a number, got 'ten'"]
+    assert {(row[1], row[2], row[3]) for row in db.sales.list()} == {
+        ('Ann Lee', 'Laptop Pro', 1200.5), ('Old Customer', 'Desk Lamp', 40.0)}
+    assert [row[2] for row in db.sales.list(search_term='laptop')] == ['Laptop Pro']
+    db.close()
+
+
+def test_imported_rows_are_searchable_and_fts_triggers_restored(tmp_path):
+    db = CRMDatabase(str(tmp_path / 'crm.db'))
+    customers = write_csv(tmp_path / 'customers.csv', ['name', 'email', 'notes'], [
+        ['Zoë Müller', 'zoe@example.com', 'prefers email'],
+        ['Bob Stone', 'bob@example.com', ''],
+    ])
+    ImportJob(db.path, customers).run()
+    assert [row[1] for row in db.customers.list('muller')] == ['Zoë Müller']
+    assert [row[1] for row in db.customers.list('prefers')] == ['Zoë Müller']
+    # insert_rows dropped the per-row trigger for the batch; later writes are indexed again
+    triggers = {name for (name,) in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert {'customers_fts_insert', 'sales_fts_insert'} <= triggers
+    db.customers.add('Carla Muller', 'carla@example.com')
+    assert sorted(row[1] for row in db.customers.list('muller')) == ['Carla Muller', 'Zoë Müller']
+    db.close()
+
+
+def test_cancel_stops_after_the_current_batch(tmp_path):
+    db = CRMDatabase(str(tmp_path / 'crm.db'))
+    customers = write_csv(tmp_path / 'customers.csv', ['name', 'email'],
+                          [[f'C{n}', f'c{n}@example.com'] for n in range(10)])
+    job = ImportJob(db.path, customers, batch_size=3)
+    job.cancel()
+    job.run()
+    assert job.done == 3
+    assert db.customers.count() == 3
+    db.close()
+
+
+def test_jsonl_import_export_round_trip(tmp_path):
+    source = CRMDatabase(str(tmp_path / 'source.db'))
+    lines = [
+        {'table': 'customers', 'name': 'Ann Lee', 'email': 'ann@example.com', 'company': 'Acme'},
+        {'table': 'customers', 'name': 'Bob Stone', 'email': 'bob@example.com'},
+        {'table': 'sales', 'customer_email': 'ann@example.com', 'product_name': 'Laptop', 'amount': 999,
+         'sale_date': '2024-03-01'},
+        {'table': 'tasks', 'customer_email': 'bob@example.com', 'title': 'Call back', 'priority': 'High',
+         'due_date': '2024-04-01'},
+        {'table': 'tasks', 'customer_email': 'bob@example.com', 'title': 'Urgent', 'priority': 'Urgent'},
+        {'table': 'invoices', 'number': 7},
+    ]
+    data = tmp_path / 'data.jsonl'
+    data.write_text('\n'.join(json.dumps(line) for line in lines) + '\n{not json\n', encoding='utf-8')
+    job = ImportJob(source.path, str(data))
+    job.run()
+    assert (job.done, job.rejected) == (4, 3)
+    with open(job.error_path, encoding='utf-8') as f:
+        errors = [json.loads(line) for line in f]
+    assert job.error_path == str(tmp_path / 'data.errors.jsonl')
+    # Unparsable lines are turned down while reading, the rest as their batch is inserted
+    assert [error['error'].split(' ')[0] for error in errors] == ['Invalid', 'Unknown', 'priority']
+
+    exported = str(tmp_path / 'export.jsonl')
+    export = ExportJob(source.path, exported, tables=TABLES)
+    export.run()
+    assert export.done == export.total == 4
+    target = CRMDatabase(str(tmp_path / 'target.db'))
+    job = ImportJob(target.path, exported)
+    job.run()
+    assert (job.done, job.rejected) == (4, 0)
+    assert same_rows(source, target)
+    assert [row[1] for row in target.customers.list('acme')] == ['Ann Lee']
+    source.close()
+    target.close()
+
+
+def test_csv_export_round_trip(tmp_path):
+    source = CRMDatabase(str(tmp_path / 'source.db'))
+    ann = source.customers.add('Ann Lee', 'ann@example.com', company='Acme')
+    source.sales.add(ann, 'Laptop, 15"', 1200.5, 'Completed', '2024-03-01')
+    source.tasks.add(ann, 'Send invoice', due_date='2024-03-05')
+    exported = str(tmp_path / 'report.csv.gz')
+    export = ExportJob(source.path, exported, tables=TABLES)
+    export.run()
+    assert export.outputs == [csv_path(exported, table) for table in TABLES]
+
+    target = CRMDatabase(str(tmp_path / 'target.db'))
+    for path in export.outputs:  # report_customers.csv.gz first, so the others find their customer
+        job = ImportJob(target.path, path)
+        job.run()
+        assert (job.done, job.rejected) == (1, 0)
+    assert same_rows(source, target)
+    assert [row[2] for row in target.sales.list(search_term='laptop')] == ['Laptop, 15"']
+    source.close()
+    target.close()
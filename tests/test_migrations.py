@@ -0,0 +1,131 @@
+import dataclasses
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crm_migrations import MIGRATIONS, Migrator
+from crm_repository import SCHEMA
+
+# What each summary table must hold, computed from scratch: (query, number of key columns)
+EXPECTED = {
+    'customer_counts': ("SELECT IFNULL(status, ''), COUNT(*) FROM customers GROUP BY 1", 1),
+    'sales_monthly': ("SELECT IFNULL(status, ''), IFNULL(strftime('%Y-%m', sale_date), ''), COUNT(*), "
+                      "TOTAL(amount) FROM sales GROUP BY 1, 2", 2),
+    'task_counts': ("SELECT IFNULL(status, ''), IFNULL(priority, ''), COUNT(*) FROM tasks GROUP BY 1, 2", 2),
+    'sales_daily': ("SELECT IFNULL(date(sale_date), ''), IFNULL(status, ''), COUNT(*), TOTAL(amount) "
+                    "FROM sales GROUP BY 1, 2", 2),
+    'sales_product_daily': ("SELECT lower(product_name), IFNULL(date(sale_date), ''), IFNULL(status, ''), "
+                            "COUNT(*), TOTAL(amount) FROM sales GROUP BY 1, 2, 3", 3),
+}
+
+STATUSES = ('Completed', 'Pending', 'Cancelled', None)
+DATES = ('2024-01-31', '2024-02-01', '2025-06-15 09:30:00', None)
+EMAILS = (f'writer{n}@example.com' for n in itertools.count())
+
+
+def version_4_database(path, rows=1500):
+    """A database as the app left it before the summary tables, with some data in it"""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA journal_mode = WAL')
+    with conn:
+        for statement in SCHEMA:
+            conn.execute(statement)
+    Migrator(conn, MIGRATIONS[:4], log=lambda line: None).run()
+    rng = random.Random(4)
+    with conn:
+        for i in range(rows // 3):
+            conn.execute("INSERT INTO customers (name, email, status) VALUES ('c', ?, ?)",
+                         (f'c{i}@example.com', rng.choice(('Active', 'Inactive', None))))
+        for _ in range(rows):
+            conn.execute('INSERT INTO sales (customer_id, product_name, amount, status, sale_date) '
+                         'VALUES (?, ?, ?, ?, ?)', (rng.randint(1, rows // 3), rng.choice(('Laptop', 'laptop', 'Desk')),
+                                                     rng.randint(1, 500), rng.choice(STATUSES), rng.choice(DATES)))
+            conn.execute("INSERT INTO tasks (customer_id, title, priority, status) VALUES (?, 't', ?, ?)",
+                         (rng.randint(1, rows // 3), rng.choice(('High', 'Low', None)), rng.choice(STATUSES)))
+    return conn
+
+
+def small_chunks(migrations, size):
+    return [dataclasses.replace(m, backfills=[dataclasses.replace(b, chunk_size=size) for b in m.backfills])
+            for m in migrations]
+
+
+def keep_writing(path, stop):
+    """Inserts, updates and deletes rows across the tables being summarized until stop is set,
+    pausing a moment between writes as the app would, so the migration gets the lock too"""
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    rng = random.Random(5)
+    while not stop.is_set():
+        last_sale = conn.execute('SELECT MAX(id) FROM sales').fetchone()[0]
+        last_task = conn.execute('SELECT MAX(id) FROM tasks').fetchone()[0]
+        action = rng.randrange(6)
+        if action == 0:
+            conn.execute("INSERT INTO sales (customer_id, product_name, amount, status, sale_date) "
+                         "VALUES (1, 'LAPTOP', 7, ?, ?)", (rng.choice(STATUSES), rng.choice(DATES)))
+        elif action == 1:
+            conn.execute('UPDATE sales SET status = ?, sale_date = ?, amount = amount + 1 WHERE id = ?',
+                         (rng.choice(STATUSES), rng.choice(DATES), rng.randint(1, last_sale)))
+        elif action == 2:
+            conn.execute('DELETE FROM sales WHERE id = ?', (rng.randint(1, last_sale),))
+        elif action == 3:
+            conn.execute('UPDATE tasks SET status = ?, priority = ? WHERE id = ?',
+                         (rng.choice(STATUSES), rng.choice(('High', 'Medium')), rng.randint(1, last_task)))
+        elif action == 4:
+            conn.execute('UPDATE customers SET status = ? WHERE id = ?',
+                         (rng.choice(('Active', 'Prospect')), rng.randint(1, 100)))
+        else:
+            conn.execute("INSERT INTO customers (name, email, status) VALUES ('w', ?, 'Prospect')",
+                         (next(EMAILS),))
+        time.sleep(0.001)
+    conn.close()
+
+
+def assert_summaries_exact(conn):
+    for table, (query, keys) in EXPECTED.items():
+        expected = {row[:keys]: row[keys:] for row in conn.execute(query)}
+        actual = {}
+        for row in conn.execute(f'SELECT * FROM {table}'):
+            key = (row[0].lower(),) + row[1:keys] if table == 'sales_product_daily' else row[:keys]
+            actual[key] = row[keys:]
+        assert set(actual) == set(expected), table
+        for key, values in expected.items():
+            assert actual[key][0] == values[0], (table, key)
+            if len(values) > 1:
+                assert abs(actual[key][1] - values[1]) < 1e-6, (table, key)
+
+
+def test_summaries_filled_in_chunks(tmp_path):
+    conn = version_4_database(str(tmp_path / 'crm.db'))
+    timings = Migrator(conn, small_chunks(MIGRATIONS, 100), log=lambda line: None).run()
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == MIGRATIONS[-1].version
+    assert any('backfill' in step and 'chunks' in step for step, _ in timings)
+    assert conn.execute('SELECT COUNT(*) FROM migration_progress').fetchone()[0] == 0
+    # finish leaves the same unconditional triggers a one-step migration would
+    triggers = [sql for (sql,) in conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger'")]
+    assert not any('migration_progress' in sql for sql in triggers)
+    assert_summaries_exact(conn)
+
+
+def test_summaries_exact_with_writes_during_the_walk(tmp_path):
+    path = str(tmp_path / 'crm.db')
+    conn = version_4_database(path)
+    stop = threading.Event()
+    writer = threading.Thread(target=keep_writing, args=(path, stop))
+    writer.start()
+    try:
+        Migrator(conn, small_chunks(MIGRATIONS, 50), pause=0.002, log=lambda line: None).run()
+    finally:
+        stop.set()
+        writer.join()
+    assert_summaries_exact(conn)
+    # And the permanent triggers keep them exact afterwards
+    stop.clear()
+    threading.Timer(0.2, stop.set).start()
+    keep_writing(path, stop)
+    assert_summaries_exact(conn)
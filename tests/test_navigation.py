@@ -0,0 +1,147 @@
+import os
+import sys
+import tkinter
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tkinter_app_framework import (ModernButton, ModernEntry, ModernFrame, NavigationManager, Page,
+                                   ThemeManager)
+
+
+class StubFrame:
+    def pack(self, **kwargs):
+        pass
+
+    def pack_forget(self):
+        pass
+
+    def destroy(self):
+        pass
+
+
+class StubContentArea:
+    """Queues after_idle callbacks for the test to run, instead of a Tk event loop"""
+
+    def __init__(self):
+        self.idle = []
+
+    def after_idle(self, callback):
+        self.idle.append(callback)
+        return len(self.idle)
+
+
+class StubState:
+    def set_state(self, key, value):
+        pass
+
+
+class StubPage(Page):
+    def create_content(self, parent):
+        return StubFrame()
+
+
+class ThemedPage(Page):
+    """A page built from the framework's themed widgets"""
+
+    def create_content(self, parent):
+        frame = ModernFrame(parent, self.theme_manager)
+        ModernButton(frame, self.theme_manager, text='Save')
+        ModernEntry(frame, self.theme_manager)
+        return frame
+
+
+def make_navigation(names, max_live_pages, page_class=StubPage, theme_manager=None):
+    content = StubContentArea()
+    navigation = NavigationManager(content, theme_manager, StubState(), max_live_pages=max_live_pages)
+    for name in names:
+        navigation.register_page(page_class(name, theme_manager, None))
+    return navigation, content
+
+
+@pytest.fixture
+def headless_tk(monkeypatch):
+    """tkinter widgets without a display: the framework's own widget code runs, and a
+    destroyed widget raises TclError when touched, as under Tk"""
+    def init(self, master, widget_name, cnf={}, kw={}, extra=()):
+        self.master = master
+        self._w = widget_name
+        self.children = {}
+        self.destroyed = False
+        if isinstance(master, tkinter.BaseWidget):
+            master.children[str(id(self))] = self
+
+    def configure(self, cnf=None, **kw):
+        if self.destroyed:
+            raise tkinter.TclError('invalid command name')
+
+    def destroy(self):
+        for child in list(self.children.values()):
+            child.destroy()
+        self.destroyed = True
+
+    monkeypatch.setattr(tkinter.BaseWidget, '__init__', init)
+    monkeypatch.setattr(tkinter.BaseWidget, 'destroy', destroy)
+    for name in ('configure', 'config'):
+        monkeypatch.setattr(tkinter.Misc, name, configure)
+    for name in ('bind', 'pack', 'pack_forget'):
+        monkeypatch.setattr(tkinter.Misc if name == 'bind' else tkinter.Pack, name, lambda self, *a, **kw: None)
+
+
+def run_idle(content, limit=50):
+    """Run idle callbacks until none are queued; returns how many ran"""
+    runs = 0
+    while content.idle and runs < limit:
+        content.idle.pop(0)()
+        runs += 1
+    return runs
+
+
+def test_preload_settles_with_back_target_protected():
+    navigation, content = make_navigation('ABCX', max_live_pages=3)
+    # Teach C -> A (twice) and C -> B, without letting preloads run
+    navigation.preload = False
+    for route in 'CACACBX':
+        navigation.navigate_to(route)
+    navigation.preload = True
+    navigation.navigate_to('C')  # live pages end up [.., X (back target), C (current)]
+    assert navigation.predict_next_pages('C', 2) == ['A', 'B']
+
+    runs = run_idle(content)
+
+    assert not content.idle, f'preloading still rescheduling after {runs} idle slots'
+    builds = {name: metrics.builds for name, metrics in navigation.metrics.items()}
+    assert builds['A'] <= 2 and builds['B'] <= 1, builds
+    assert set(navigation._live_pages) == {'X', 'C', 'A'}
+
+
+def test_preload_never_evicts_a_page_it_preloaded():
+    navigation, content = make_navigation('ABCDE', max_live_pages=4)
+    navigation.preload = False
+    for route in 'ABABACAE':
+        navigation.navigate_to(route)
+    navigation.preload = True
+    navigation.navigate_to('A')  # back target E; two free slots for B and C
+
+    run_idle(content)
+
+    assert not content.idle
+    assert set(navigation._live_pages) == {'E', 'A', 'B', 'C'}
+    builds = {name: metrics.builds for name, metrics in navigation.metrics.items()}
+    navigation._preload_next()  # a further pass finds everything built
+    assert not content.idle
+    assert {name: metrics.builds for name, metrics in navigation.metrics.items()} == builds
+
+
+def test_evicted_pages_leave_no_theme_callbacks(headless_tk):
+    theme_manager = ThemeManager()
+    navigation, content = make_navigation('ABC', max_live_pages=2, page_class=ThemedPage,
+                                          theme_manager=theme_manager)
+    navigation.preload = False
+    for route in 'ABCABC':
+        navigation.navigate_to(route)  # every navigation evicts a page and rebuilds another
+    assert len(navigation._live_pages) == 2
+    # Three widgets per live page, nothing left over from the evicted ones
+    assert len(theme_manager.callbacks) == 3 * 2
+    theme_manager.set_theme('dark')  # raised TclError from destroyed widgets before
@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crm_repository import CRMDatabase, full_scans
+
+
+def test_hot_queries_use_indexes_on_a_new_database(tmp_path):
+    db = CRMDatabase(str(tmp_path / 'crm.db'))
+    try:
+        assert full_scans(db.conn) == {}
+    finally:
+        db.close()
+
+
+def test_hot_queries_use_indexes_with_planner_statistics(tmp_path):
+    # ANALYZE can change plans; sqlite_stat1 as a filled-in database would have it
+    db = CRMDatabase(str(tmp_path / 'crm.db'))
+    try:
+        for i in range(200):
+            customer_id = db.customers.add(f'Customer {i}', f'customer{i}@example.com', company='Acme')
+            db.sales.add(customer_id, 'Widget', 10.0 * i, 'Completed' if i % 3 else 'Pending', '2024-03-01')
+            db.tasks.add(customer_id, 'Follow up', priority='High' if i % 4 else 'Low', due_date='2024-04-01')
+            db.interactions.add(customer_id, 'Call', 'Introduced', '2024-02-01')
+        db.conn.execute('ANALYZE')
+        assert full_scans(db.conn) == {}
+    finally:
+        db.close()
+
+
+def test_a_missing_index_is_reported(tmp_path):
+    db = CRMDatabase(str(tmp_path / 'crm.db'))
+    try:
+        db.conn.execute('DROP INDEX idx_tasks_priority')
+        assert 'tasks.by_priority' in full_scans(db.conn)
+    finally:
+        db.close()
@@ -0,0 +1,56 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crm_reminders import DueDateScheduler
+from crm_repository import CRMDatabase
+
+
+def test_load_counts_due_tasks_and_pops_the_rest_once(tmp_path):
+    db = CRMDatabase(str(tmp_path / 'crm.db'))
+    customer = db.customers.add('Ann Lee', 'ann@example.com')
+    overdue = db.tasks.add(customer, 'Overdue', due_date='2024-03-01')
+    db.tasks.add(customer, 'Today', due_date='2024-03-10')
+    tomorrow = db.tasks.add(customer, 'Tomorrow', due_date='2024-03-11')
+    later = db.tasks.add(customer, 'Later', due_date='2024-04-01')
+    db.tasks.complete(overdue)
+
+    scheduler = DueDateScheduler()
+    scheduler.load(db.tasks, '2024-03-10')
+    assert scheduler.due_count == 1
+    assert scheduler.next_due() == '2024-03-11'
+    assert scheduler.pop_due('2024-03-10') == []
+    assert scheduler.pop_due('2024-03-11') == [tomorrow]
+    assert scheduler.pop_due('2024-03-11') == []
+    assert (scheduler.due_count, scheduler.next_due()) == (2, '2024-04-01')
+    assert scheduler.pop_due('2024-12-31') == [later]
+    assert scheduler.next_due() is None
+    db.close()
+
+
+def test_changes_move_tasks_without_reloading(tmp_path):
+    db = CRMDatabase(str(tmp_path / 'crm.db'))
+    customer = db.customers.add('Ann Lee', 'ann@example.com')
+    moved = db.tasks.add(customer, 'Moved', due_date='2024-03-20')
+    done = db.tasks.add(customer, 'Done', due_date='2024-03-15')
+    scheduler = DueDateScheduler()
+    scheduler.load(db.tasks, '2024-03-10')
+    db.subscribe(scheduler.apply)
+
+    db.tasks.update(moved, customer, 'Moved', '', 'Medium', 'Pending', '2024-03-12')
+    db.tasks.complete(done)
+    added = db.tasks.add(customer, 'Added', due_date='2024-03-13')
+    db.tasks.add(customer, 'Already due', due_date='2024-03-01')
+    db.customers.update(customer, 'Ann Lee', 'ann@example.com', '', '', '', 'Active', '')
+    assert scheduler.due_count == 1  # saved already due: counted, never popped
+
+    # The old 2024-03-20 entry and the completed task are stale and skipped
+    assert scheduler.next_due() == '2024-03-12'
+    assert scheduler.pop_due('2024-03-31') == [moved, added]
+    assert scheduler.next_due() is None
+    assert scheduler.due_count == 3
+
+    db.tasks.delete(added)
+    assert scheduler.due_count == 2
+    db.close()
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crm_remote import RemoteDatabase
+from crm_repository import CRMDatabase
+from crm_server import CRMServer
+
+
+async def exchange(port, request):
+    """The status code and raw answer to one request sent as written"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(request)
+    answer = await reader.read()
+    writer.close()
+    await writer.wait_closed()
+    return int(answer.split(b' ', 2)[1]), answer
+
+
+def serve(path, requests, token=None):
+    """Answers to each request, in order, from a server started for them"""
+    async def run():
+        server = await CRMServer(path, port=0, readers=2, token=token).start()
+        try:
+            return [await exchange(server.port, request) for request in requests]
+        finally:
+            await server.close()
+    return asyncio.run(run())
+
+
+def test_malformed_content_length_is_a_bad_request(tmp_path):
+    answers = serve(str(tmp_path / 'crm.db'), [
+        b'POST /api/customers/count HTTP/1.1\r\nContent-Length: ten\r\n\r\n',
+        b'POST /api/customers/count HTTP/1.1\r\nContent-Length: -5\r\n\r\n',
+        b'GET /api/customers/count HTTP/1.1\r\nConnection: close\r\n\r\n',
+    ])
+    assert [status for status, _ in answers] == [400, 400, 200]
+    assert b'Malformed Content-Length' in answers[0][1]
+
+
+def test_non_ascii_authorization_is_refused(tmp_path):
+    answers = serve(str(tmp_path / 'crm.db'), [
+        'GET /api/status HTTP/1.1\r\nAuthorization: Bearer sécret\r\nConnection: close\r\n\r\n'.encode('utf-8'),
+        b'GET /api/status HTTP/1.1\r\nAuthorization: Bearer secret\r\nConnection: close\r\n\r\n',
+    ], token='secret')
+    assert [status for status, _ in answers] == [401, 200]
+
+
+def test_remote_results_match_local(tmp_path):
+    path = str(tmp_path / 'crm.db')
+    local = CRMDatabase(path)
+    ann = local.customers.add('Ann', 'ann@example.com')
+    local.customers.add('Bob', 'bob@example.com')
+    # Started and closed on the loop's thread, which owns the server's connections
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    server = asyncio.run_coroutine_threadsafe(CRMServer(path, port=0, readers=2).start(), loop).result(10)
+    remote = RemoteDatabase(f'http://127.0.0.1:{server.port}')
+    try:
+        # A list of ids is not a row, and one row is not a list of rows
+        assert remote.customers.ids_named('Ann') == local.customers.ids_named('Ann') == [ann]
+        assert remote.customers.get(ann) == local.customers.get(ann)
+        assert remote.customers.get(999) is None
+        assert remote.customers.list() == local.customers.list()
+        assert remote.customers.count() == 2
+        assert remote.customers.status_counts() == local.customers.status_counts()
+    finally:
+        remote.close()
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result(10)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(10)
+        loop.close()
+        local.close()
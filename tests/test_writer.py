@@ -0,0 +1,60 @@
+import os
+import sqlite3
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crm_repository import CRMDatabase
+from crm_writer import WriteExecutor
+
+
+def traced_writer(db, statements):
+    """CRMDatabase.writer, recording every statement its connection runs"""
+    def open_writer(notify):
+        repos, close = db.writer(notify)
+        repos.conn.set_trace_callback(statements.append)
+        return repos, close
+    return open_writer
+
+
+def run_queued(db, writes, statements):
+    """Submit writes while the worker is held up, so they queue; their results once all finished"""
+    executor = WriteExecutor(traced_writer(db, statements))
+    release = threading.Event()
+    executor.submit(lambda repos: release.wait(5), 'hold')
+    for n, write in enumerate(writes):
+        executor.submit(write, n)
+    release.set()
+    executor.close()
+    return [result for result in executor.results() if result.context != 'hold']
+
+
+def test_queued_writes_share_one_commit(tmp_path):
+    db = CRMDatabase(str(tmp_path / 'crm.db'))
+    statements = []
+    results = run_queued(db, [lambda repos, n=n: repos.customers.add(f'c{n}', f'c{n}@example.com')
+                              for n in range(20)], statements)
+    assert [result.error for result in results] == [None] * 20
+    assert [change.op for result in results for change in result.changes] == ['insert'] * 20
+    assert sum(statement.startswith('COMMIT') for statement in statements) == 1
+    assert db.customers.count() == 20
+    db.close()
+
+
+def test_failed_write_in_a_batch_is_undone_alone(tmp_path):
+    db = CRMDatabase(str(tmp_path / 'crm.db'))
+    kept = db.customers.add('Kept', 'kept@example.com')
+
+    def add_then_fail(repos):
+        repos.customers.update(kept, 'Changed', 'kept@example.com', '', '', '', 'Active', '')
+        repos.customers.add('Twin', 'kept@example.com')  # email is UNIQUE
+
+    results = run_queued(db, [lambda repos: repos.customers.add('A', 'a@example.com'),
+                              add_then_fail,
+                              lambda repos: repos.customers.add('B', 'b@example.com')], [])
+    assert [type(result.error) for result in results] == [type(None), sqlite3.IntegrityError, type(None)]
+    assert results[1].changes == []
+    assert db.customers.get(kept)[1] == 'Kept'
+    assert sorted(row[1] for row in db.customers.list()) == ['A', 'B', 'Kept']
+    db.close()
@@ -2,10 +2,15 @@ import tkinter as tk
 from tkinter import ttk, font, messagebox
 import json
 import os
+import csv
+import sqlite3
 from abc import ABC, abstractmethod
-from typing import Dict, List, Callable, Any, Optional
+from typing import Dict, List, Callable, Any, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
+from collections import OrderedDict, deque
+from itertools import islice
+from urllib.parse import parse_qsl
 import threading
 import time
 
@@ -87,8 +92,14 @@ class ThemeManager:
     def register_callback(self, callback: Callable):
         self.callbacks.append(callback)
     
+    def unregister_callback(self, callback: Callable):
+        """Stop calling callback; themed widgets do this when they are destroyed"""
+        if callback in self.callbacks:
+            self.callbacks.remove(callback)
+    
     def _notify_callbacks(self):
-        for callback in self.callbacks:
+        # A copy, as a callback may rebuild widgets that register or unregister
+        for callback in list(self.callbacks):
             callback(self.current_theme)
     
     def get_color(self, color_key: str) -> str:
@@ -100,13 +111,46 @@ class ThemeManager:
 # =================== STATE MANAGEMENT ===================
 
 class StateManager:
-    def __init__(self):
+    """Key/value app state with change subscriptions.
+
+    Persistence is optional: when ``persist_path`` is given, keys whose
+    namespace (the part before the first ``.``, e.g. ``prefs`` in
+    ``prefs.theme``) is listed in ``persist_namespaces`` are written to an
+    append-only change log (``<persist_path>.log``) and periodically compacted
+    into a JSON snapshot at ``persist_path``. Both are replayed in the
+    constructor, so state is restored before the first page is built.
+    Persisted values must be JSON-serializable and replaced, not changed
+    in place.
+
+    Compaction runs on a worker thread: ``set_state`` only moves the log
+    aside (``<persist_path>.log.1``) and copies the state dict, and the
+    worker writes the snapshot and then deletes the old log. It starts once
+    the log holds ``snapshot_every`` entries or as many as there are keys,
+    whichever is more, so its cost per write stays flat as the state grows.
+    """
+
+    def __init__(self, persist_path: Optional[str] = None,
+                 persist_namespaces: Optional[List[str]] = None,
+                 snapshot_every: int = 1000):
         self._state = {}
         self._subscribers = {}
+        self.persist_path = persist_path
+        self.persist_namespaces = set(persist_namespaces or [])
+        self.snapshot_every = snapshot_every
+        self._log_file = None
+        self._log_entries = 0
+        self._lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        
+        if self.persist_path:
+            self._restore()
+            self._log_file = open(self._log_path(), 'a', encoding='utf-8')
     
     def set_state(self, key: str, value: Any):
         old_value = self._state.get(key)
         self._state[key] = value
+        if self._log_file and self.is_persisted(key):
+            self._append_log(key, value)
         if key in self._subscribers:
             for callback in self._subscribers[key]:
                 callback(value, old_value)
@@ -122,6 +166,107 @@ class StateManager:
     def unsubscribe(self, key: str, callback: Callable):
         if key in self._subscribers and callback in self._subscribers[key]:
             self._subscribers[key].remove(callback)
+    
+    def is_persisted(self, key: str) -> bool:
+        return key.split('.', 1)[0] in self.persist_namespaces
+    
+    def snapshot(self):
+        """Compact the change log into a fresh snapshot file, on the calling thread"""
+        if not self._log_file:
+            return
+        self._wait_for_compaction()
+        self._compact(self._rotate_log())
+    
+    def close(self):
+        """Write a final snapshot and release the change log"""
+        if self._log_file:
+            self.snapshot()
+            self._log_file.close()
+            self._log_file = None
+    
+    def _log_path(self) -> str:
+        return self.persist_path + '.log'
+    
+    def _old_log_path(self) -> str:
+        return self.persist_path + '.log.1'
+    
+    def _append_log(self, key: str, value: Any):
+        with self._lock:
+            self._log_file.write(json.dumps([key, value], separators=(',', ':')) + '\n')
+            self._log_file.flush()
+            self._log_entries += 1
+        if (self._log_entries >= max(self.snapshot_every, len(self._state))
+                and (self._compactor is None or not self._compactor.is_alive())):
+            self._compactor = threading.Thread(target=self._compact, args=(self._rotate_log(),),
+                                               name='state-snapshot', daemon=True)
+            self._compactor.start()
+    
+    def _wait_for_compaction(self):
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+    
+    def _rotate_log(self) -> Dict[str, Any]:
+        """Start a fresh log; returns the state the old one leads up to"""
+        with self._lock:
+            self._log_file.close()
+            old_log = self._old_log_path()
+            if os.path.exists(old_log):
+                # The last compaction never finished; its entries are still needed
+                with open(self._log_path(), 'rb') as src, open(old_log, 'ab') as dst:
+                    dst.write(src.read())
+                os.remove(self._log_path())
+            else:
+                os.replace(self._log_path(), old_log)
+            self._log_file = open(self._log_path(), 'a', encoding='utf-8')
+            self._log_entries = 0
+            return dict(self._state)
+    
+    def _compact(self, state: Dict[str, Any]):
+        # Grouped by namespace so restore can skip whole namespaces
+        data = {}
+        for key, value in state.items():
+            namespace = key.split('.', 1)[0]
+            if namespace in self.persist_namespaces:
+                data.setdefault(namespace, {})[key] = value
+        tmp_path = self.persist_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.persist_path)
+        # Only drop the old log once the snapshot is safely in place
+        os.remove(self._old_log_path())
+    
+    def _restore(self):
+        if os.path.exists(self.persist_path):
+            try:
+                with open(self.persist_path, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+                for namespace in self.persist_namespaces:
+                    self._state.update(snapshot.get(namespace, {}))
+            except (json.JSONDecodeError, OSError):
+                pass
+        for log_path in (self._old_log_path(), self._log_path()):
+            if os.path.exists(log_path):
+                self._replay(log_path)
+    
+    def _replay(self, log_path: str):
+        """Apply a change log, cutting off a torn last line so new entries append cleanly"""
+        with open(log_path, 'rb+') as f:
+            end = 0
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('incomplete line')
+                    key, value = json.loads(line)
+                except (ValueError, TypeError):
+                    break  # Torn write from a crash; drop the tail
+                if self.is_persisted(key):
+                    self._state[key] = value
+                self._log_entries += 1
+                end += len(line)
+            f.truncate(end)
 
 # =================== MODERN UI COMPONENTS ===================
 
@@ -176,6 +321,10 @@ class ModernButton(tk.Button):
     
     def _on_theme_change(self, theme):
         self._setup_appearance()
+    
+    def destroy(self):
+        self.theme_manager.unregister_callback(self._on_theme_change)
+        super().destroy()
 
 class ModernEntry(tk.Entry):
     def __init__(self, parent, theme_manager: ThemeManager, placeholder="", **kwargs):
@@ -228,6 +377,10 @@ class ModernEntry(tk.Entry):
     
     def _on_theme_change(self, theme):
         self._setup_appearance()
+    
+    def destroy(self):
+        self.theme_manager.unregister_callback(self._on_theme_change)
+        super().destroy()
 
 class ModernFrame(tk.Frame):
     def __init__(self, parent, theme_manager: ThemeManager, elevated=False, **kwargs):
@@ -250,6 +403,10 @@ class ModernFrame(tk.Frame):
     
     def _on_theme_change(self, theme):
         self._setup_appearance()
+    
+    def destroy(self):
+        self.theme_manager.unregister_callback(self._on_theme_change)
+        super().destroy()
 
 class Sidebar(ModernFrame):
     def __init__(self, parent, theme_manager: ThemeManager, width=250):
@@ -313,6 +470,574 @@ class Sidebar(ModernFrame):
         self.menu_items.append(btn)
         return btn
 
+# =================== DATA SOURCES ===================
+
+class DataSource(ABC):
+    """Row provider for DataGrid.
+
+    Rows are tuples in ``columns`` order. Sorting and filtering are applied by
+    the source itself, so the grid only ever asks for ``fetch(offset, limit)``
+    windows of the current view.
+    """
+    
+    def __init__(self, columns: Tuple[str, ...]):
+        self.columns = tuple(columns)
+        self.sort_column: Optional[int] = None
+        self.sort_descending = False
+        self.filter_text = ''
+    
+    @abstractmethod
+    def row_count(self) -> int:
+        pass
+    
+    @abstractmethod
+    def fetch(self, offset: int, limit: int) -> List[tuple]:
+        pass
+    
+    def set_sort(self, column: Optional[int], descending: bool = False):
+        self.sort_column = column
+        self.sort_descending = descending
+        self.invalidate()
+    
+    def set_filter(self, text: str):
+        self.filter_text = text.strip()
+        self.invalidate()
+    
+    def fetch_by_keys(self, keys, key_column: int = 0) -> Dict[Any, tuple]:
+        """Current rows for the given keys, used to patch edited rows in place.
+
+        The generic fallback scans the current view in windows; sources that
+        can look rows up directly override it.
+        """
+        wanted = set(keys)
+        rows = {}
+        offset, window = 0, 1000
+        while wanted:
+            batch = self.fetch(offset, window)
+            for row in batch:
+                if row[key_column] in wanted:
+                    rows[row[key_column]] = row
+                    wanted.discard(row[key_column])
+            if len(batch) < window:
+                break
+            offset += window
+        return rows
+    
+    def invalidate(self):
+        """Drop cached views after the sort, filter or underlying data changed"""
+        pass
+    
+    def _has_view(self) -> bool:
+        return self.sort_column is not None or bool(self.filter_text)
+    
+    def _apply_view(self, rows: List[tuple]) -> List[tuple]:
+        if self.filter_text:
+            needle = self.filter_text.lower()
+            rows = [row for row in rows
+                    if any(needle in str(value).lower() for value in row)]
+        if self.sort_column is not None:
+            col = self.sort_column
+            rows = sorted(rows, key=lambda row: (row[col] is None, row[col]),
+                          reverse=self.sort_descending)
+        return rows
+
+class IterableDataSource(DataSource):
+    """Rows pulled lazily from any Python iterable; sort/filter materialize it"""
+    
+    def __init__(self, columns: Tuple[str, ...], rows):
+        super().__init__(columns)
+        self._iterator = iter(rows)
+        self._rows: List[tuple] = []
+        self._exhausted = False
+        self._view: Optional[List[tuple]] = None
+    
+    def row_count(self) -> int:
+        return len(self._current_rows(None))
+    
+    def fetch(self, offset: int, limit: int) -> List[tuple]:
+        return self._current_rows(offset + limit)[offset:offset + limit]
+    
+    def fetch_by_keys(self, keys, key_column: int = 0) -> Dict[Any, tuple]:
+        wanted = set(keys)
+        return {row[key_column]: row for row in self._rows if row[key_column] in wanted}
+    
+    def invalidate(self):
+        self._view = None
+    
+    def _current_rows(self, upto: Optional[int]) -> List[tuple]:
+        if not self._has_view():
+            self._pull(upto)
+            return self._rows
+        if self._view is None:
+            self._pull(None)
+            self._view = self._apply_view(self._rows)
+        return self._view
+    
+    def _pull(self, upto: Optional[int]):
+        if self._exhausted:
+            return
+        if upto is None:
+            self._rows.extend(tuple(row) for row in self._iterator)
+            self._exhausted = True
+        elif upto > len(self._rows):
+            needed = upto - len(self._rows)
+            self._rows.extend(tuple(row) for row in islice(self._iterator, needed))
+            if len(self._rows) < upto:
+                self._exhausted = True
+
+class SQLiteDataSource(DataSource):
+    """Rows from an SQLite query; sort and filter run inside SQLite"""
+    
+    def __init__(self, connection: sqlite3.Connection, query: str, params: tuple = ()):
+        self.connection = connection
+        self.query = query
+        self.params = tuple(params)
+        cursor = connection.execute(f"SELECT * FROM ({query}) LIMIT 0", self.params)
+        super().__init__(tuple(desc[0] for desc in cursor.description))
+        self._count: Optional[int] = None
+    
+    def row_count(self) -> int:
+        if self._count is None:
+            sql, params = self._build_sql("COUNT(*)", with_order=False)
+            self._count = self.connection.execute(sql, params).fetchone()[0]
+        return self._count
+    
+    def fetch(self, offset: int, limit: int) -> List[tuple]:
+        sql, params = self._build_sql("*")
+        return self.connection.execute(sql + " LIMIT ? OFFSET ?", params + (limit, offset)).fetchall()
+    
+    def fetch_by_keys(self, keys, key_column: int = 0) -> Dict[Any, tuple]:
+        keys = list(keys)
+        key_name = _quote_ident(self.columns[key_column])
+        rows = {}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            sql = f"SELECT * FROM ({self.query}) WHERE {key_name} IN ({placeholders})"
+            for row in self.connection.execute(sql, self.params + tuple(chunk)):
+                rows[row[key_column]] = row
+        return rows
+    
+    def invalidate(self):
+        self._count = None
+    
+    def _build_sql(self, select: str, with_order: bool = True) -> Tuple[str, tuple]:
+        sql = f"SELECT {select} FROM ({self.query})"
+        params = self.params
+        if self.filter_text:
+            clauses = " OR ".join(f"CAST({_quote_ident(col)} AS TEXT) LIKE ?" for col in self.columns)
+            sql += f" WHERE {clauses}"
+            params += (f"%{self.filter_text}%",) * len(self.columns)
+        if with_order and self.sort_column is not None:
+            direction = "DESC" if self.sort_descending else "ASC"
+            sql += f" ORDER BY {_quote_ident(self.columns[self.sort_column])} {direction}"
+        return sql, params
+
+class CSVDataSource(DataSource):
+    """Rows from a CSV file with one record per line.
+
+    Unsorted, unfiltered reads seek through a sparse line-offset index that is
+    built by ``row_count``; sorting or filtering loads the file into memory.
+    """
+    
+    def __init__(self, path: str, encoding: str = 'utf-8', index_step: int = 1024):
+        self.path = path
+        self.encoding = encoding
+        self.index_step = index_step
+        with open(path, 'rb') as f:
+            header = f.readline()
+            self._data_start = f.tell()
+        super().__init__(tuple(next(csv.reader([header.decode(encoding)]), [])))
+        self._offsets: Optional[List[int]] = None  # byte offset of every index_step-th row
+        self._count: Optional[int] = None
+        self._all_rows: Optional[List[tuple]] = None
+        self._view: Optional[List[tuple]] = None
+    
+    def row_count(self) -> int:
+        if self._has_view():
+            return len(self._view_rows())
+        if self._count is None:
+            self._build_index()
+        return self._count
+    
+    def fetch(self, offset: int, limit: int) -> List[tuple]:
+        if self._has_view():
+            return self._view_rows()[offset:offset + limit]
+        
+        with open(self.path, 'rb') as f:
+            if self._offsets:
+                block = min(offset // self.index_step, len(self._offsets) - 1)
+                f.seek(self._offsets[block])
+                skip = offset - block * self.index_step
+            else:
+                f.seek(self._data_start)
+                skip = offset
+            for _ in range(skip):
+                if not f.readline():
+                    return []
+            lines = [line.decode(self.encoding) for line in islice(f, limit)]
+        return [tuple(row) for row in csv.reader(lines)]
+    
+    def fetch_by_keys(self, keys, key_column: int = 0) -> Dict[Any, tuple]:
+        # Read the file as it is now, stopping once every key has been seen
+        wanted = set(keys)
+        rows = {}
+        with open(self.path, 'r', encoding=self.encoding, newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if not wanted:
+                    break
+                if len(row) > key_column and row[key_column] in wanted:
+                    rows[row[key_column]] = tuple(row)
+                    wanted.discard(row[key_column])
+        return rows
+    
+    def invalidate(self):
+        self._view = None
+    
+    def _build_index(self):
+        offsets = []
+        count = 0
+        step = self.index_step
+        with open(self.path, 'rb') as f:
+            f.seek(self._data_start)
+            position = self._data_start
+            for line in f:
+                if count % step == 0:
+                    offsets.append(position)
+                position += len(line)
+                count += 1
+        self._offsets = offsets
+        self._count = count
+    
+    def _view_rows(self) -> List[tuple]:
+        if self._view is None:
+            if self._all_rows is None:
+                with open(self.path, 'r', encoding=self.encoding, newline='') as f:
+                    reader = csv.reader(f)
+                    next(reader, None)
+                    self._all_rows = [tuple(row) for row in reader]
+            self._view = self._apply_view(self._all_rows)
+        return self._view
+
+def _quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+# =================== DATA STORE ===================
+
+class RecordStore:
+    """SQLite-backed record table; bulk writes run as a single transaction"""
+    
+    def __init__(self, path: str = ':memory:', table: str = 'records',
+                 fields: Tuple[str, ...] = ('name', 'email', 'status')):
+        self.path = path
+        self.table = table
+        self.fields = tuple(fields)
+        self.conn = sqlite3.connect(path)
+        columns = ", ".join(f"{_quote_ident(f)} TEXT" for f in self.fields)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote_ident(table)} "
+                          f"(id INTEGER PRIMARY KEY, {columns})")
+        self.conn.commit()
+    
+    def count(self) -> int:
+        return self.conn.execute(f"SELECT COUNT(*) FROM {_quote_ident(self.table)}").fetchone()[0]
+    
+    def get(self, record_id: int) -> Optional[Dict[str, Any]]:
+        names = ", ".join(_quote_ident(f) for f in self.fields)
+        row = self.conn.execute(f"SELECT {names} FROM {_quote_ident(self.table)} WHERE id = ?",
+                                (record_id,)).fetchone()
+        return dict(zip(self.fields, row)) if row else None
+    
+    def add(self, values: Dict[str, Any]) -> int:
+        return self.add_many([values])[0]
+    
+    def add_many(self, records: List[Dict[str, Any]]) -> List[int]:
+        names = ", ".join(_quote_ident(f) for f in self.fields)
+        placeholders = ", ".join("?" * len(self.fields))
+        sql = f"INSERT INTO {_quote_ident(self.table)} ({names}) VALUES ({placeholders})"
+        ids = []
+        with self.conn:
+            for record in records:
+                cursor = self.conn.execute(sql, tuple(record.get(f) for f in self.fields))
+                ids.append(cursor.lastrowid)
+        return ids
+    
+    def update(self, ids, values: Dict[str, Any]):
+        """Set the given fields on every id in one transaction"""
+        fields = [f for f in self.fields if f in values]
+        if not fields:
+            return
+        assignments = ", ".join(f"{_quote_ident(f)} = ?" for f in fields)
+        sql = f"UPDATE {_quote_ident(self.table)} SET {assignments} WHERE id = ?"
+        new_values = tuple(values[f] for f in fields)
+        with self.conn:
+            self.conn.executemany(sql, (new_values + (record_id,) for record_id in ids))
+    
+    def delete(self, ids):
+        with self.conn:
+            self.conn.executemany(f"DELETE FROM {_quote_ident(self.table)} WHERE id = ?",
+                                  ((record_id,) for record_id in ids))
+    
+    def source(self) -> SQLiteDataSource:
+        """Grid view of the table, with title-cased column headings"""
+        columns = ", ".join(f"{_quote_ident(f)} AS {_quote_ident(f.title())}" for f in self.fields)
+        return SQLiteDataSource(self.conn, f"SELECT id AS ID, {columns} FROM {_quote_ident(self.table)}")
+
+# =================== DATA GRID ===================
+
+class DataGrid(ModernFrame):
+    """Virtualized Treeview fed by a DataSource.
+
+    Only the rows that fit in the viewport exist as Treeview items; scrolling
+    rewrites the values of that fixed pool of items from a small cache of
+    ``page_size``-row pages fetched from the source. Selection is tracked by
+    row key (``key_column``) so it survives scrolling, sorting and filtering.
+    """
+    
+    def __init__(self, parent, theme_manager: ThemeManager, source: DataSource,
+                 height: int = 15, page_size: int = 200, max_cached_pages: int = 20,
+                 key_column: int = 0):
+        super().__init__(parent, theme_manager, elevated=True)
+        self.page_size = page_size
+        self.max_cached_pages = max_cached_pages
+        self.key_column = key_column
+        self.source: Optional[DataSource] = None
+        self.selected_keys = set()
+        self._pages: OrderedDict = OrderedDict()  # page index -> rows
+        self._offset = 0
+        self._total = 0
+        self._visible_count = height
+        self._items: List[str] = []
+        self._item_keys: Dict[str, Any] = {}
+        self._anchor: Optional[int] = None  # row index for shift-click ranges
+        self._count_job = None
+        
+        self.tree = ttk.Treeview(self, show='headings', height=height, selectmode='extended')
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self._on_scrollbar)
+        self.tree.pack(side='left', fill='both', expand=True)
+        self.scrollbar.pack(side='right', fill='y')
+        
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+        self.tree.bind('<ButtonPress-1>', self._on_click, add='+')
+        self.tree.bind('<Configure>', self._on_resize)
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(3))
+        self.tree.bind('<Up>', lambda e: self._on_arrow(-1))
+        self.tree.bind('<Down>', lambda e: self._on_arrow(1))
+        self.tree.bind('<Prior>', lambda e: self.scroll(-self._visible_count) or 'break')
+        self.tree.bind('<Next>', lambda e: self.scroll(self._visible_count) or 'break')
+        self.tree.bind('<Control-a>', lambda e: self.select_all() or 'break')
+        
+        self.set_source(source)
+    
+    def set_source(self, source: DataSource):
+        self.source = source
+        self.selected_keys.clear()
+        self.tree.configure(columns=source.columns)
+        for index, col in enumerate(source.columns):
+            self.tree.heading(col, text=col, command=lambda i=index: self.sort_by(i))
+            self.tree.column(col, width=100)
+        self.reload()
+    
+    def reload(self):
+        """Drop cached pages, show the first rows now and count the rest when idle"""
+        self._pages.clear()
+        self._offset = 0
+        first_page = self._get_page(0)
+        # Until the real count arrives, assume there is at least one more page
+        self._total = len(first_page) + (1 if len(first_page) == self.page_size else 0)
+        self._render()
+        self._schedule_count()
+    
+    def sort_by(self, column: int):
+        descending = self.source.sort_column == column and not self.source.sort_descending
+        self.source.set_sort(column, descending)
+        for index, col in enumerate(self.source.columns):
+            arrow = (' ▼' if descending else ' ▲') if index == column else ''
+            self.tree.heading(col, text=col + arrow)
+        self.reload()
+    
+    def set_filter(self, text: str):
+        self.source.set_filter(text)
+        self.reload()
+    
+    def refresh(self):
+        """Re-read the current window after rows were added or removed.
+
+        The scroll position is kept and only the pooled items' values are
+        rewritten; the row count is refreshed when idle.
+        """
+        self.source.invalidate()
+        self._pages.clear()
+        self._render()
+        self._schedule_count()
+    
+    def refresh_rows(self, keys):
+        """Patch edited rows in the page cache and in the visible window only"""
+        rows = self.source.fetch_by_keys(keys, self.key_column)
+        if not rows:
+            return
+        for page in self._pages.values():
+            for index, row in enumerate(page):
+                key = row[self.key_column]
+                if key in rows:
+                    page[index] = rows[key]
+        for item, key in self._item_keys.items():
+            if key in rows:
+                self.tree.item(item, values=rows[key])
+    
+    def remove_rows(self, keys):
+        self.selected_keys.difference_update(keys)
+        self._anchor = None
+        self.refresh()
+    
+    def select_all(self):
+        self.select_range(0, self._total_rows() - 1)
+    
+    def select_range(self, first: int, last: int):
+        """Select rows first..last (view indexes) without them being visible"""
+        if first > last:
+            first, last = last, first
+        rows = self.source.fetch(first, last - first + 1)
+        self.selected_keys = {row[self.key_column] for row in rows}
+        self._render()
+    
+    def scroll(self, rows: int):
+        self._scroll_to(self._offset + rows)
+    
+    def selected_rows(self) -> List[tuple]:
+        """Visible rows whose keys are selected"""
+        return [row for row in self._visible_rows() if row[self.key_column] in self.selected_keys]
+    
+    def _scroll_to(self, offset: int):
+        offset = max(0, min(offset, self._total - self._visible_count))
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+    
+    def _get_page(self, page_index: int) -> List[tuple]:
+        if page_index in self._pages:
+            self._pages.move_to_end(page_index)
+            return self._pages[page_index]
+        rows = self.source.fetch(page_index * self.page_size, self.page_size)
+        self._pages[page_index] = rows
+        while len(self._pages) > self.max_cached_pages:
+            self._pages.popitem(last=False)
+        return rows
+    
+    def _visible_rows(self) -> List[tuple]:
+        if self._total <= 0:
+            return []
+        first_page = self._offset // self.page_size
+        last_page = (self._offset + self._visible_count - 1) // self.page_size
+        rows = []
+        for page_index in range(first_page, last_page + 1):
+            rows.extend(self._get_page(page_index))
+        start = self._offset - first_page * self.page_size
+        return rows[start:start + self._visible_count]
+    
+    def _render(self):
+        rows = self._visible_rows()
+        
+        # Grow or shrink the item pool only when the viewport size changes
+        while len(self._items) < len(rows):
+            self._items.append(self.tree.insert('', tk.END))
+        while len(self._items) > len(rows):
+            item = self._items.pop()
+            self._item_keys.pop(item, None)
+            self.tree.delete(item)
+        
+        selected = []
+        for item, row in zip(self._items, rows):
+            self.tree.item(item, values=row)
+            key = row[self.key_column]
+            self._item_keys[item] = key
+            if key in self.selected_keys:
+                selected.append(item)
+        self.tree.selection_set(selected)
+        self._update_scrollbar()
+    
+    def _update_scrollbar(self):
+        if self._total <= 0:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self._offset / self._total,
+                               min(1.0, (self._offset + self._visible_count) / self._total))
+    
+    def _schedule_count(self):
+        if self._count_job:
+            self.after_cancel(self._count_job)
+        self._count_job = self.after_idle(self._update_count)
+    
+    def _update_count(self):
+        self._count_job = None
+        self._total = self.source.row_count()
+        self._scroll_to(self._offset)
+        self._update_scrollbar()
+    
+    def _on_scrollbar(self, *args):
+        if args[0] == 'moveto':
+            self._scroll_to(int(float(args[1]) * self._total))
+        elif args[0] == 'scroll':
+            step = self._visible_count if args[2] == 'pages' else 1
+            self.scroll(int(args[1]) * step)
+    
+    def _on_mousewheel(self, event):
+        # Windows reports multiples of 120, macOS small deltas
+        delta = event.delta // 120 * 3 if abs(event.delta) >= 120 else event.delta
+        self.scroll(-delta)
+        return 'break'
+    
+    def _on_arrow(self, direction: int):
+        focus = self.tree.focus()
+        if not self._items or focus not in self._items:
+            return None
+        edge = self._items[0] if direction < 0 else self._items[-1]
+        if focus != edge:
+            return None  # Let the Treeview move within the window
+        self.scroll(direction)
+        self.selected_keys = {self._item_keys[edge]}
+        self._render()
+        return 'break'
+    
+    def _total_rows(self) -> int:
+        if self._count_job:
+            self.after_cancel(self._count_job)
+            self._update_count()
+        return self._total
+    
+    def _on_click(self, event):
+        item = self.tree.identify_row(event.y)
+        if item not in self._items:
+            return None
+        index = self._offset + self._items.index(item)
+        if event.state & 0x0001 and self._anchor is not None:  # Shift
+            # Ranges can extend past the window, so select them through the source
+            self.select_range(self._anchor, index)
+            return 'break'
+        self._anchor = index
+        # A plain click replaces the selection, including rows scrolled out of view
+        if not event.state & 0x0004:  # Control
+            self.selected_keys.clear()
+        return None
+    
+    def _on_select(self, event):
+        visible = set(self._item_keys.values())
+        chosen = {self._item_keys[item] for item in self.tree.selection() if item in self._item_keys}
+        self.selected_keys = (self.selected_keys - visible) | chosen
+    
+    def _on_resize(self, event):
+        rowheight = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        heading_height = 25
+        count = max(1, (event.height - heading_height) // rowheight)
+        if count != self._visible_count:
+            self._visible_count = count
+            self._scroll_to(self._offset)
+            self._render()
+
 # =================== NAVIGATION SYSTEM ===================
 
 class Page(ABC):
@@ -322,69 +1047,204 @@ class Page(ABC):
         self.state_manager = state_manager
         self.frame = None
         self.is_loaded = False
+        self.saved_state: Dict[str, Any] = {}
     
     @abstractmethod
     def create_content(self, parent) -> tk.Widget:
         pass
     
-    def on_show(self):
-        """Called when page becomes visible"""
+    def on_show(self, params: Optional[Dict[str, str]] = None):
+        """Called when page becomes visible, with the route's query parameters"""
         pass
     
     def on_hide(self):
         """Called when page becomes hidden"""
         pass
     
+    def save_state(self) -> Dict[str, Any]:
+        """Called before the page frame is evicted; return what to keep"""
+        return {}
+    
+    def restore_state(self, state: Dict[str, Any]):
+        """Called after the page frame is rebuilt with the saved state"""
+        pass
+    
     def destroy(self):
         if self.frame:
             self.frame.destroy()
             self.frame = None
             self.is_loaded = False
 
+def parse_route(route: str) -> Tuple[str, Dict[str, str]]:
+    """Split ``'data?filter=active&page=3'`` into ``('data', {'filter': 'active', 'page': '3'})``"""
+    page_name, _, query = route.partition('?')
+    return page_name, dict(parse_qsl(query))
+
+@dataclass
+class PageMetrics:
+    builds: int = 0
+    last_build_time: float = 0.0
+    total_build_time: float = 0.0
+    shows: int = 0
+    last_show_time: float = 0.0
+    total_show_time: float = 0.0
+
 class NavigationManager:
-    def __init__(self, content_area, theme_manager: ThemeManager, state_manager: StateManager):
+    def __init__(self, content_area, theme_manager: ThemeManager, state_manager: StateManager,
+                 max_live_pages: int = 5, preload: bool = True, max_history: int = 50):
         self.content_area = content_area
         self.theme_manager = theme_manager
         self.state_manager = state_manager
         self.pages: Dict[str, Page] = {}
         self.current_page: Optional[Page] = None
-        self.history: List[str] = []
+        # Bounded back/forward stacks of routes, so long sessions don't grow memory
+        self.history: deque = deque(maxlen=max_history)
+        self.forward_stack: deque = deque(maxlen=max_history)
+        self.max_live_pages = max_live_pages
+        self.preload = preload
+        self.metrics: Dict[str, PageMetrics] = {}
+        self._live_pages: OrderedDict = OrderedDict()  # page name -> None, LRU order
+        self._transitions: Dict[str, Dict[str, int]] = {}
+        self._preload_job = None
     
     def register_page(self, page: Page):
         self.pages[page.name] = page
+        self.metrics[page.name] = PageMetrics()
     
-    def navigate_to(self, page_name: str):
+    def navigate_to(self, route: str):
+        """Navigate to a route such as ``data`` or ``data?filter=active&page=3``"""
+        page_name, params = parse_route(route)
         if page_name not in self.pages:
             return False
         
+        # Update history first so the go_back target is known while showing;
+        # a new navigation invalidates the forward stack
+        if not self.history or self.history[-1] != route:
+            if self.current_page:
+                self._record_transition(self.current_page.name, page_name)
+            self.history.append(route)
+            self.forward_stack.clear()
+        
+        self._show(page_name, params)
+        self._schedule_preload()
+        return True
+    
+    def go_back(self):
+        if len(self.history) > 1:
+            self.forward_stack.append(self.history.pop())  # Current route
+            self._show(*parse_route(self.history[-1]))
+            return True
+        return False
+    
+    def go_forward(self):
+        if self.forward_stack:
+            route = self.forward_stack.pop()
+            self.history.append(route)
+            self._show(*parse_route(route))
+            return True
+        return False
+    
+    def _show(self, page_name: str, params: Dict[str, str]):
         # Hide current page
         if self.current_page:
             self.current_page.on_hide()
             if self.current_page.frame:
                 self.current_page.frame.pack_forget()
         
-        # Show new page
+        # Show new page; cached frames are reused as-is
         page = self.pages[page_name]
-        if not page.is_loaded:
-            page.frame = page.create_content(self.content_area)
-            page.is_loaded = True
-        
+        self.current_page = page
+        self._ensure_built(page)
+        show_start = time.perf_counter()
         page.frame.pack(fill='both', expand=True)
-        page.on_show()
-        
-        # Update history
-        if not self.history or self.history[-1] != page_name:
-            self.history.append(page_name)
+        page.on_show(params)
+        self._record_show(page_name, time.perf_counter() - show_start)
         
-        self.current_page = page
         self.state_manager.set_state('current_page', page_name)
-        return True
     
-    def go_back(self):
+    def predict_next_pages(self, page_name: str, count: int = 1) -> List[str]:
+        """Most frequent destinations after page_name, learned from history"""
+        targets = self._transitions.get(page_name, {})
+        ranked = sorted(targets, key=targets.get, reverse=True)
+        return ranked[:count]
+    
+    def _ensure_built(self, page: Page, keep: Tuple[str, ...] = ()):
+        if not page.is_loaded:
+            start = time.perf_counter()
+            page.frame = page.create_content(self.content_area)
+            page.is_loaded = True
+            if page.saved_state:
+                page.restore_state(page.saved_state)
+            metrics = self.metrics[page.name]
+            metrics.builds += 1
+            metrics.last_build_time = time.perf_counter() - start
+            metrics.total_build_time += metrics.last_build_time
+        self._touch(page.name, keep)
+    
+    def _touch(self, page_name: str, keep: Tuple[str, ...] = ()):
+        self._live_pages[page_name] = None
+        self._live_pages.move_to_end(page_name)
+        while len(self._live_pages) > max(1, self.max_live_pages):
+            candidates = self._evictable(page_name, keep)
+            if not candidates:
+                break
+            self._evict(candidates[0])
+    
+    def _protected(self) -> set:
+        """The page being shown and the go_back target"""
+        protected = set()
+        if self.current_page:
+            protected.add(self.current_page.name)
         if len(self.history) > 1:
-            self.history.pop()  # Remove current page
-            previous_page = self.history[-1]
-            self.navigate_to(previous_page)
+            protected.add(parse_route(self.history[-2])[0])
+        return protected
+    
+    def _evictable(self, page_name: str, keep: Tuple[str, ...] = ()) -> List[str]:
+        """Live pages in LRU order, minus page_name, keep and the protected pages"""
+        protected = self._protected() | {page_name} | set(keep)
+        return [name for name in self._live_pages if name not in protected]
+    
+    def _evict(self, page_name: str):
+        del self._live_pages[page_name]
+        page = self.pages[page_name]
+        if page.is_loaded:
+            page.saved_state = page.save_state()
+            page.destroy()
+    
+    def _record_show(self, page_name: str, elapsed: float):
+        metrics = self.metrics[page_name]
+        metrics.shows += 1
+        metrics.last_show_time = elapsed
+        metrics.total_show_time += elapsed
+    
+    def _record_transition(self, from_page: str, to_page: str):
+        targets = self._transitions.setdefault(from_page, {})
+        targets[to_page] = targets.get(to_page, 0) + 1
+    
+    def _schedule_preload(self):
+        if not self.preload or self._preload_job:
+            return
+        self._preload_job = self.content_area.after_idle(self._preload_next)
+    
+    def _preload_next(self):
+        """Build the likeliest next page while the UI is idle"""
+        self._preload_job = None
+        if not self.current_page:
+            return
+        # Only the slots the current page and the go_back target leave free, so
+        # every prediction fits at once and preloading one never evicts another
+        count = max(0, self.max_live_pages - len(self._protected()))
+        predicted = tuple(self.predict_next_pages(self.current_page.name, count))
+        for page_name in predicted:
+            page = self.pages[page_name]
+            if not page.is_loaded:
+                if (len(self._live_pages) >= self.max_live_pages
+                        and not self._evictable(page_name, predicted)):
+                    return  # No room without dropping a protected page
+                self._ensure_built(page, predicted)
+                self._schedule_preload()
+                return  # One page per idle slot keeps the UI responsive
+        # Nothing left to build: stay idle until the next navigation
 
 # =================== EXAMPLE PAGES ===================
 
@@ -538,6 +1398,20 @@ class SettingsPage(Page):
         return frame
 
 class DataPage(Page):
+    STATUSES = ('Active', 'Inactive', 'Pending')
+    
+    def __init__(self, name: str, theme_manager: ThemeManager, state_manager: StateManager,
+                 store: Optional[RecordStore] = None):
+        super().__init__(name, theme_manager, state_manager)
+        self.store = store or RecordStore()
+        if self.store.count() == 0:
+            self.store.add_many([
+                {'name': 'John Doe', 'email': 'john@example.com', 'status': 'Active'},
+                {'name': 'Jane Smith', 'email': 'jane@example.com', 'status': 'Inactive'},
+                {'name': 'Bob Johnson', 'email': 'bob@example.com', 'status': 'Active'},
+                {'name': 'Alice Brown', 'email': 'alice@example.com', 'status': 'Pending'},
+            ])
+    
     def create_content(self, parent) -> tk.Widget:
         frame = ModernFrame(parent, self.theme_manager)
         
@@ -558,53 +1432,126 @@ class DataPage(Page):
         btn_frame = tk.Frame(toolbar, bg=self.theme_manager.get_color('bg_secondary'))
         btn_frame.pack(pady=10)
         
-        ModernButton(btn_frame, self.theme_manager, text="Add", primary=True).pack(side='left', padx=(0, 10))
-        ModernButton(btn_frame, self.theme_manager, text="Edit", outline=True).pack(side='left', padx=(0, 10))
-        ModernButton(btn_frame, self.theme_manager, text="Delete").pack(side='left')
+        ModernButton(btn_frame, self.theme_manager, text="Add", primary=True,
+                     command=self.add_record).pack(side='left', padx=(0, 10))
+        ModernButton(btn_frame, self.theme_manager, text="Edit", outline=True,
+                     command=self.edit_selected).pack(side='left', padx=(0, 10))
+        ModernButton(btn_frame, self.theme_manager, text="Delete",
+                     command=self.delete_selected).pack(side='left')
         
-        # Data table area
-        table_frame = ModernFrame(frame, self.theme_manager, elevated=True)
-        table_frame.pack(fill='both', expand=True, padx=20, pady=(0, 20))
+        self.filter_entry = ModernEntry(btn_frame, self.theme_manager, placeholder="Filter...")
+        self.filter_entry.pack(side='left', padx=(20, 0))
+        self.filter_entry.bind('<KeyRelease>', self._on_filter)
         
-        # Create a simple table using Treeview
+        # Data table area
         style = ttk.Style()
         style.theme_use('clam')
         
-        columns = ('ID', 'Name', 'Email', 'Status')
-        tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=15)
+        self.data_grid = DataGrid(frame, self.theme_manager, self.create_source())
+        self.data_grid.pack(fill='both', expand=True, padx=20, pady=(0, 20))
+        
+        return frame
+    
+    def create_source(self) -> DataSource:
+        """Override to feed the grid from a different dataset"""
+        return self.store.source()
+    
+    def add_record(self):
+        def save(values):
+            self.store.add(values)
+            self.data_grid.refresh()
+        
+        self._open_record_dialog("Add Record", {'status': 'Active'}, save)
+    
+    def edit_selected(self):
+        keys = list(self.data_grid.selected_keys)
+        if not keys:
+            messagebox.showwarning("Edit", "Please select at least one record")
+            return
         
-        # Define headings
-        for col in columns:
-            tree.heading(col, text=col)
-            tree.column(col, width=100)
+        def save(values):
+            self.store.update(keys, values)
+            self.data_grid.refresh_rows(keys)
         
-        # Add sample data
-        sample_data = [
-            (1, 'John Doe', 'john@example.com', 'Active'),
-            (2, 'Jane Smith', 'jane@example.com', 'Inactive'),
-            (3, 'Bob Johnson', 'bob@example.com', 'Active'),
-            (4, 'Alice Brown', 'alice@example.com', 'Pending'),
-        ]
+        if len(keys) == 1:
+            self._open_record_dialog("Edit Record", self.store.get(keys[0]) or {}, save)
+        else:
+            # Bulk edit: blank fields keep each record's current value
+            def save_changed(values):
+                save({f: v for f, v in values.items() if v})
+            
+            self._open_record_dialog(f"Edit {len(keys)} Records", {}, save_changed,
+                                     note="Leave a field blank to keep its current values")
+    
+    def delete_selected(self):
+        keys = list(self.data_grid.selected_keys)
+        if not keys:
+            messagebox.showwarning("Delete", "Please select at least one record")
+            return
+        if messagebox.askyesno("Delete", f"Delete {len(keys)} selected record(s)?"):
+            self.store.delete(keys)
+            self.data_grid.remove_rows(keys)
+    
+    def _open_record_dialog(self, title: str, initial: Dict[str, Any],
+                            on_save: Callable, note: str = ""):
+        dialog = tk.Toplevel(self.frame)
+        dialog.title(title)
+        dialog.configure(bg=self.theme_manager.get_color('bg_primary'))
+        dialog.transient(self.frame.winfo_toplevel())
+        dialog.grab_set()
+        
+        form = ModernFrame(dialog, self.theme_manager)
+        form.pack(fill='both', expand=True, padx=20, pady=20)
         
-        for item in sample_data:
-            tree.insert('', tk.END, values=item)
+        if note:
+            tk.Label(
+                form,
+                text=note,
+                font=self.theme_manager.get_font('small'),
+                bg=self.theme_manager.get_color('bg_primary'),
+                fg=self.theme_manager.get_color('fg_secondary')
+            ).pack(anchor='w', pady=(0, 10))
         
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
+        variables = {}
+        for field_name in self.store.fields:
+            tk.Label(
+                form,
+                text=f"{field_name.title()}:",
+                font=self.theme_manager.get_font('default'),
+                bg=self.theme_manager.get_color('bg_primary'),
+                fg=self.theme_manager.get_color('fg_primary')
+            ).pack(anchor='w')
+            
+            var = tk.StringVar(value=initial.get(field_name) or "")
+            if field_name == 'status':
+                values = self.STATUSES if not note else ('',) + self.STATUSES
+                ttk.Combobox(form, textvariable=var, values=values, state='readonly').pack(fill='x', pady=(0, 10))
+            else:
+                ModernEntry(form, self.theme_manager, textvariable=var).pack(fill='x', pady=(0, 10))
+            variables[field_name] = var
         
-        tree.pack(side='left', fill='both', expand=True)
-        scrollbar.pack(side='right', fill='y')
+        def save():
+            on_save({name: var.get().strip() for name, var in variables.items()})
+            dialog.destroy()
         
-        return frame
+        ModernButton(form, self.theme_manager, text="Save", primary=True, command=save).pack(pady=(10, 0))
+    
+    def _on_filter(self, event):
+        if not self.filter_entry.placeholder_active:
+            self.data_grid.set_filter(self.filter_entry.get())
 
 # =================== MAIN APPLICATION ===================
 
 class ModernAppFramework:
-    def __init__(self):
+    def __init__(self, state_file: Optional[str] = None,
+                 persist_namespaces: Optional[List[str]] = None,
+                 data_file: Optional[str] = None):
         self.root = tk.Tk()
         self.theme_manager = ThemeManager()
-        self.state_manager = StateManager()
+        # Persisted state is restored here, before any page is built
+        self.state_manager = StateManager(state_file, persist_namespaces)
+        # Like state_file, nothing is written to disk unless a path is given
+        self.record_store = RecordStore(data_file or ':memory:')
         
         self._setup_window()
         self._setup_layout()
@@ -651,12 +1598,15 @@ class ModernAppFramework:
         # Register pages
         pages = [
             DashboardPage('dashboard', self.theme_manager, self.state_manager),
-            DataPage('data', self.theme_manager, self.state_manager),
+            DataPage('data', self.theme_manager, self.state_manager, self.record_store),
             SettingsPage('settings', self.theme_manager, self.state_manager)
         ]
         
         for page in pages:
             self.nav_manager.register_page(page)
+        
+        self.root.bind('<Alt-Left>', lambda e: self.nav_manager.go_back())
+        self.root.bind('<Alt-Right>', lambda e: self.nav_manager.go_forward())
     
     def _setup_menu(self):
         menu_items = [
@@ -682,6 +1632,8 @@ class ModernAppFramework:
             self.root.mainloop()
         except KeyboardInterrupt:
             self.root.quit()
+        finally:
+            self.state_manager.close()
 
 # =================== EXAMPLE USAGE ===================
 